@@ -3,7 +3,12 @@ import pandas as pd
 import folium
 from streamlit_folium import st_folium
 import os
-from src.optimizer import LogisticsOptimizer
+from src.scenario_cache import ScenarioCache
+from src.job_queue import JobQueue
+from src.data_store import load_table
+from src.ingest import ingest_csv
+from src.map_layers import spider_lines, site_cluster
+from src.distance import haversine_np
 import plotly.express as px
 import plotly.graph_objects as go
 
@@ -110,6 +115,18 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- 3. SESSION STATE ---
+@st.cache_resource
+def get_scenario_cache():
+    # Tüm oturumlarca paylaşılan senaryo önbelleği (LRU, en fazla 32 senaryo)
+    return ScenarioCache(maxsize=32)
+
+
+@st.cache_resource
+def get_job_queue():
+    # Çözümler script thread'inde değil, çekirdek sayısı kadar işçi süreçte çalışır (oturumlar arası paylaşılır)
+    return JobQueue(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'jobs'))
+
+
 if 'opt_results' not in st.session_state:
     st.session_state.opt_results = None
 if 'is_solved' not in st.session_state:
@@ -129,6 +146,18 @@ with st.sidebar:
     st.markdown("### 🎯 Hedefler")
     max_depots = st.slider("Maks. Depo Sayısı", 1, 10, 5)
     max_dist = st.slider("Hizmet Menzili (km)", 2.0, 15.0, 8.0)
+
+    st.markdown("### ⏱️ Çözücü")
+    live_mode = st.toggle("Canlı İzleme (durdurulabilir)", value=False)
+    solve_time = st.number_input("Süre Limiti (sn)", 10, 600, 60, disabled=not live_mode)
+    agg_choice = st.selectbox("Talep Birleştirme", ["Yok", "Izgara", "K-means"], disabled=live_mode,
+                              help="Yakın talep noktaları süper düğümlerde toplanır; model küçülür, hata raporlanır.")
+    aggregation = None
+    if agg_choice == "Izgara" and not live_mode:
+        aggregation = {'method': 'grid', 'cell_km': st.slider("Hücre Boyu (km)", 0.25, 3.0, 0.5, 0.25)}
+    elif agg_choice == "K-means" and not live_mode:
+        aggregation = {'method': 'kmeans', 'n_clusters': st.slider("Süper Düğüm Sayısı", 10, 2000, 100, 10)}
+    show_perf = st.toggle("Performans Paneli", value=False)
     
     st.write("") # Boşluk
     run_btn = st.button("ANALİZİ BAŞLAT", type="primary")
@@ -137,14 +166,39 @@ with st.sidebar:
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_DEMAND = os.path.join(BASE_DIR, 'data', 'raw', 'demand_points.csv')
 DEFAULT_SITES = os.path.join(BASE_DIR, 'data', 'raw', 'candidate_sites.csv')
+UPLOAD_DIR = os.path.join(BASE_DIR, 'data', 'uploads')
+
+
+def ingested_path(uploaded, kind):
+    # Yüklenen dosya oturumda bir kez alınır; aynı içerik diskte zaten varsa hiç ayrıştırılmaz (bkz. src/ingest.py)
+    ingested = st.session_state.setdefault('ingested', {})
+    key = (kind, uploaded.file_id)
+    if key not in ingested:
+        with st.spinner(f"📥 {uploaded.name} doğrulanıyor..."):
+            ingested[key] = ingest_csv(uploaded, kind, UPLOAD_DIR, name=uploaded.name)
+    return ingested[key]
+
+
+demand_path, sites_path = DEFAULT_DEMAND, DEFAULT_SITES
+try:
+    if uploaded_demand is not None:
+        demand_path = ingested_path(uploaded_demand, 'demand')
+    if uploaded_sites is not None:
+        sites_path = ingested_path(uploaded_sites, 'sites')
+except ValueError as e:
+    st.sidebar.error(f"Veri hatası: {e}")
+    demand_path = sites_path = None
 
 if run_btn:
-    with st.spinner("🤖 Yapay zeka en optimal ağı kurguluyor..."):
+    if demand_path is None:
+        st.error("Yüklenen veri doğrulanamadı; dosyayı düzeltip tekrar yükleyin.")
+    else:
         try:
-            opt = LogisticsOptimizer(DEFAULT_DEMAND, DEFAULT_SITES)
-            opt.MAX_RANGE_KM = max_dist
-            st.session_state.opt_results = opt.solve_model(max_stores_to_open=max_depots)
-            st.session_state.is_solved = True
+            # Aynı senaryo kuyrukta/çalışıyor/bitmiş ise yeni iş açılmaz, mevcut işin kimliği döner
+            job_id = get_job_queue().submit(demand_path, sites_path, max_depots, max_range_km=max_dist,
+                                            time_limit=solve_time, live=live_mode, aggregation=aggregation)
+            st.session_state.live_job = get_job_queue().handle(job_id)
+            st.session_state.data_paths = (demand_path, sites_path)
         except Exception as e:
             st.error(f"Hata: {e}")
 
@@ -158,16 +212,99 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+@st.fragment(run_every=1.0)
+def live_progress():
+    # Arka plandaki çözümün canlı durumu; sadece bu parça her saniye yeniden çizilir
+    job = st.session_state.get('live_job')
+    if job is None:
+        return
+    prog = job.progress()
+    st.caption(f"🤖 Çözüm arka planda çalışıyor (iş: {job.job_id}); en iyi çözüm ve alt sınır canlı izlenebilir.")
+    lc1, lc2, lc3, lc4, lc5 = st.columns([1, 1, 1, 1, 1])
+    lc1.metric("Durum", prog['phase'])
+    lc2.metric("Süre", f"{prog['elapsed_s']:.0f} sn")
+    lc3.metric("En İyi Çözüm", f"₺{prog['incumbent']:,.0f}" if prog['incumbent'] is not None else "-")
+    lc4.metric("Alt Sınır", f"₺{prog['bound']:,.0f}" if prog['bound'] is not None else "-")
+    lc5.metric("Boşluk", f"%{100 * prog['gap']:.2f}" if prog['gap'] is not None else "-")
+    if prog['history']:
+        df_hist = pd.DataFrame(prog['history']).melt(id_vars='elapsed_s', value_vars=['incumbent', 'bound']).dropna()
+        fig_live = px.line(df_hist, x='elapsed_s', y='value', color='variable', markers=True,
+                           labels={'elapsed_s': 'Süre (sn)', 'value': 'Maliyet (₺)', 'variable': ''})
+        fig_live.update_layout(height=220, margin=dict(l=10,r=10,t=10,b=10), paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)")
+        st.plotly_chart(fig_live, use_container_width=True)
+
+    if job.done:
+        # Erken durdurulsa da en iyi uygun ağ sonuç olarak gösterilir
+        st.session_state.live_job = None
+        if job.error is not None:
+            st.session_state.live_error = f"Hata: {job.error}"
+        elif job.result is None:
+            st.session_state.live_error = "❌ Süre içinde uygun çözüm bulunamadı."
+        st.session_state.opt_results = job.result
+        st.session_state.is_solved = job.result is not None
+        st.rerun()
+    elif st.button("⏹ ÇÖZÜMÜ DURDUR"):
+        job.stop()
+
+if st.session_state.get('live_job') is not None:
+    live_progress()
+if st.session_state.get('live_error'):
+    st.warning(st.session_state.pop('live_error'))
+
 if st.session_state.is_solved and st.session_state.opt_results is not None:
+    agg_report = st.session_state.opt_results.metrics.get('aggregation')
+    if agg_report:
+        st.info(f"🧮 Talep birleştirildi: {agg_report['n_points']:,} nokta → {agg_report['n_super']:,} süper düğüm. "
+                f"Geri açma farkı ₺{agg_report['cost_error']:+,.0f} (%{agg_report['cost_error_pct']:+.2f}, "
+                f"sınır ±₺{agg_report['error_bound']:,.0f}), ort. mesafe hatası {agg_report['dist_error_mean_km']:.2f} km"
+                + (f", menzil dışı kalıp hizmet dışı bırakılan nokta: {agg_report['unserved']}"
+                   if agg_report.get('unserved') else ""))
+        if st.session_state.opt_results.status == 'Infeasible':
+            st.error("❌ Birleştirilmiş çözüm geri açıldığında menzil içinde depo bulunan noktalar açıkta kaldı; "
+                     "plan uygun değil. Daha ince birleştirme seviyesi deneyin.")
+    elif st.session_state.opt_results.status == 'Feasible':
+        st.info("⏳ Gösterilen ağ süre limiti/durdurma anındaki en iyi uygun çözümdür (optimallik kanıtlanmadı).")
     
-    # Veri Hazırlığı
-    processed_dir = os.path.join(BASE_DIR, 'data', 'processed')
-    df_assignments = pd.read_csv(os.path.join(processed_dir, 'customer_assignments.csv'))
-    df_sites_final = pd.read_csv(os.path.join(processed_dir, 'selected_sites.csv'))
+    # Sonuç, çözüldüğü veriyle gösterilir (sonradan yeni dosya yüklenmiş olabilir)
+    result_demand, result_sites = st.session_state.get('data_paths', (DEFAULT_DEMAND, DEFAULT_SITES))
     
-    total_cost = df_sites_final['rent_cost'].sum() + (df_assignments['distance_km'] * 5 * 30).sum()
-    avg_dist = df_assignments['distance_km'].mean()
-    total_orders = len(df_assignments)
+    # --- WHAT-IF: sabit ağ üzerinde anında değerlendirme (MILP çözülmez) ---
+    base_result = st.session_state.opt_results
+    whatif = st.toggle("🔀 What-if modu: haritada depoya tıklayarak aç/kapat", value=False)
+    view_result = base_result
+    if whatif:
+        base_key = base_result.fingerprint()
+        if st.session_state.get('whatif_key') != base_key:
+            cache = get_scenario_cache()
+            opt = cache.get_optimizer(result_demand, result_sites)
+            st.session_state.whatif_eval = cache.get_evaluator(opt, base_result)
+            st.session_state.whatif_key = base_key
+            # Fark, aynı hızlı atamayla değerlendirilen başlangıç ağına göre gösterilir (elma-elma)
+            st.session_state.whatif_base_cost = st.session_state.whatif_eval.kpis()['total_cost']
+        evaluator = st.session_state.whatif_eval
+        kp = evaluator.kpis()
+        st.caption("Atamalar hızlı kapasiteli atama ile hesaplanır; kesin maliyet için analizi yeniden başlatın.")
+        w1, w2, w3, w4, w5, w6 = st.columns([1.4, 1, 1, 1, 1, 0.8])
+        w1.metric("What-if Maliyet", f"₺{kp['total_cost']:,.0f}",
+                  f"₺{kp['total_cost'] - st.session_state.whatif_base_cost:+,.0f}", delta_color="inverse")
+        w2.metric("Kira", f"₺{kp['rent_cost']:,.0f}")
+        w3.metric("Taşıma", f"₺{kp['transport_cost']:,.0f}")
+        w4.metric("Hizmet Dışı Müşteri", kp['unserved_customers'])
+        w5.metric("Değerlendirme", f"{kp['eval_ms']:.1f} ms")
+        if w6.button("↺ Sıfırla"):
+            evaluator.evaluate(base_result.open_site_ids)
+            st.rerun()
+        view_result = evaluator.to_result()
+
+    # Veri Hazırlığı (bellekteki sonuç nesnesi doğrudan kullanılır)
+    df_assignments = view_result.assignments
+    df_sites_final = view_result.sites
+    
+    # KPI'lar çözüm başına bir kez çözücü dizilerinden hesaplanıp sonuçla birlikte saklanır (bkz. src/kpi.py)
+    kpis = view_result.kpis
+    if kpis is None:  # KPI'sız kaydedilmiş eski sonuç
+        view_result.kpis = kpis = get_scenario_cache().get_optimizer(result_demand, result_sites).result_kpis(view_result)
+    ks, df_site_kpis = kpis['summary'], kpis['sites']
     
     # --- KPI KARTLARI ---
     c1, c2, c3, c4 = st.columns(4)
@@ -182,10 +319,17 @@ if st.session_state.is_solved and st.session_state.opt_results is not None:
         </div>
         """
 
-    with c1: st.markdown(kpi_card("Toplam Maliyet (Ay)", f"₺{total_cost:,.0f}", "▼ %12 Optimize", "#3b82f6"), unsafe_allow_html=True)
-    with c2: st.markdown(kpi_card("Ort. Teslimat Süresi", f"{avg_dist*2.5:.1f} dk", "⚡ Hedef: <15dk", "#10b981"), unsafe_allow_html=True)
-    with c3: st.markdown(kpi_card("Seçilen Depolar", f"{len(df_sites_final)} / {max_depots}", "Verimlilik: Yüksek", "#f59e0b"), unsafe_allow_html=True)
-    with c4: st.markdown(kpi_card("Hizmet Verilen", f"{total_orders}", "Kapsama: %100", "#8b5cf6"), unsafe_allow_html=True)
+    with c1: st.markdown(kpi_card("Toplam Maliyet", f"₺{ks['total_cost']:,.0f}",
+                                  f"Kira ₺{ks['rent_cost']:,.0f} + Taşıma ₺{ks['transport_cost']:,.0f}", "#3b82f6"), unsafe_allow_html=True)
+    with c2: st.markdown(kpi_card("Ort. Teslimat Süresi", f"{ks['avg_delivery_min']:.1f} dk",
+                                  f"Mesafe p50 {ks['distance_p50_km']:.1f} / p90 {ks['distance_p90_km']:.1f} / p95 {ks['distance_p95_km']:.1f} "
+                                  f"{'dk' if ks.get('distance_metric') == 'time' else 'km'}",
+                                  "#10b981"), unsafe_allow_html=True)
+    with c3: st.markdown(kpi_card("Seçilen Depolar", f"{ks['n_open']} / {max_depots}",
+                                  f"En yoğun depo: %{ks['max_utilization']*100:.0f}", "#f59e0b"), unsafe_allow_html=True)
+    with c4: st.markdown(kpi_card("Hizmet Verilen Sipariş", f"{ks['total_orders']:,.0f}",
+                                  f"Kapsama: %{ks['coverage']*100:.1f} ({ks['served_customers']:,} / {ks['total_customers']:,} müşteri)",
+                                  "#8b5cf6"), unsafe_allow_html=True)
 
     st.write("") # Boşluk
 
@@ -195,37 +339,51 @@ if st.session_state.is_solved and st.session_state.opt_results is not None:
     with col_map:
         st.subheader("🗺️ Dijital İkiz ve Ağ Haritası")
         
-        center_lat = df_sites_final['lat'].mean()
-        center_lon = df_sites_final['lon'].mean()
+        center_lat = base_result.sites['lat'].mean()
+        center_lon = base_result.sites['lon'].mean()
         m = folium.Map(location=[center_lat, center_lon], zoom_start=12, tiles="CartoDB positron")
         
-        # Spider Lines
-        df_demand = pd.read_csv(DEFAULT_DEMAND)
-        df_merged = df_assignments.merge(df_demand, left_on='customer_id', right_on='id')
-        df_merged = df_merged.merge(df_sites_final, left_on='assigned_site_id', right_on='site_id', suffixes=('_cust', '_site'))
-        
-        for _, row in df_merged.iterrows():
-            folium.PolyLine(
-                locations=[(row['lat_cust'], row['lon_cust']), (row['lat_site'], row['lon_site'])],
-                color='#3b82f6', weight=0.5, opacity=0.2
-            ).add_to(m)
+        # Spider Lines: tek GeoJSON katmanı, çizgi sayısı sınırlı (LOD örnekleme)
+        df_demand, demand_coords = load_table(result_demand, 'demand')
+        cust_pos = pd.Index(df_demand['id']).get_indexer(df_assignments['customer_id'])
+        site_pos = pd.Index(df_sites_final['site_id']).get_indexer(df_assignments['assigned_site_id'])
+        site_lat = df_sites_final['lat'].to_numpy()
+        site_lon = df_sites_final['lon'].to_numpy()
+        spider_lines(demand_coords[0][cust_pos], demand_coords[1][cust_pos],
+                     site_lat[site_pos], site_lon[site_pos], site_pos).add_to(m)
             
-        # Depolar
-        for _, row in df_sites_final.iterrows():
-            folium.Marker(
-                [row['lat'], row['lon']],
-                icon=folium.Icon(color='darkblue', icon='warehouse', prefix='fa'),
-                tooltip=f"Depo: {row['site_id']} | Kapasite: {row['capacity']}"
-            ).add_to(m)
-            folium.Circle([row['lat'], row['lon']], radius=max_dist*1000, color='#3b82f6', fill=True, fill_opacity=0.05).add_to(m)
+        # Depolar (tek katman) ve hizmet menzilleri
+        site_cluster(site_lat, site_lon,
+                     "Depo: " + df_sites_final['site_id'].astype(str) + " | Kapasite: " + df_sites_final['capacity'].astype(str),
+                     color='darkblue', cluster=False).add_to(m)
+        for lat, lon in zip(site_lat.tolist(), site_lon.tolist()):
+            folium.Circle([lat, lon], radius=max_dist*1000, color='#3b82f6', fill=True, fill_opacity=0.05).add_to(m)
 
-        st_folium(m, width="100%", height=500)
+        if whatif:
+            # Tüm aday depolar tıklanabilir: mavi açık, gri kapalı (tıklama en yakın depoyu aç/kapat yapar)
+            cand = evaluator.optimizer.df_sites
+            for sid, lat, lon, is_open in zip(cand['site_id'].tolist(), cand['lat'].tolist(), cand['lon'].tolist(),
+                                              evaluator.open_mask.tolist()):
+                folium.CircleMarker([lat, lon], radius=9, color='#1e3a8a' if is_open else '#94a3b8', weight=2,
+                                    fill=True, fill_opacity=0.8 if is_open else 0.4,
+                                    tooltip=f"{sid} ({'açık' if is_open else 'kapalı'}) - tıkla: aç/kapat").add_to(m)
+
+        map_state = st_folium(m, width="100%", height=500, key="network_map",
+                              returned_objects=["last_object_clicked", "last_clicked"] if whatif else [])
+        click = (map_state or {}).get('last_object_clicked') or (map_state or {}).get('last_clicked')
+        if whatif and click and click != st.session_state.get('whatif_click'):
+            st.session_state.whatif_click = click
+            cand = evaluator.optimizer.df_sites
+            d = haversine_np(click['lat'], click['lng'], cand['lat'].to_numpy(), cand['lon'].to_numpy())
+            if d.min() <= 0.5:  # 500 m içinde depo yoksa tıklama yok sayılır
+                evaluator.toggle(cand['site_id'].iloc[int(d.argmin())])
+                st.rerun()
 
     with col_charts:
         st.subheader("📊 Metrikler")
         
         # Gauge Chart
-        usage_pct = (total_orders / df_sites_final['capacity'].sum()) * 100
+        usage_pct = ks['capacity_usage'] * 100
         fig_gauge = go.Figure(go.Indicator(
             mode = "gauge+number",
             value = usage_pct,
@@ -242,9 +400,11 @@ if st.session_state.is_solved and st.session_state.opt_results is not None:
         st.plotly_chart(fig_gauge, use_container_width=True)
         
         # Bar Chart
-        load_df = df_assignments['assigned_site_id'].value_counts().reset_index()
-        load_df.columns = ['Depo', 'Yük']
-        fig_bar = px.bar(load_df, x='Depo', y='Yük', color='Yük', color_continuous_scale='Blues')
+        load_df = df_site_kpis.assign(utilization=df_site_kpis['utilization'] * 100)
+        fig_bar = px.bar(load_df, x='site_id', y='orders', color='utilization', color_continuous_scale='Blues',
+                         hover_data=['customers', 'weighted_distance_km'],
+                         labels={'site_id': 'Depo', 'orders': 'Yük (sipariş)', 'utilization': 'Kullanım (%)',
+                                 'customers': 'Müşteri', 'weighted_distance_km': 'Ağırlıklı Mesafe (km)'})
         fig_bar.update_layout(height=250, margin=dict(l=10,r=10,t=40,b=10), paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)")
         st.plotly_chart(fig_bar, use_container_width=True)
 
@@ -256,6 +416,23 @@ if st.session_state.is_solved and st.session_state.opt_results is not None:
         column_config={"site_id":"Depo Kodu", "rent_cost":"Kira Bedeli", "capacity":"Kapasite", "setup_cost":"Kurulum Maliyeti"}
     )
 
+    # --- PERFORMANS PANELİ ---
+    perf = st.session_state.opt_results.metrics
+    if show_perf and perf:
+        with st.expander("⚙️ Performans: Aşama Süreleri ve Model Boyutu", expanded=True):
+            df_perf = pd.DataFrame(perf['stages'])
+            pc1, pc2 = st.columns([2, 1])
+            with pc1:
+                fig_perf = px.bar(df_perf, x='wall_s', y='stage', orientation='h', hover_data=['cpu_s'],
+                                  labels={'wall_s': 'Duvar Saati (sn)', 'stage': 'Aşama', 'cpu_s': 'CPU (sn)'})
+                fig_perf.update_layout(height=250, margin=dict(l=10,r=10,t=10,b=10), paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)")
+                st.plotly_chart(fig_perf, use_container_width=True)
+            with pc2:
+                st.metric("Toplam Süre", f"{perf['total_wall_s']:.2f} sn")
+                st.dataframe(pd.DataFrame({'Sayaç': list(perf['counters']), 'Değer': [str(v) for v in perf['counters'].values()]}),
+                             use_container_width=True, hide_index=True)
+            st.caption("Çözücü: " + " | ".join(f"{k}: {v}" for k, v in perf['solver'].items() if v is not None))
+
 else:
     # EMPTY STATE
     st.markdown("""
@@ -264,4 +441,61 @@ else:
         <h3 style="color: #475569; margin: 0;">Analiz Bekleniyor</h3>
         <p style="color: #94a3b8; margin-top: 10px;">Sol menüden parametreleri belirleyin ve <b>ANALİZİ BAŞLAT</b> butonuna basın.</p>
     </div>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+    """, unsafe_allow_html=True)
+# --- 7. SENARYO ANALİZİ (k-EĞRİSİ) ---
+st.write("")
+with st.expander("📈 Senaryo Analizi: Maliyet - Depo Sayısı Eğrisi"):
+    sc1, sc2, sc3 = st.columns([2, 2, 1])
+    with sc1:
+        sweep_k = st.slider("Depo Sayısı Aralığı", 1, 10, (1, 10))
+    with sc2:
+        sweep_ranges = st.multiselect("Menziller (km)", [4.0, 6.0, 8.0, 10.0, 12.0], default=[max_dist] if max_dist in [4.0, 6.0, 8.0, 10.0, 12.0] else [8.0])
+    with sc3:
+        sweep_time = st.number_input("Süre Limiti (sn)", 5, 120, 20)
+    sweep_btn = st.button("TARAMAYI BAŞLAT")
+
+    if sweep_btn and sweep_ranges and demand_path is not None:
+        try:
+            # Tarama kuyruktaki bir işçi süreçte çalışır; arayüz bloklanmaz, yeniden çalıştırmalarda baştan başlamaz
+            job_id = get_job_queue().submit_sweep(demand_path, sites_path, k_values=range(sweep_k[0], sweep_k[1] + 1),
+                                                  ranges=sweep_ranges, time_limit=sweep_time)
+            st.session_state.sweep_job = get_job_queue().handle(job_id)
+            st.session_state.sweep_results = None
+        except Exception as e:
+            st.error(f"Hata: {e}")
+
+    @st.fragment(run_every=1.0)
+    def sweep_progress():
+        # Taramanın ilerlemesi; sadece bu parça her saniye yeniden çizilir
+        job = st.session_state.get('sweep_job')
+        if job is None:
+            return
+        prog = job.progress()
+        done, total = prog.get('done', 0), prog.get('total') or 1
+        last = prog.get('last')
+        st.progress(min(done / total, 1.0), text=f"📈 {done}/{total} senaryo çözüldü ({prog['phase']}, "
+                                                 f"{prog['elapsed_s']:.0f} sn)" +
+                    (f" — son: k={last['max_stores_to_open']}, {last['max_range_km']} km, {last['status']}" if last else ""))
+        if job.done:
+            st.session_state.sweep_job = None
+            if job.error is not None:
+                st.session_state.sweep_error = f"Hata: {job.error}"
+            st.session_state.sweep_results = job.queue.sweep_result(job.job_id)
+            st.rerun()
+        elif st.button("⏹ TARAMAYI DURDUR"):
+            job.stop()
+
+    if st.session_state.get('sweep_job') is not None:
+        sweep_progress()
+    if st.session_state.get('sweep_error'):
+        st.warning(st.session_state.pop('sweep_error'))
+
+    if st.session_state.get('sweep_results') is not None:
+        df_sweep = st.session_state.sweep_results
+        fig_sweep = px.line(
+            df_sweep.dropna(subset=['total_cost']), x='max_stores_to_open', y='total_cost', color='max_range_km',
+            markers=True, labels={'max_stores_to_open': 'Maks. Depo Sayısı', 'total_cost': 'Toplam Maliyet (₺)', 'max_range_km': 'Menzil (km)'}
+        )
+        fig_sweep.update_layout(height=320, margin=dict(l=10,r=10,t=30,b=10), paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)")
+        st.plotly_chart(fig_sweep, use_container_width=True)
+        st.dataframe(df_sweep, use_container_width=True)
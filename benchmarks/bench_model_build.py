@@ -0,0 +1,75 @@
+"""
+Model kurulum süresinin ölçek ile nasıl büyüdüğünü ölçer (çözüm yapılmaz).
+
+Kullanım:
+    python benchmarks/bench_model_build.py                 # 300x30 -> 100k x 5k
+    python benchmarks/bench_model_build.py --max-customers 10000
+
+Not: Sentetik talep hep aynı şehir alanına düştüğü için büyük örneklerde menzil
+küçültülür; böylece müşteri başına aday depo sayısı (çift yoğunluğu) makul kalır.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.data_generator import generate_demand_data, generate_candidate_sites
+from src.optimizer import LogisticsOptimizer
+
+# (müşteri, aday depo, menzil km)
+GRID = [
+    (300, 30, 8.0),
+    (3_000, 300, 2.0),
+    (10_000, 1_000, 1.0),
+    (30_000, 2_000, 0.5),
+    (100_000, 5_000, 0.25),
+]
+
+
+def make_instance(n_customers, n_sites, workdir):
+    # data/raw yapısı taklit edilir; önbellek geçici klasördeki '../cache' altına yazılır ve onunla silinir
+    raw_dir = os.path.join(workdir, 'raw')
+    os.makedirs(raw_dir, exist_ok=True)
+    df_demand = generate_demand_data(n_samples=n_customers, n_clusters=6)
+    df_sites = generate_candidate_sites(n_candidates=n_sites, demand_df=df_demand)
+    d_path = os.path.join(raw_dir, f'demand_{n_customers}.csv')
+    s_path = os.path.join(raw_dir, f'sites_{n_sites}.csv')
+    df_demand.to_csv(d_path, index=False)
+    df_sites.to_csv(s_path, index=False)
+    return d_path, s_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model kurulum ölçekleme benchmark'ı")
+    parser.add_argument('--max-customers', type=int, default=100_000)
+    parser.add_argument('--max-stores', type=int, default=5)
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_customers, n_sites, range_km in GRID:
+            if n_customers > args.max_customers:
+                continue
+            d_path, s_path = make_instance(n_customers, n_sites, workdir)
+            opt = LogisticsOptimizer(d_path, s_path)
+            opt.MAX_RANGE_KM = range_km
+
+            t0 = time.perf_counter()
+            pairs = opt.compute_pairs()
+            t1 = time.perf_counter()
+            opt.build_model(pairs, args.max_stores)
+            t2 = time.perf_counter()
+            rows.append((n_customers, n_sites, range_km, len(pairs), t1 - t0, t2 - t1))
+
+    print(f"\n{'müşteri':>8} {'depo':>6} {'menzil':>7} {'çift':>10} {'çift (s)':>9} {'kurulum (s)':>12} {'µs/çift':>8}")
+    for n_customers, n_sites, range_km, n_pairs, t_pairs, t_build in rows:
+        per_pair = 1e6 * t_build / max(n_pairs, 1)
+        print(f"{n_customers:>8} {n_sites:>6} {range_km:>7.2f} {n_pairs:>10} {t_pairs:>9.2f} {t_build:>12.2f} {per_pair:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Optimizasyon hattının aşama bazlı benchmark'ı: yükleme, çift/mesafe, model kurulumu, çözüm, sonuç yazımı.
+
+Her örnek (müşteri x depo x menzil) veri üreticisiyle oluşturulur; her aşamanın süresi ve
+tepe bellek kullanımı (tracemalloc) ölçülür, sonuçlar JSON olarak kaydedilir.
+Kaydedilmiş bir baseline ile karşılaştırılırsa yavaşlayan aşamalar işaretlenir (çıkış kodu 1).
+
+Kullanım:
+    python benchmarks/run_benchmarks.py                                   # küçük ızgara, sezgisel çözüm
+    python benchmarks/run_benchmarks.py --grid full --method milp --backend highs
+    python benchmarks/run_benchmarks.py --output base.json
+    python benchmarks/run_benchmarks.py --baseline base.json --tolerance 0.2
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.data_generator import generate_demand_data, generate_candidate_sites
+from src.optimizer import LogisticsOptimizer
+from src.results import OptimizationResult
+
+# (müşteri, aday depo, menzil km) — büyük örneklerde menzil küçültülerek çift yoğunluğu makul tutulur
+GRIDS = {
+    'small': [
+        (300, 30, 8.0),
+        (3_000, 300, 2.0),
+        (10_000, 1_000, 1.0),
+    ],
+    'full': [
+        (300, 30, 8.0),
+        (3_000, 300, 2.0),
+        (10_000, 1_000, 1.0),
+        (30_000, 2_000, 0.5),
+        (100_000, 5_000, 0.25),
+    ],
+}
+STAGES = ['load', 'pairs', 'build', 'solve', 'export']
+
+
+class StageTimer:
+    """Aşama başına süre (s) ve tepe bellek (MB) toplar."""
+
+    def __init__(self, track_memory=True):
+        self.track_memory = track_memory
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        if self.track_memory:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            peak = None
+            if self.track_memory:
+                peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                tracemalloc.stop()
+            self.stages[name] = {'time_s': round(elapsed, 4), 'peak_mb': None if peak is None else round(peak, 2)}
+
+
+def make_instance(n_customers, n_sites, workdir, seed=42):
+    # data/raw yapısı taklit edilir; save_results '../artifacts' altına yazar
+    raw_dir = os.path.join(workdir, f'{n_customers}x{n_sites}', 'raw')
+    os.makedirs(raw_dir, exist_ok=True)
+    df_demand = generate_demand_data(n_samples=n_customers, n_clusters=6, random_state=seed)
+    df_sites = generate_candidate_sites(n_candidates=n_sites, demand_df=df_demand)
+    d_path = os.path.join(raw_dir, 'demand_points.csv')
+    s_path = os.path.join(raw_dir, 'candidate_sites.csv')
+    df_demand.to_csv(d_path, index=False)
+    df_sites.to_csv(s_path, index=False)
+    return d_path, s_path
+
+
+def run_instance(n_customers, n_sites, range_km, args, workdir):
+    d_path, s_path = make_instance(n_customers, n_sites, workdir)
+    timer = StageTimer(track_memory=not args.no_memory)
+
+    with timer.stage('load'):
+        opt = LogisticsOptimizer(d_path, s_path)
+        opt.MAX_RANGE_KM = range_km
+    with timer.stage('pairs'):
+        pairs = opt.compute_pairs()
+
+    k = args.max_stores
+    if k is None:
+        # Varsayılan bütçe: toplam talebi ortalama kapasiteyle ~1.5 kat karşılayacak kadar depo
+        need = opt.df_demand['daily_orders'].sum() / opt.df_sites['capacity'].mean()
+        k = int(min(n_sites, max(5, np.ceil(1.5 * need))))
+    with timer.stage('build'):
+        if args.method == 'heuristic':
+            model = opt.build_heuristic(pairs)
+        elif args.backend == 'pulp':
+            model = opt.build_model(pairs, k)
+        else:
+            model = opt.build_matrix_model(pairs, k)
+
+    with timer.stage('solve'):
+        if args.method == 'heuristic':
+            open_mask, assigned, cost, feasible = model.solve(k, time_limit=args.time_limit)
+            status = 'Feasible' if feasible else 'Infeasible'
+            y_val, x_val = model.to_solution(open_mask, assigned, len(pairs))
+        elif args.backend == 'pulp':
+            import pulp
+            prob, y, x = model
+            prob.solve(pulp.PULP_CBC_CMD(msg=0, timeLimit=args.time_limit))
+            status, cost = pulp.LpStatus[prob.status], pulp.value(prob.objective)
+            y_val = np.array([v.varValue or 0 for v in y], dtype=np.float64)
+            x_val = np.array([v.varValue or 0 for v in x], dtype=np.float64)
+        else:
+            solve = model.solve_highs if args.backend == 'highs' else model.solve_cbc
+            status, cost, values = solve(time_limit=args.time_limit)
+            y_val, x_val = model.split(values) if values is not None else (None, None)
+
+    with timer.stage('export'):
+        if y_val is not None:
+            sites, assignments, _ = opt._collect_results(pairs, y_val, x_val)
+            opt.last_result = OptimizationResult(sites, assignments, cost, status,
+                                                 params=opt._result_params(k, args.method, args.backend),
+                                                 kpis=opt.solution_kpis(pairs, y_val, x_val))
+            opt.save_results()
+
+    return {
+        'n_customers': n_customers, 'n_sites': n_sites, 'max_range_km': range_km,
+        'max_stores_to_open': k, 'method': args.method, 'backend': args.backend,
+        'n_pairs': len(pairs), 'status': status, 'total_cost': None if cost is None else float(cost),
+        'stages': timer.stages,
+    }
+
+
+def _instance_key(r):
+    return (r['n_customers'], r['n_sites'], r['max_range_km'], r['max_stores_to_open'], r['method'], r['backend'])
+
+
+def compare(results, baseline, tolerance, min_seconds):
+    """
+    Baseline'a göre süresi (1 + tolerance) katından fazla artan aşamaları döner.
+    min_seconds altındaki mutlak farklar gürültü sayılır.
+    """
+    base = {_instance_key(r): r for r in baseline['results']}
+    regressions = []
+    for r in results:
+        old = base.get(_instance_key(r))
+        if old is None:
+            continue
+        for stage, cur in r['stages'].items():
+            prev = old['stages'].get(stage)
+            if prev is None:
+                continue
+            t_new, t_old = cur['time_s'], prev['time_s']
+            if t_new - t_old > min_seconds and t_new > t_old * (1 + tolerance):
+                regressions.append({'instance': _instance_key(r), 'stage': stage, 'baseline_s': t_old,
+                                    'current_s': t_new, 'ratio': round(t_new / max(t_old, 1e-9), 2)})
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results):
+    head = f"{'müşteri':>8} {'depo':>6} {'menzil':>7} {'çift':>10} " + ' '.join(f"{s + ' (s)':>11}" for s in STAGES)
+    print('\n' + head + f" {'tepe MB':>9} {'maliyet':>14}")
+    for r in results:
+        times = ' '.join(f"{r['stages'][s]['time_s']:>11.3f}" for s in STAGES)
+        peaks = [v['peak_mb'] for v in r['stages'].values() if v['peak_mb'] is not None]
+        peak = f"{max(peaks):>9.1f}" if peaks else f"{'-':>9}"
+        cost = f"{r['total_cost']:>14,.0f}" if r['total_cost'] is not None else f"{'-':>14}"
+        print(f"{r['n_customers']:>8} {r['n_sites']:>6} {r['max_range_km']:>7.2f} {r['n_pairs']:>10} {times} {peak} {cost}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Optimizasyon hattı aşama benchmark'ı")
+    parser.add_argument('--grid', choices=sorted(GRIDS), default='small')
+    parser.add_argument('--max-customers', type=int, default=None)
+    parser.add_argument('--max-stores', type=int, default=None, help="Varsayılan: talebe göre ölçeklenir")
+    parser.add_argument('--method', choices=['heuristic', 'milp'], default='heuristic')
+    parser.add_argument('--backend', choices=['pulp', 'highs', 'cbc_mps'], default='highs')
+    parser.add_argument('--time-limit', type=int, default=30)
+    parser.add_argument('--no-memory', action='store_true', help="tracemalloc kapalı (daha az ek yük)")
+    parser.add_argument('--output', default=None, help="JSON çıktı yolu (varsayılan: benchmarks/results/<zaman>.json)")
+    parser.add_argument('--baseline', default=None, help="Karşılaştırılacak önceki JSON")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="İzin verilen göreli yavaşlama")
+    parser.add_argument('--min-seconds', type=float, default=0.05, help="Bunun altındaki farklar yok sayılır")
+    args = parser.parse_args()
+
+    grid = [g for g in GRIDS[args.grid] if args.max_customers is None or g[0] <= args.max_customers]
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_customers, n_sites, range_km in grid:
+            print(f"\n🏁 {n_customers} müşteri x {n_sites} depo, menzil {range_km} km")
+            results.append(run_instance(n_customers, n_sites, range_km, args, workdir))
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'args': vars(args),
+        },
+        'results': results,
+    }
+    output = args.output or os.path.join(
+        BASE_DIR, 'benchmarks', 'results', datetime.datetime.now().strftime('%Y%m%d_%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print_table(results)
+    print(f"\n💾 Sonuçlar kaydedildi: {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_seconds)
+        if regressions:
+            print(f"\n⚠️ {len(regressions)} aşamada performans gerilemesi (tolerans %{100 * args.tolerance:.0f}):")
+            for r in regressions:
+                print(f"   {r['instance'][:3]} {r['stage']:>7}: {r['baseline_s']:.3f}s -> {r['current_s']:.3f}s (x{r['ratio']})")
+            sys.exit(1)
+        print("\n✅ Baseline'a göre gerileme yok.")
+
+
+if __name__ == "__main__":
+    main()
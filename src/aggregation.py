@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+try:
+    from src.distance import haversine_np
+except ImportError:  # src klasöründen doğrudan çalıştırıldığında
+    from distance import haversine_np
+
+KM_PER_DEG_LAT = 110.574
+KM_PER_DEG_LON = 111.320  # ekvatorda; enlemin kosinüsüyle ölçeklenir
+
+
+def _project_km(lat, lon):
+    """Eşdikdörtgen izdüşüm (km); şehir ölçeğinde ızgara ve k-means için yeterli doğrulukta."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    x = lon * KM_PER_DEG_LON * np.cos(np.radians(lat.mean()))
+    y = lat * KM_PER_DEG_LAT
+    return x, y
+
+
+def grid_labels(lat, lon, cell_km):
+    """Noktaları cell_km kenarlı kare hücrelere böler. Dönüş: 0..K-1 grup etiketleri."""
+    if cell_km <= 0:
+        raise ValueError("cell_km pozitif olmalı")
+    x, y = _project_km(lat, lon)
+    ix = np.floor(x / cell_km).astype(np.int64)
+    iy = np.floor(y / cell_km).astype(np.int64)
+    ix -= ix.min()
+    iy -= iy.min()
+    return np.unique(ix * (iy.max() + 1) + iy, return_inverse=True)[1]
+
+
+def kmeans_labels(lat, lon, n_clusters, weights=None, random_state=42):
+    """Sipariş ağırlıklı MiniBatchKMeans (izdüşümlü km koordinatlarında). Dönüş: 0..K-1 grup etiketleri."""
+    from sklearn.cluster import MiniBatchKMeans
+
+    x, y = _project_km(lat, lon)
+    n_clusters = int(min(n_clusters, len(x)))
+    km = MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state, batch_size=4096, n_init=1)
+    labels = km.fit_predict(np.column_stack([x, y]), sample_weight=weights)
+    # Boş kalan kümeler atlanır, etiketler sıkıştırılır
+    return np.unique(labels, return_inverse=True)[1]
+
+
+class DemandAggregation:
+    """
+    Talep noktalarının ağırlıklı süper düğümlere birleştirilmesi.
+
+    labels    : her talep noktasının süper düğüm indeksi (df_demand sırasında)
+    df_super  : süper düğüm tablosu (id, lat, lon, daily_orders, n_points, radius_km);
+                konum sipariş ağırlıklı ağırlık merkezidir
+    coords    : (2, K) [lat; lon] dizisi (LogisticsOptimizer.demand_coords ile aynı düzen)
+    offset_km : her noktanın kendi süper düğümüne uzaklığı
+
+    Üçgen eşitsizliği gereği, aynı depoya atanan bir noktanın gerçek mesafesi süper düğümün
+    mesafesinden en fazla offset_km kadar farklıdır; error_bound() taşıma maliyetindeki
+    farkın çözümden bağımsız üst sınırını verir.
+    """
+
+    def __init__(self, df_demand, demand_coords, labels, method, level):
+        self.method = method
+        self.level = level
+        self.labels = np.asarray(labels, dtype=np.int64)
+        lat = np.asarray(demand_coords[0], dtype=np.float64)
+        lon = np.asarray(demand_coords[1], dtype=np.float64)
+        orders = df_demand['daily_orders'].to_numpy(dtype=np.float64)
+        k = int(self.labels.max()) + 1 if len(self.labels) else 0
+
+        n_points = np.bincount(self.labels, minlength=k)
+        super_orders = np.bincount(self.labels, weights=orders, minlength=k)
+        # Siparişi olmayan gruplarda ağırlık merkezi yerine geometrik merkez kullanılır
+        w = np.where(super_orders[self.labels] > 0, orders, 1.0)
+        wsum = np.bincount(self.labels, weights=w, minlength=k)
+        c_lat = np.bincount(self.labels, weights=w * lat, minlength=k) / wsum
+        c_lon = np.bincount(self.labels, weights=w * lon, minlength=k) / wsum
+
+        self.offset_km = haversine_np(lat, lon, c_lat[self.labels], c_lon[self.labels])
+        radius = np.zeros(k)
+        np.maximum.at(radius, self.labels, self.offset_km)
+        self.orders = orders
+        self.coords = np.vstack([c_lat, c_lon])
+        self.df_super = pd.DataFrame({
+            'id': np.arange(k), 'lat': c_lat, 'lon': c_lon, 'daily_orders': super_orders,
+            'n_points': n_points, 'radius_km': radius,
+        })
+
+    @property
+    def n_points(self):
+        return len(self.labels)
+
+    @property
+    def n_super(self):
+        return len(self.df_super)
+
+    def aggregate(self, values):
+        """Nokta bazlı (N,) veya (N, T) talebi süper düğümlere toplar."""
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            return np.bincount(self.labels, weights=values, minlength=self.n_super)
+        return np.stack([self.aggregate(col) for col in values.T], axis=1)
+
+    def error_bound(self, cost_per_km, orders=None):
+        """Birleştirmenin taşıma maliyetinde yaratabileceği en büyük fark (TL), çözmeden önce bilinir."""
+        orders = self.orders if orders is None else np.asarray(orders, dtype=np.float64)
+        return float(cost_per_km * (orders * self.offset_km).sum())
+
+    def summary(self):
+        return {
+            'method': self.method, 'level': self.level, 'n_points': self.n_points, 'n_super': self.n_super,
+            'compression': self.n_points / max(self.n_super, 1),
+            'mean_offset_km': float(np.average(self.offset_km, weights=self.orders))
+            if self.orders.sum() > 0 else float(self.offset_km.mean()),
+            'max_radius_km': float(self.df_super['radius_km'].max()) if self.n_super else 0.0,
+        }
+
+
+def aggregate_demand(df_demand, demand_coords, method='grid', cell_km=0.5, n_clusters=None, random_state=42):
+    """
+    Talep noktalarını süper düğümlere birleştirir (bkz. DemandAggregation).
+
+    method: 'grid'    -> cell_km kenarlı kare ızgara (birleştirme seviyesi = hücre boyu)
+            'kmeans'  -> n_clusters süper düğüm, sipariş ağırlıklı k-means
+            'cluster' -> verideki cluster_id kolonu (en kaba seviye)
+    """
+    lat, lon = demand_coords[0], demand_coords[1]
+    if method == 'grid':
+        labels, level = grid_labels(lat, lon, cell_km), float(cell_km)
+    elif method == 'kmeans':
+        if not n_clusters:
+            raise ValueError("method='kmeans' için n_clusters verilmeli")
+        labels = kmeans_labels(lat, lon, n_clusters, df_demand['daily_orders'].to_numpy(dtype=np.float64),
+                               random_state)
+        level = int(n_clusters)
+    elif method == 'cluster':
+        if 'cluster_id' not in df_demand.columns:
+            raise ValueError("Talep verisinde cluster_id kolonu yok")
+        labels, level = np.unique(df_demand['cluster_id'].to_numpy(), return_inverse=True)[1], 'cluster_id'
+    else:
+        raise ValueError(f"Bilinmeyen birleştirme yöntemi: {method}")
+    return DemandAggregation(df_demand, demand_coords, labels, method, level)
@@ -1,7 +1,11 @@
 import pandas as pd
 import numpy as np
 from sklearn.datasets import make_blobs
+import argparse
 import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
 # --- AYARLAR ---
 # İstanbul Anadolu Yakası (Kabaca Kadıköy - Ataşehir - Ümraniye üçgeni)
@@ -16,6 +20,7 @@ def generate_demand_data(n_samples=200, n_clusters=5, random_state=42):
     n_clusters: Bu noktalar kaç farklı mahallede/öbekte toplansın?
     """
     print("📍 Müşteri talep noktaları üretiliyor...")
+    rng = np.random.default_rng(random_state)
     
     # 1. Kümeleme ile koordinat üretimi (Gerçekçi nüfus dağılımı için)
     coords, cluster_labels = make_blobs(
@@ -39,34 +44,58 @@ def generate_demand_data(n_samples=200, n_clusters=5, random_state=42):
         'lat': lats,
         'lon': lons,
         'cluster_id': cluster_labels, # Hangi mahallede olduğu
-        'daily_orders': np.random.randint(5, 50, size=n_samples), # Günlük 5-50 sipariş arası
-        'avg_basket_size': np.random.normal(150, 30, size=n_samples).round(2) # Ort. 150 TL sepet
+        'daily_orders': rng.integers(5, 50, size=n_samples), # Günlük 5-50 sipariş arası
+        # Ort. 150 TL sepet; eksi/çok düşük değerler 50 TL'ye sabitlenir
+        'avg_basket_size': np.maximum(rng.normal(150, 30, size=n_samples).round(2), 50)
     })
     
-    # Eksi değerleri temizle (Sepet tutarı negatif olamaz)
-    df['avg_basket_size'] = df['avg_basket_size'].apply(lambda x: max(x, 50))
-    
     print(f"✅ {n_samples} adet talep noktası üretildi.")
     return df
 
-def generate_candidate_sites(n_candidates=20, demand_df=None, random_state=101):
+# Gün içi sipariş dağılımı (sabah, öğle, öğleden sonra, akşam); akşam zirvesi kapasiteyi belirler
+TIME_BUCKETS = {'sabah': 0.15, 'ogle': 0.25, 'ogleden_sonra': 0.20, 'aksam': 0.40}
+
+def generate_period_demand(df_demand, shares=None, n_scenarios=1, cv=0.25, random_state=7):
+    """
+    daily_orders'ı gün içi dilimlere (ve istenirse stokastik senaryolara) böler.
+    shares: dilim -> günlük siparişteki pay (varsayılan TIME_BUCKETS)
+    n_scenarios > 1 ise her senaryoda talep, ortalaması 1 ve değişim katsayısı `cv` olan
+    gamma çarpanıyla (nokta ve dilim bazında) bozulur; kolonlar '<senaryo>_<dilim>' olur.
+    Dönüş: 'id' + dönem kolonları (LogisticsOptimizer.set_demand_periods ile kullanılır)
+    """
+    shares = shares or TIME_BUCKETS
+    rng = np.random.default_rng(random_state)
+    base = df_demand['daily_orders'].to_numpy(dtype=np.float64)[:, None] * np.array(list(shares.values()))[None, :]
+    if n_scenarios <= 1:
+        return pd.concat([df_demand[['id']].reset_index(drop=True),
+                          pd.DataFrame(base.round(2), columns=list(shares))], axis=1)
+    k = 1.0 / cv ** 2
+    noise = rng.gamma(k, 1.0 / k, size=(n_scenarios,) + base.shape)
+    demand = (base[None] * noise).round(2)  # (senaryo, nokta, dilim)
+    cols = [f"s{s}_{b}" for s in range(n_scenarios) for b in shares]
+    return pd.concat([df_demand[['id']].reset_index(drop=True),
+                      pd.DataFrame(demand.transpose(1, 0, 2).reshape(len(df_demand), -1), columns=cols)], axis=1)
+
+def generate_candidate_sites(n_candidates=20, demand_df=None, random_state=101, bounds=None):
     """
     Potansiyel depo yerleri üretir.
     Mantık: Müşterilerin yoğun olduğu yerlerin aralarına ve biraz dışına rastgele noktalar atar.
+    bounds: (min_lat, max_lat, min_lon, max_lon); akış modunda talep verisi belleğe alınmadığı için kullanılır.
     """
     print("🏭 Aday depo lokasyonları belirleniyor...")
     
-    if demand_df is None:
-        raise ValueError("Önce talep verisi üretilmelidir.")
+    if bounds is None:
+        if demand_df is None:
+            raise ValueError("Önce talep verisi üretilmelidir.")
+        bounds = (demand_df['lat'].min(), demand_df['lat'].max(), demand_df['lon'].min(), demand_df['lon'].max())
+    min_lat, max_lat, min_lon, max_lon = bounds
     
-    min_lat, max_lat = demand_df['lat'].min(), demand_df['lat'].max()
-    min_lon, max_lon = demand_df['lon'].min(), demand_df['lon'].max()
-    
-    np.random.seed(random_state)
+    # Global np.random durumuna dokunmayan yerel üreteç (np.random.seed ile aynı dizi)
+    rs = np.random.RandomState(random_state)
     
     # Rastgele koordinatlar
-    lats = np.random.uniform(min_lat, max_lat, n_candidates)
-    lons = np.random.uniform(min_lon, max_lon, n_candidates)
+    lats = rs.uniform(min_lat, max_lat, n_candidates)
+    lons = rs.uniform(min_lon, max_lon, n_candidates)
     
     # Depo Özellikleri (IE & Finans Kısmı)
     # Kira: Merkeze yaklaştıkça artmalı (Basit bir simülasyon)
@@ -75,7 +104,7 @@ def generate_candidate_sites(n_candidates=20, demand_df=None, random_state=101):
     rent_costs = base_rent + (1 / (dist_to_center + 0.01)) * 500 # Merkeze yakınsa kira artar
     
     # Kapasite: Büyük depoların kirası daha yüksek olur varsayımı
-    capacities = np.random.choice([1000, 1500, 2000, 3000], size=n_candidates)
+    capacities = rs.choice([1000, 1500, 2000, 3000], size=n_candidates)
     
     # Kirayı kapasiteye göre de düzelt
     rent_costs = rent_costs + (capacities * 5) 
@@ -86,26 +115,102 @@ def generate_candidate_sites(n_candidates=20, demand_df=None, random_state=101):
         'lon': lons,
         'rent_cost': rent_costs.round(-2), # Son iki haneyi yuvarla
         'capacity': capacities,
-        'setup_cost': np.random.choice([150000, 200000], size=n_candidates) # Kurulum maliyeti
+        'setup_cost': rs.choice([150000, 200000], size=n_candidates) # Kurulum maliyeti
     })
     
     print(f"✅ {n_candidates} adet aday depo yeri üretildi.")
     return df
 
+def _demand_chunk(args):
+    """
+    Akış modunun tek parçası: kendi SeedSequence çocuğundan türeyen Generator ile üretilir ve
+    doğrudan diske yazılır. Dönüş: (dosya yolu, [min_lat, max_lat, min_lon, max_lon])
+    """
+    path, start, size, centers, seed_seq = args
+    rng = np.random.default_rng(seed_seq)
+    labels = rng.integers(0, len(centers), size=size)
+    coords = centers[labels] + rng.normal(0.0, STD_DEV * 0.4, size=(size, 2))
+    df = pd.DataFrame({
+        'id': np.arange(start + 1, start + size + 1),
+        'lat': coords[:, 0] + CENTER_LAT,
+        'lon': coords[:, 1] + CENTER_LON,
+        'cluster_id': labels,
+        'daily_orders': rng.integers(5, 50, size=size),
+        'avg_basket_size': np.maximum(rng.normal(150, 30, size=size).round(2), 50)
+    })
+    df.to_csv(path, index=False, header=False)
+    return path, [df['lat'].min(), df['lat'].max(), df['lon'].min(), df['lon'].max()]
+
+
+def generate_demand_stream(output_path, n_samples=1_000_000, n_clusters=50, chunk_size=500_000,
+                           random_state=42, n_jobs=None):
+    """
+    Milyonlarca satırlık talep verisini parça parça üretip doğrudan CSV'ye yazar (bellek ~ chunk_size * n_jobs).
+
+    Küme merkezleri kök tohumdan, her parça ise SeedSequence(random_state).spawn ile türetilen bağımsız
+    bir akıştan üretilir. Çıktı sadece (n_samples, n_clusters, chunk_size, random_state)'e bağlıdır;
+    süreç sayısı (n_jobs) sonucu değiştirmez.
+    Dönüş: (min_lat, max_lat, min_lon, max_lon) -> generate_candidate_sites(bounds=...) için
+    """
+    print(f"📍 {n_samples:,} talep noktası akış modunda üretiliyor (parça: {chunk_size:,})...")
+    root = np.random.SeedSequence(random_state)
+    center_seq, chunk_root = root.spawn(2)
+    centers = np.random.default_rng(center_seq).uniform(-STD_DEV, STD_DEV, size=(n_clusters, 2))
+
+    starts = list(range(0, n_samples, chunk_size))
+    seeds = chunk_root.spawn(len(starts))
+    tmp_dir = tempfile.mkdtemp(prefix='demand_', dir=os.path.dirname(os.path.abspath(output_path)))
+    tasks = [(os.path.join(tmp_dir, f'part-{i:05d}.csv'), start, min(chunk_size, n_samples - start), centers, seq)
+             for i, (start, seq) in enumerate(zip(starts, seeds))]
+    try:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(_demand_chunk, tasks))
+
+        # Parçalar sırayla tek dosyada birleştirilir (akış kopyası, belleğe alınmaz)
+        with open(output_path, 'w', newline='') as out:
+            out.write('id,lat,lon,cluster_id,daily_orders,avg_basket_size\n')
+            for path, _ in results:
+                with open(path) as part:
+                    shutil.copyfileobj(part, out, 1 << 20)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    b = np.array([r[1] for r in results])
+    print(f"✅ {n_samples:,} adet talep noktası yazıldı: {output_path}")
+    return b[:, 0].min(), b[:, 1].max(), b[:, 2].min(), b[:, 3].max()
+
 if __name__ == "__main__":
     # --- PROJE KLASÖRÜNÜ BUL ---
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    output_dir = os.path.join(base_dir, 'data', 'raw')
+    
+    parser = argparse.ArgumentParser(description="Sentetik talep ve aday depo verisi üretir.")
+    parser.add_argument('--n-samples', type=int, default=300)
+    parser.add_argument('--n-clusters', type=int, default=6)
+    parser.add_argument('--n-candidates', type=int, default=30)
+    parser.add_argument('--stream', action='store_true', help="Büyük veri için parça parça, paralel üretim")
+    parser.add_argument('--chunk-size', type=int, default=500_000)
+    parser.add_argument('--n-jobs', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output-dir', default=os.path.join(base_dir, 'data', 'raw'))
+    args = parser.parse_args()
+    output_dir = args.output_dir
     
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
     # 1. Talep Verisi Üret
-    df_demand = generate_demand_data(n_samples=300, n_clusters=6)
-    df_demand.to_csv(os.path.join(output_dir, 'demand_points.csv'), index=False)
+    if args.stream:
+        bounds = generate_demand_stream(os.path.join(output_dir, 'demand_points.csv'), n_samples=args.n_samples,
+                                        n_clusters=args.n_clusters, chunk_size=args.chunk_size,
+                                        random_state=args.seed, n_jobs=args.n_jobs)
+        df_demand = None
+    else:
+        df_demand = generate_demand_data(n_samples=args.n_samples, n_clusters=args.n_clusters, random_state=args.seed)
+        df_demand.to_csv(os.path.join(output_dir, 'demand_points.csv'), index=False)
+        bounds = None
     
     # 2. Aday Depo Verisi Üret
-    df_sites = generate_candidate_sites(n_candidates=30, demand_df=df_demand)
+    df_sites = generate_candidate_sites(n_candidates=args.n_candidates, demand_df=df_demand, bounds=bounds)
     df_sites.to_csv(os.path.join(output_dir, 'candidate_sites.csv'), index=False)
     
-    print("\n🎉 Veri üretim süreci tamamlandı! 'data/raw' klasörünü kontrol et.")
\ No newline at end of file
+    print(f"\n🎉 Veri üretim süreci tamamlandı! '{output_dir}' klasörünü kontrol et.")
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow yoksa CSV'den okumaya devam edilir
+    pa = None
+
+# Önbellek formatı değişirse artırılır; eski önbellekler otomatik yeniden üretilir
+SCHEMA_VERSION = 1
+
+# Zorunlu kolonlar ve türleri: 'f' ondalık, 'i' tamsayı, 'O' metin
+SCHEMAS = {
+    'demand': {'id': 'i', 'lat': 'f', 'lon': 'f', 'daily_orders': 'i'},
+    'sites': {'site_id': 'O', 'lat': 'f', 'lon': 'f', 'rent_cost': 'f', 'capacity': 'i'},
+}
+
+
+def cache_dir_for(csv_path):
+    """Ham CSV'nin önbellek klasörü: data/raw/x.csv -> data/cache/"""
+    return os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(csv_path)), '..', 'cache'))
+
+
+def source_cache_dir(csv_path, cache_dir=None):
+    """
+    Bir CSV'nin kendi önbellek klasörü: <önbellek>/<ad>-<yol özeti>/. Yol özeti sayesinde farklı
+    klasörlerdeki aynı isimli CSV'ler birbirinin önbelleğini ezmez.
+    """
+    digest = hashlib.sha1(os.path.abspath(csv_path).encode()).hexdigest()[:12]
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(cache_dir or cache_dir_for(csv_path), f"{name}-{digest}")
+
+
+def _source_stamp(csv_path):
+    st = os.stat(csv_path)
+    return {'source': os.path.abspath(csv_path), 'mtime_ns': st.st_mtime_ns, 'size': st.st_size,
+            'schema_version': SCHEMA_VERSION}
+
+
+def validate_schema(df, kind):
+    """
+    Zorunlu kolonların varlığını ve türünü kontrol eder; koordinatları float64'e çevirir.
+    Eksik veya sayısal olmayan kolonda ValueError fırlatır.
+    """
+    schema = SCHEMAS[kind]
+    missing = [c for c in schema if c not in df.columns]
+    if missing:
+        raise ValueError(f"{kind} verisinde eksik kolon(lar): {', '.join(missing)}")
+    for col, typ in schema.items():
+        if typ in 'fi' and not pd.api.types.is_numeric_dtype(df[col]):
+            raise ValueError(f"{kind} verisinde '{col}' kolonu sayısal olmalı (bulunan: {df[col].dtype})")
+    if df[['lat', 'lon']].isna().any().any():
+        raise ValueError(f"{kind} verisinde boş koordinat var")
+    return df.astype({'lat': np.float64, 'lon': np.float64})
+
+
+def _read_csv(csv_path):
+    if pa is None:
+        return pd.read_csv(csv_path)
+    # pyarrow'un çok iş parçacıklı CSV okuyucusu büyük dosyalarda pd.read_csv'den belirgin şekilde hızlıdır
+    return pa_csv.read_csv(csv_path).to_pandas()
+
+
+def _atomic_write(path, writer):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    writer(tmp)
+    os.replace(tmp, path)
+
+
+def _save_npy(path, arr):
+    with open(path, 'wb') as f:
+        np.save(f, arr)
+
+
+def _save_json(path, obj):
+    with open(path, 'w') as f:
+        json.dump(obj, f)
+
+
+def _stem(csv_path, cache_dir=None):
+    return os.path.join(source_cache_dir(csv_path, cache_dir), os.path.splitext(os.path.basename(csv_path))[0])
+
+
+def convert(csv_path, kind, cache_dir=None):
+    """
+    CSV'yi bir kez okuyup tür kontrolünden geçirir ve kaynağın önbellek klasörüne (bkz. source_cache_dir) yazar:
+        <ad>.feather     : sıkıştırmasız Arrow IPC tablo (bellek eşlemeli okunur)
+        <ad>.coords.npy  : (2, N) float64 [lat; lon] dizisi (np.load mmap_mode='r' ile paylaşılır)
+        <ad>.meta.json   : kaynak CSV'nin mtime/boyut damgası
+    Üç dosya geçici bir klasöre yazılıp klasör tek seferde yerine taşınır; eşzamanlı dönüştürmeler
+    bir kaynağın tablosunu başka bir sürümün koordinatlarıyla eşleştiremez.
+    """
+    final_dir = source_cache_dir(csv_path, cache_dir)
+    os.makedirs(os.path.dirname(final_dir), exist_ok=True)
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+
+    df = validate_schema(_read_csv(csv_path), kind)
+    coords = np.ascontiguousarray(df[['lat', 'lon']].to_numpy(dtype=np.float64).T)
+    tmp_dir = f"{final_dir}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+    os.makedirs(tmp_dir)
+    try:
+        stem = os.path.join(tmp_dir, name)
+        if pa is not None:
+            feather.write_feather(df.reset_index(drop=True), stem + '.feather', compression='uncompressed')
+        _save_npy(stem + '.coords.npy', coords)
+        meta = _source_stamp(csv_path)
+        meta.update({'kind': kind, 'rows': len(df)})
+        _save_json(stem + '.meta.json', meta)
+        # Eski sürüm kenara alınır, yenisi tek rename ile yerine geçer (açık bellek eşlemeleri etkilenmez)
+        old_dir = None
+        if os.path.exists(final_dir):
+            old_dir = f"{tmp_dir}.old"
+            try:
+                os.rename(final_dir, old_dir)
+            except FileNotFoundError:  # başka bir süreç aynı anda taşıdı
+                old_dir = None
+        try:
+            os.rename(tmp_dir, final_dir)
+        except OSError:  # başka bir süreç aynı kaynağı önce yerleştirdi; onunki kullanılır
+            pass
+        if old_dir is not None:
+            shutil.rmtree(old_dir, ignore_errors=True)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return os.path.join(final_dir, name)
+
+
+def _is_fresh(stem, csv_path):
+    try:
+        with open(stem + '.meta.json') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    stamp = _source_stamp(csv_path)
+    files = [stem + '.coords.npy'] + ([stem + '.feather'] if pa is not None else [])
+    return all(meta.get(k) == v for k, v in stamp.items()) and all(os.path.exists(p) for p in files)
+
+
+def load_table(csv_path, kind, cache_dir=None):
+    """
+    Talep ('demand') veya aday depo ('sites') verisini önbellekten okur.
+    Önbellek yoksa ya da kaynak CSV değişmişse (mtime/boyut) yeniden dönüştürülür.
+    .feather / .pkl yolu verilirse ingest.ingest_csv çıktısı olarak doğrudan okunur.
+    Dönüş: (DataFrame, koordinatlar) -> koordinatlar (2, N) salt-okunur bellek eşlemeli dizi [lat; lon]
+    """
+    stem, ext = os.path.splitext(csv_path)
+    if ext in ('.feather', '.pkl'):  # ingest.ingest_csv ile doğrulanıp yazılmış yükleme
+        if ext == '.feather' and pa is None:
+            raise ImportError(f"{os.path.basename(csv_path)} bir Arrow tablosu; okumak için pyarrow gerekli")
+        df = feather.read_table(csv_path, memory_map=True).to_pandas() if ext == '.feather' else pd.read_pickle(csv_path)
+        return df, np.load(stem + '.coords.npy', mmap_mode='r')
+
+    stem = _stem(csv_path, cache_dir)
+    if not _is_fresh(stem, csv_path):
+        try:
+            stem = convert(csv_path, kind, cache_dir)
+        except OSError:  # önbellek klasörü yazılamıyorsa doğrudan CSV'den çalışılır
+            df = validate_schema(pd.read_csv(csv_path), kind)
+            return df, np.ascontiguousarray(df[['lat', 'lon']].to_numpy(dtype=np.float64).T)
+
+    if pa is not None:
+        df = feather.read_table(stem + '.feather', memory_map=True).to_pandas()
+    else:
+        df = validate_schema(pd.read_csv(csv_path), kind)
+    coords = np.load(stem + '.coords.npy', mmap_mode='r')
+    return df, coords
@@ -0,0 +1,162 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0  # Dünya yarıçapı (km)
+
+# Bir blokta aynı anda tutulacak maksimum mesafe hücresi sayısı.
+# 2^18 hücre float64 ile ~2 MB eder, yani L2/L3 önbelleğine sığar.
+DEFAULT_BLOCK_CELLS = 2 ** 18
+
+
+def haversine_np(lat1, lon1, lat2, lon2):
+    """
+    Vektörel haversine: derece cinsinden koordinat dizileri (broadcast edilebilir) alır, km döner.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    dphi = lat2 - lat1
+    dlambda = lon2 - lon1
+    a = np.sin(dphi / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class ValidPairs:
+    """
+    Menzil kısıtına uyan (müşteri, depo) çiftlerinin seyrek (COO) gösterimi.
+
+    cust, site : pozisyonel indeksler (df.iloc sırası), müşteriye göre sıralı
+    dist       : çiftin mesafesi (km)
+    Müşteriye göre sıralı olduğu için `indptr` ile doğrudan CSR olarak da kullanılabilir.
+    """
+
+    def __init__(self, cust, site, dist, n_customers, n_sites):
+        self.cust = np.asarray(cust, dtype=np.int64)
+        self.site = np.asarray(site, dtype=np.int64)
+        self.dist = np.asarray(dist)
+        self.n_customers = int(n_customers)
+        self.n_sites = int(n_sites)
+
+    def __len__(self):
+        return len(self.cust)
+
+    @property
+    def indptr(self):
+        """CSR satır göstergesi: müşteri i'nin çiftleri pairs[indptr[i]:indptr[i+1]]."""
+        counts = np.bincount(self.cust, minlength=self.n_customers)
+        return np.concatenate([[0], np.cumsum(counts)])
+
+    def select(self, keep):
+        """Boolean maskesiyle seçilen çiftler (müşteri sırası korunur)."""
+        return ValidPairs(self.cust[keep], self.site[keep], self.dist[keep], self.n_customers, self.n_sites)
+
+    def components(self):
+        """
+        Müşteri-depo uyumluluk grafiğinin (iki parçalı) bağlı bileşenleri.
+        Dönüş: (bileşen sayısı, müşteri etiketleri, depo etiketleri); çifti olmayan müşteri/depolar tek başına bileşendir.
+        """
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+
+        n = self.n_customers + self.n_sites
+        graph = coo_matrix((np.ones(len(self), dtype=np.int8), (self.cust, self.n_customers + self.site)),
+                           shape=(n, n))
+        n_comp, labels = connected_components(graph, directed=False)
+        return n_comp, labels[:self.n_customers], labels[self.n_customers:]
+
+    def to_csr(self):
+        """scipy.sparse.csr_matrix (müşteri x depo) olarak döner. 0 km'lik çiftler açık sıfır olarak korunur."""
+        from scipy.sparse import csr_matrix
+        return csr_matrix((self.dist, self.site, self.indptr), shape=(self.n_customers, self.n_sites))
+
+
+def compute_valid_pairs(cust_lat, cust_lon, site_lat, site_lon, max_range_km,
+                        dtype=np.float64, block_cells=DEFAULT_BLOCK_CELLS):
+    """
+    Müşteri x depo mesafelerini önbellek boyutlu bloklar halinde hesaplar ve
+    `max_range_km` kesmesini hesap sırasında uygular. Yoğun N x M matris hiç oluşmaz;
+    bellekte en fazla bir blok (block_cells hücre) tutulur.
+
+    dtype: float32 seçilirse blok hesapları ve dönen mesafeler float32 olur (bellek yarıya iner).
+    """
+    cust_lat = np.radians(np.asarray(cust_lat, dtype=np.float64))
+    cust_lon = np.radians(np.asarray(cust_lon, dtype=np.float64))
+    site_lat = np.radians(np.asarray(site_lat, dtype=np.float64))
+    site_lon = np.radians(np.asarray(site_lon, dtype=np.float64))
+    n, m = len(cust_lat), len(site_lat)
+
+    # Depo tarafı sabit: cos(lat) bir kez hesaplanır
+    s_lat = site_lat.astype(dtype)[None, :]
+    s_lon = site_lon.astype(dtype)[None, :]
+    s_cos = np.cos(site_lat).astype(dtype)[None, :]
+
+    # haversine'in monotonluğu sayesinde kesme, arcsin'e girmeden 'a' üzerinde yapılır
+    a_max = np.sin(min(max_range_km / EARTH_RADIUS_KM, np.pi) / 2) ** 2
+
+    rows = max(1, block_cells // max(m, 1))
+    out_cust, out_site, out_dist = [], [], []
+    for start in range(0, n, rows):
+        stop = min(start + rows, n)
+        c_lat = cust_lat[start:stop].astype(dtype)[:, None]
+        c_lon = cust_lon[start:stop].astype(dtype)[:, None]
+        c_cos = np.cos(cust_lat[start:stop]).astype(dtype)[:, None]
+
+        a = np.sin((s_lat - c_lat) / 2) ** 2 + c_cos * s_cos * np.sin((s_lon - c_lon) / 2) ** 2
+        ii, jj = np.nonzero(a <= a_max)
+        if len(ii) == 0:
+            continue
+        a_valid = np.clip(a[ii, jj], 0.0, 1.0)
+        out_cust.append(ii + start)
+        out_site.append(jj)
+        out_dist.append((2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a_valid))).astype(dtype))
+
+    if out_cust:
+        return ValidPairs(np.concatenate(out_cust), np.concatenate(out_site), np.concatenate(out_dist), n, m)
+    return ValidPairs(np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, dtype), n, m)
+
+
+class SiteIndex:
+    """
+    Aday depolar üzerinde haversine BallTree (scikit-learn) uzamsal indeksi.
+    Her müşteri için sadece menzil içindeki depoları bulur: çift üretimi O(N·M) yerine ~O(N log M).
+    İndeks depo seti başına bir kez kurulur; sadece menzil değiştiğinde yeniden kullanılır.
+    """
+
+    def __init__(self, site_lat, site_lon, leaf_size=40):
+        from sklearn.neighbors import BallTree
+
+        self.site_lat = np.asarray(site_lat, dtype=np.float64)
+        self.site_lon = np.asarray(site_lon, dtype=np.float64)
+        self.n_sites = len(self.site_lat)
+        self.tree = BallTree(np.radians(np.column_stack([self.site_lat, self.site_lon])),
+                             metric='haversine', leaf_size=leaf_size)
+
+    def query_pairs(self, cust_lat, cust_lon, max_range_km, dtype=np.float64, chunk_size=50_000):
+        """
+        Menzil içindeki (müşteri, depo) çiftlerini ValidPairs olarak döner.
+        Müşteriler chunk_size'lık parçalar halinde sorgulanır, böylece ara listeler sınırlı kalır.
+        """
+        cust_lat = np.asarray(cust_lat, dtype=np.float64)
+        cust_lon = np.asarray(cust_lon, dtype=np.float64)
+        n = len(cust_lat)
+        radius = max_range_km / EARTH_RADIUS_KM
+
+        out_cust, out_site, out_dist = [], [], []
+        for start in range(0, n, chunk_size):
+            stop = min(start + chunk_size, n)
+            X = np.radians(np.column_stack([cust_lat[start:stop], cust_lon[start:stop]]))
+            ind, dist = self.tree.query_radius(X, r=radius, return_distance=True, sort_results=False)
+            counts = np.fromiter((len(a) for a in ind), dtype=np.int64, count=len(ind))
+            if counts.sum() == 0:
+                continue
+            out_cust.append(np.repeat(np.arange(start, stop, dtype=np.int64), counts))
+            out_site.append(np.concatenate(ind).astype(np.int64))
+            out_dist.append((np.concatenate(dist) * EARTH_RADIUS_KM).astype(dtype))
+
+        if not out_cust:
+            return ValidPairs(np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, dtype), n, self.n_sites)
+
+        cust, site, dist = np.concatenate(out_cust), np.concatenate(out_site), np.concatenate(out_dist)
+        # BallTree sınırda kayan nokta farkı yapabilir; kesmeyi aynı ölçütle yeniden uygula
+        keep = dist <= max_range_km
+        cust, site, dist = cust[keep], site[keep], dist[keep]
+        # Müşteri içinde depo sırasına diz (yoğun motorla aynı sıra)
+        order = np.lexsort((site, cust))
+        return ValidPairs(cust[order], site[order], dist[order], n, self.n_sites)
@@ -0,0 +1,107 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    from src.results import OptimizationResult
+except ImportError:  # src klasöründen doğrudan çalıştırıldığında
+    from results import OptimizationResult
+
+
+class NetworkEvaluator:
+    """
+    Sabit bir depo ağı için hızlı "ya şöyle olsaydı" (what-if) değerlendirmesi; MILP çözülmez.
+
+    Müşteri başına mesafeye göre sıralı depo listeleri ve depo başına müşteri listeleri
+    (HeuristicSolver) bir kez kurulur. evaluate() verilen ağ için kapasiteli atamayı baştan yapar;
+    toggle() tek bir depoyu açıp kapatırken sadece etkilenen müşterileri yeniden yerleştirir
+    (bkz. HeuristicSolver.open_site / close_site).
+    """
+
+    def __init__(self, optimizer, open_site_ids=None, pairs=None):
+        self.optimizer = optimizer
+        self.pairs = pairs if pairs is not None else optimizer.compute_pairs()
+        self.solver = optimizer.build_heuristic(self.pairs)
+        self.site_ids = optimizer.df_sites['site_id'].to_numpy()
+        self._site_pos = pd.Index(self.site_ids)
+        self.params = {'max_range_km': float(optimizer.MAX_RANGE_KM), 'cost_per_km': float(optimizer.COST_PER_KM),
+                       'method': 'evaluate'}
+        self.last_eval_ms = None
+        self.evaluate(open_site_ids if open_site_ids is not None else [])
+
+    def _mask(self, site_ids):
+        pos = self._site_pos.get_indexer(list(site_ids))
+        if (pos < 0).any():
+            missing = [s for s, p in zip(site_ids, pos) if p < 0]
+            raise KeyError(f"Bilinmeyen depo kodu: {', '.join(map(str, missing))}")
+        mask = np.zeros(len(self.site_ids), dtype=bool)
+        mask[pos] = True
+        return mask
+
+    @property
+    def open_site_ids(self):
+        return self.site_ids[self.open_mask].tolist()
+
+    def evaluate(self, open_site_ids):
+        """Verilen depo kümesi için tam değerlendirme (atama + kaydırma). Dönüş: kpis()"""
+        t0 = time.perf_counter()
+        self.open_mask = self._mask(open_site_ids)
+        assigned, load = self.solver.assign(self.open_mask)
+        self.assigned, self.load = self.solver.shift(self.open_mask, assigned, load)
+        self.last_eval_ms = (time.perf_counter() - t0) * 1000
+        return self.kpis()
+
+    def toggle(self, site_id):
+        """Tek bir depoyu açar/kapatır (artımlı güncelleme). Dönüş: kpis()"""
+        t0 = time.perf_counter()
+        j = int(self._site_pos.get_loc(site_id))
+        step = self.solver.close_site if self.open_mask[j] else self.solver.open_site
+        self.open_mask, self.assigned, self.load = step(self.open_mask, self.assigned, self.load, j)
+        # Boşalan/açılan kapasite için daha yakın depoya kaydırma (vektörel, birkaç tur)
+        self.assigned, self.load = self.solver.shift(self.open_mask, self.assigned, self.load)
+        self.last_eval_ms = (time.perf_counter() - t0) * 1000
+        return self.kpis()
+
+    def swap(self, close_id, open_id):
+        """Bir depoyu kapatıp diğerini açar ("D-120'yi kapat, D-107'yi aç")."""
+        t0 = time.perf_counter()
+        if self.open_mask[self._site_pos.get_loc(close_id)]:
+            self.toggle(close_id)
+        if not self.open_mask[self._site_pos.get_loc(open_id)]:
+            self.toggle(open_id)
+        self.last_eval_ms = (time.perf_counter() - t0) * 1000
+        return self.kpis()
+
+    def kpis(self):
+        """Mevcut ağın maliyet kırılımı ve hizmet göstergeleri."""
+        h = self.solver
+        served = self.assigned >= 0
+        ks = self.assigned[served]
+        orders = h.pair_orders[ks]
+        unserved = h.servable & ~served
+        rent = float(h.rent[self.open_mask].sum())
+        transport = float(h.cost[ks].sum())
+        return {
+            'total_cost': rent + transport,
+            'rent_cost': rent,
+            'transport_cost': transport,
+            'n_open': int(self.open_mask.sum()),
+            'served_customers': int(served.sum()),
+            'unserved_customers': int(unserved.sum()),
+            'avg_distance_km': float(h.dist[ks].mean()) if len(ks) else 0.0,
+            'weighted_distance_km': float((h.dist[ks] * orders).sum() / orders.sum()) if orders.sum() else 0.0,
+            'max_utilization': float((self.load[self.open_mask] / h.capacity[self.open_mask]).max())
+            if self.open_mask.any() else 0.0,
+            'eval_ms': self.last_eval_ms,
+        }
+
+    def to_result(self):
+        """Mevcut ağı OptimizationResult olarak döner (harita ve tablolar aynı kodla çizilir)."""
+        y_val, x_val = self.solver.to_solution(self.open_mask, self.assigned, len(self.pairs))
+        sites, assignments, _ = self.optimizer._collect_results(self.pairs, y_val, x_val)
+        k = self.kpis()
+        status = 'Feasible' if k['unserved_customers'] == 0 else 'Infeasible'
+        return OptimizationResult(sites, assignments, k['total_cost'], status,
+                                  params=dict(self.params, max_stores_to_open=k['n_open']),
+                                  kpis=self.optimizer.solution_kpis(self.pairs, y_val, x_val))
@@ -0,0 +1,321 @@
+import time
+
+import numpy as np
+
+
+def _group_starts(keys):
+    """Sıralı bir anahtar dizisinde her grubun ilk elemanının indeksini her elemana yayar."""
+    is_start = np.r_[True, keys[1:] != keys[:-1]] if len(keys) else np.empty(0, dtype=bool)
+    return np.maximum.accumulate(np.where(is_start, np.arange(len(keys)), 0))
+
+
+def _grouped_cumsum(keys, values):
+    """Sıralı anahtar grupları içinde kümülatif toplam."""
+    csum = np.cumsum(values)
+    first = _group_starts(keys)
+    return csum - csum[first] + values[first]
+
+
+class HeuristicSolver:
+    """
+    Kapasiteli depo yer seçimi için hızlı sezgisel çözücü.
+
+    1. Açgözlü ekleme: kapasiteyle sınırlı tahmini tasarrufu (kira düşülmüş) en yüksek depo açılır.
+    2. Açgözlü çıkarma: kapatıldığında toplam maliyeti düşüren depolar kapatılır.
+    3. Yerel arama: açık/kapalı depo değişimi (swap) ve müşteri kaydırma (shift).
+
+    Atamalar tur bazlı ve vektörel yapılır: her turda atanmamış her müşteri en yakın açık ve
+    kapasitesi yeten depoya teklif verir, depolar teklifleri pişmanlık (regret) sırasıyla kapasite dolana kadar kabul eder.
+
+    cost_orders verilirse taşıma maliyeti bununla, kapasite `orders` ile hesaplanır
+    (çok dönemli talepte kapasite için en kötü dönem yükü kullanılır).
+    """
+
+    def __init__(self, pairs, orders, rent, capacity, cost_per_km, cost_orders=None):
+        # Çiftler müşteri içinde mesafeye göre sıralanır (müşteri başına maliyet mesafeyle orantılı)
+        self.perm = np.lexsort((pairs.dist, pairs.cust))
+        self.cust = pairs.cust[self.perm]
+        self.site = pairs.site[self.perm]
+        self.dist = pairs.dist[self.perm].astype(np.float64)
+        self.orders = np.asarray(orders, dtype=np.float64)
+        self.rent = np.asarray(rent, dtype=np.float64)
+        self.capacity = np.asarray(capacity, dtype=np.float64)
+        self.pair_orders = self.orders[self.cust]
+        cost_orders = self.orders if cost_orders is None else np.asarray(cost_orders, dtype=np.float64)
+        self.cost = self.dist * cost_per_km * cost_orders[self.cust]
+        self.n_customers = pairs.n_customers
+        self.n_sites = pairs.n_sites
+
+        # Depo bazlı çift listesi: by_site[site_ptr[j]:site_ptr[j+1]]
+        self.by_site = np.argsort(self.site, kind='stable')
+        self.site_ptr = np.concatenate([[0], np.cumsum(np.bincount(self.site, minlength=self.n_sites))])
+
+        counts = np.bincount(self.cust, minlength=self.n_customers)
+        self.cust_ptr = np.concatenate([[0], np.cumsum(counts)])
+        self.servable = counts > 0
+        # Hizmet verilemeyen (ama menzilde deposu olan) müşteri için ceza: her depo açılışından pahalı
+        max_cost = self.cost.max() if len(self.cost) else 0.0
+        self.penalty = 10 * (max_cost + (self.rent.max() if self.n_sites else 0.0))
+
+    def pairs_of(self, customers):
+        """Verilen (artan sıralı) müşterilerin tüm çift indeksleri, müşteri ve mesafe sırasıyla."""
+        starts = self.cust_ptr[customers]
+        lens = self.cust_ptr[customers + 1] - starts
+        total = int(lens.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(lens)[:-1]]), lens)
+        return offsets + np.arange(total)
+
+    # --- ATAMA ---
+    def assign(self, open_mask, assigned=None, load=None):
+        """
+        Verilen açık depo kümesi için kapasiteli atama.
+        assigned/load verilirse mevcut atamalar korunur, sadece atanmamış müşteriler yerleştirilir.
+        Dönüş: assigned (müşteri başına sıralı çift indeksi, atanamadıysa -1), site yükleri.
+        """
+        if assigned is None:
+            assigned = np.full(self.n_customers, -1, dtype=np.int64)
+            rem = np.where(open_mask, self.capacity, 0.0)
+        else:
+            assigned = assigned.copy()
+            rem = np.where(open_mask, self.capacity, 0.0) - load
+
+        # Sadece atanmamış müşterilerin çiftleri üzerinde çalışılır (müşteri sırası korunur)
+        idx = self.pairs_of(np.flatnonzero(self.servable & (assigned < 0)))
+        idx = idx[open_mask[self.site[idx]] & (self.pair_orders[idx] <= rem[self.site[idx]] + 1e-9)]
+
+        while len(idx):
+            c = self.cust[idx]
+            head = np.flatnonzero(np.r_[True, c[1:] != c[:-1]])
+            first = idx[head]  # her müşterinin en yakın aday çifti
+
+            # Pişmanlık (regret): en yakın ile ikinci en yakın aday arasındaki maliyet farkı.
+            # Başka seçeneği olmayan / kaybı büyük müşteriler depoda önceliklidir.
+            nxt = head + 1
+            has_second = nxt < len(idx)
+            has_second[has_second] = c[nxt[has_second]] == c[head[has_second]]
+            regret = np.full(len(first), np.inf)
+            second = idx[nxt[has_second]]
+            regret[has_second] = self.cost[second] - self.cost[first[has_second]]
+
+            s = self.site[first]
+            o = np.lexsort((-regret, s))
+            first, s = first[o], s[o]
+            w = self.pair_orders[first]
+            ok = _grouped_cumsum(s, w) <= rem[s] + 1e-9
+
+            acc = first[ok]
+            assigned[self.cust[acc]] = acc
+            rem -= np.bincount(s[ok], weights=w[ok], minlength=self.n_sites)
+
+            idx = idx[assigned[self.cust[idx]] < 0]
+            idx = idx[self.pair_orders[idx] <= rem[self.site[idx]] + 1e-9]
+
+        load = np.where(open_mask, self.capacity, 0.0) - rem
+        return assigned, load
+
+    def shift(self, open_mask, assigned, load):
+        """
+        Müşteri kaydırma: daha yakın bir açık depoda boş kapasite varsa müşteri oraya taşınır.
+        Tur bazlı ve vektörel; iyileşme kalmayana kadar tekrarlanır.
+        """
+        assigned = assigned.copy()
+        spare = np.where(open_mask, self.capacity, 0.0) - load
+        while True:
+            cur_dist = np.where(assigned >= 0, self.dist[np.maximum(assigned, 0)], np.inf)
+            cand = (open_mask[self.site] & (self.dist < cur_dist[self.cust] - 1e-12)
+                    & (self.pair_orders <= spare[self.site] + 1e-9))
+            idx = np.flatnonzero(cand)
+            if len(idx) == 0:
+                break
+            c = self.cust[idx]
+            first = idx[np.r_[True, c[1:] != c[:-1]]]
+            gain = cur_dist[self.cust[first]] - self.dist[first]
+
+            s = self.site[first]
+            o = np.lexsort((-gain, s))
+            first, s = first[o], s[o]
+            w = self.pair_orders[first]
+            ok = _grouped_cumsum(s, w) <= spare[s] + 1e-9
+            if not ok.any():
+                break
+
+            moved = first[ok]
+            old = assigned[self.cust[moved]]
+            has_old = old >= 0
+            spare -= np.bincount(s[ok], weights=w[ok], minlength=self.n_sites)
+            spare += np.bincount(self.site[old[has_old]], weights=self.pair_orders[old[has_old]],
+                                 minlength=self.n_sites)
+            assigned[self.cust[moved]] = moved
+        load = np.where(open_mask, self.capacity, 0.0) - spare
+        return assigned, load
+
+    def open_site(self, open_mask, assigned, load, j):
+        """
+        Artımlı açma: depo j açılır, j'ye geçmekle kazancı en yüksek müşteriler kapasite dolana kadar
+        j'ye taşınır, boşalan kapasiteye de atanmamış müşteriler yerleştirilir. Tam yeniden atama yapılmaz.
+        """
+        open_mask = open_mask.copy()
+        open_mask[j] = True
+        assigned = assigned.copy()
+        load = load.copy()
+
+        ks = self.by_site[self.site_ptr[j]:self.site_ptr[j + 1]]
+        c = self.cust[ks]
+        cur = assigned[c]
+        cur_cost = np.where(cur >= 0, self.cost[np.maximum(cur, 0)], self.penalty)
+        gain = cur_cost - self.cost[ks]
+        better = gain > 0
+        ks, c, cur, gain = ks[better], c[better], cur[better], gain[better]
+        o = np.argsort(-gain / np.maximum(self.pair_orders[ks], 1e-9), kind='stable')
+        ks, c, cur = ks[o], c[o], cur[o]
+        ok = np.cumsum(self.pair_orders[ks]) <= self.capacity[j] + 1e-9
+        ks, c, cur = ks[ok], c[ok], cur[ok]
+
+        had = cur >= 0
+        load -= np.bincount(self.site[cur[had]], weights=self.pair_orders[cur[had]], minlength=self.n_sites)
+        load[j] += self.pair_orders[ks].sum()
+        assigned[c] = ks
+        return (open_mask,) + self.assign(open_mask, assigned, load)
+
+    def close_site(self, open_mask, assigned, load, j):
+        """
+        Artımlı kapatma: depo j kapanır, sadece j'nin müşterileri en yakın boş kapasiteli açık depolara
+        yeniden yerleştirilir; diğer atamalara dokunulmaz.
+        """
+        open_mask = open_mask.copy()
+        open_mask[j] = False
+        assigned = assigned.copy()
+        load = load.copy()
+        on_j = assigned >= 0
+        on_j[on_j] = self.site[assigned[on_j]] == j
+        assigned[on_j] = -1
+        load[j] = 0.0
+        return (open_mask,) + self.assign(open_mask, assigned, load)
+
+    def total_cost(self, open_mask, assigned):
+        """Kira + taşıma + (varsa) hizmet verilemeyen müşteri cezası."""
+        unserved = self.servable & (assigned < 0)
+        return (self.rent[open_mask].sum() + self.cost[assigned[assigned >= 0]].sum()
+                + self.penalty * unserved.sum())
+
+    def evaluate(self, open_mask):
+        assigned, load = self.assign(open_mask)
+        assigned, load = self.shift(open_mask, assigned, load)
+        return self.total_cost(open_mask, assigned), assigned, load
+
+    # --- TAHMİNİ TASARRUF ---
+    def _current_cost(self, assigned):
+        cur = np.where(assigned >= 0, self.cost[np.maximum(assigned, 0)], self.penalty)
+        return np.where(self.servable, cur, 0.0)
+
+    def _savings_totals(self, idx, cur):
+        """idx çiftleri için depo başına (tasarruf, bu tasarrufu sağlayan sipariş) toplamları."""
+        sav = np.maximum(cur[self.cust[idx]] - self.cost[idx], 0.0)
+        pos = sav > 0
+        s = self.site[idx]
+        gross = np.bincount(s, weights=sav, minlength=self.n_sites)
+        demand = np.bincount(s[pos], weights=self.pair_orders[idx][pos], minlength=self.n_sites)
+        return gross, demand
+
+    def _net_savings(self, gross, demand, open_mask):
+        """
+        Kapalı depolar için açılırsa elde edilecek tahmini net tasarruf (kira düşülmüş).
+        Kapasiteyi aşan depolarda tasarruf orantılı olarak kırpılır (sadece aday sıralaması için tahmin).
+        """
+        scale = np.where(demand > self.capacity, self.capacity / np.maximum(demand, 1e-9), 1.0)
+        net = gross * scale - self.rent
+        net[open_mask | (gross <= 0)] = -np.inf
+        return net
+
+    def _add_savings(self, open_mask, assigned):
+        gross, demand = self._savings_totals(np.arange(len(self.cust)), self._current_cost(assigned))
+        return self._net_savings(gross, demand, open_mask)
+
+    # --- ANA AKIŞ ---
+    def solve(self, max_open, time_limit=30, swap_candidates=8):
+        """
+        Açgözlü ekleme her zaman tamamlanır; çıkarma ve swap aşamaları time_limit (sn) ile sınırlıdır.
+        Dönüş: (açık depo maskesi, atamalar, toplam maliyet, uygun mu)
+        """
+        t0 = time.perf_counter()
+        open_mask = np.zeros(self.n_sites, dtype=bool)
+        assigned = np.full(self.n_customers, -1, dtype=np.int64)
+        load = np.zeros(self.n_sites)
+        best_cost = self.total_cost(open_mask, assigned)
+
+        # 1. Açgözlü ekleme (tasarruf toplamları sadece ataması değişen müşteriler için güncellenir)
+        cur = self._current_cost(assigned)
+        gross, demand = self._savings_totals(np.arange(len(self.cust)), cur)
+        # Maliyeti düşürmeyen aday yasaklanır; hizmet alamayan müşteri kaldıkça sıradaki adaylar denenir
+        tabu = np.zeros(self.n_sites, dtype=bool)
+        while open_mask.sum() < max_open:
+            net = self._net_savings(gross, demand, open_mask)
+            net[tabu] = -np.inf
+            j = int(np.argmax(net))
+            if not np.isfinite(net[j]):
+                break
+            trial, trial_assigned, trial_load = self.open_site(open_mask, assigned, load, j)
+            cost = self.total_cost(trial, trial_assigned)
+            if cost >= best_cost:
+                if not (self.servable & (assigned < 0)).any():
+                    break
+                tabu[j] = True
+                continue
+
+            changed = self.pairs_of(np.flatnonzero(trial_assigned != assigned))
+            new_cur = self._current_cost(trial_assigned)
+            old_g, old_d = self._savings_totals(changed, cur)
+            new_g, new_d = self._savings_totals(changed, new_cur)
+            gross += new_g - old_g
+            demand += new_d - old_d
+            open_mask, assigned, load, best_cost, cur = trial, trial_assigned, trial_load, cost, new_cur
+        # Baştan tur bazlı atama artımlı atamadan kötü olabilir (ör. sıkışık kapasitede açıkta müşteri bırakır)
+        cost, trial_assigned, _ = self.evaluate(open_mask)
+        if cost < best_cost:
+            best_cost, assigned = cost, trial_assigned
+
+        # 2. Açgözlü çıkarma (süre limiti dahilinde)
+        improved = True
+        while improved and open_mask.sum() > 1 and time.perf_counter() - t0 < time_limit:
+            improved = False
+            for j in np.flatnonzero(open_mask):
+                if time.perf_counter() - t0 > time_limit:
+                    break
+                trial = open_mask.copy()
+                trial[j] = False
+                cost, trial_assigned, _ = self.evaluate(trial)
+                if cost < best_cost - 1e-6:
+                    open_mask, assigned, best_cost = trial, trial_assigned, cost
+                    improved = True
+                    break
+
+        # 3. Yerel arama (swap): her turda en iyi iyileştiren açık/kapalı depo değişimi uygulanır
+        while time.perf_counter() - t0 < time_limit:
+            net = self._add_savings(open_mask, assigned)
+            # Küçük örneklerde tüm kapalı depolar, büyüklerde tahmini tasarrufu en yüksekler denenir
+            n_cand = self.n_sites if self.n_sites <= 64 else swap_candidates
+            candidates = [j for j in np.argsort(-net)[:n_cand] if not open_mask[j]]
+            best_move = None
+            for j_out in np.flatnonzero(open_mask):
+                for j_in in candidates:
+                    trial = open_mask.copy()
+                    trial[j_out], trial[j_in] = False, True
+                    cost, trial_assigned, _ = self.evaluate(trial)
+                    if cost < best_cost - 1e-6 and (best_move is None or cost < best_move[0]):
+                        best_move = (cost, trial, trial_assigned)
+                if time.perf_counter() - t0 > time_limit:
+                    break
+            if best_move is None:
+                break
+            best_cost, open_mask, assigned = best_move
+
+        feasible = not (self.servable & (assigned < 0)).any()
+        return open_mask, assigned, best_cost, feasible
+
+    def to_solution(self, open_mask, assigned, n_pairs):
+        """Sezgisel çözümü orijinal çift sırasındaki (y, x) dizilerine çevirir (MIP start için)."""
+        x = np.zeros(n_pairs)
+        x[self.perm[assigned[assigned >= 0]]] = 1.0
+        return open_mask.astype(np.float64), x
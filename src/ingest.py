@@ -0,0 +1,179 @@
+import hashlib
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+try:
+    from src.data_store import SCHEMAS, SCHEMA_VERSION, _atomic_write, _save_json
+except ImportError:  # src klasöründen doğrudan çalıştırıldığında
+    from data_store import SCHEMAS, SCHEMA_VERSION, _atomic_write, _save_json
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow yoksa tablo parçalar birleştirilip pickle olarak yazılır
+    pa = None
+
+DEFAULT_CHUNK_ROWS = 200_000     # parça başına satır; tepe bellek bununla sınırlıdır
+HASH_BLOCK_BYTES = 8 * 2 ** 20   # içerik özeti için okuma bloğu
+
+# Okuma türleri: zorunlu sayısal kolonlar float64 okunur (boş/kesirli değerler yakalanabilsin),
+# doğrulamadan sonra aşağıdaki kompakt türlere çevrilir. Koordinatlar mesafe hassasiyeti için float64 kalır.
+COMPACT_DTYPES = {
+    'demand': {'id': np.int64, 'lat': np.float64, 'lon': np.float64, 'daily_orders': np.int32,
+               'cluster_id': np.int32, 'avg_basket_size': np.float32},
+    'sites': {'site_id': object, 'lat': np.float64, 'lon': np.float64, 'rent_cost': np.float64,
+              'capacity': np.int32, 'setup_cost': np.float64},
+}
+# Negatif olamayacak kolonlar
+NON_NEGATIVE = {'demand': ('daily_orders',), 'sites': ('rent_cost', 'capacity')}
+
+
+def content_fingerprint(source, kind):
+    """Dosyanın (yol veya ikili dosya nesnesi) blok blok okunan içerik özeti; tür ve şema sürümü dahil."""
+    h = hashlib.sha1(f"{kind}:{SCHEMA_VERSION}".encode())
+    f = open(source, 'rb') if isinstance(source, (str, os.PathLike)) else source
+    try:
+        f.seek(0)
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b''):
+            h.update(block)
+    finally:
+        if f is not source:
+            f.close()
+        else:
+            f.seek(0)
+    return h.hexdigest()[:16]
+
+
+def _read_dtypes(source, kind):
+    """İlk satırlardan okuma türlerini belirler: zorunlu kolonlar şemadan, diğerleri float32 veya metin."""
+    head = pd.read_csv(source, nrows=1000)
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    schema = SCHEMAS[kind]
+    missing = [c for c in schema if c not in head.columns]
+    if missing:
+        raise ValueError(f"{kind} verisinde eksik kolon(lar): {', '.join(missing)}")
+    read, compact = {}, {}
+    for col in head.columns:
+        target = COMPACT_DTYPES[kind].get(col)
+        if target is None:
+            target = np.float32 if pd.api.types.is_numeric_dtype(head[col]) else object
+        read[col] = str if target is object else np.float64
+        compact[col] = target
+    return read, compact
+
+
+def _validate_chunk(df, kind, compact, first_line):
+    """Tek bir parçayı doğrular ve kompakt türlere çevirir; hatada CSV satır numarasıyla ValueError fırlatır."""
+    def fail(mask, message):
+        rows = np.flatnonzero(np.asarray(mask))
+        if len(rows):
+            lines = ', '.join(str(first_line + r) for r in rows[:5])
+            raise ValueError(f"{kind} verisi, satır {lines}{' ...' if len(rows) > 5 else ''}: {message}")
+
+    fail(~np.isfinite(df['lat']) | ~np.isfinite(df['lon']), "boş veya geçersiz koordinat")
+    fail((df['lat'].abs() > 90) | (df['lon'].abs() > 180), "koordinat aralık dışında (enlem ±90, boylam ±180)")
+    for col in NON_NEGATIVE[kind]:
+        fail(df[col].isna(), f"'{col}' boş")
+        fail(df[col] < 0, f"'{col}' negatif olamaz")
+    for col, target in compact.items():
+        if target is object:
+            fail(df[col].isna(), f"'{col}' boş")
+            continue
+        if np.issubdtype(target, np.integer):
+            fail(df[col].isna(), f"'{col}' boş")
+            fail(df[col] != np.floor(df[col]), f"'{col}' tamsayı olmalı")
+            info = np.iinfo(target)
+            fail((df[col] < info.min) | (df[col] > info.max), f"'{col}' {np.dtype(target).name} aralığını aşıyor")
+        df[col] = df[col].astype(target)
+    return df
+
+
+def _read_chunks(source, kind, read_dtypes, chunk_rows):
+    """Açık türlerle parça parça okur; türe uymayan değerleri (ör. sayısal kolonda metin) anlaşılır hataya çevirir."""
+    chunks = iter(pd.read_csv(source, dtype=read_dtypes, chunksize=chunk_rows, float_precision='round_trip'))
+    while True:
+        try:
+            yield next(chunks)
+        except StopIteration:
+            return
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"{kind} verisi ayrıştırılamadı (sayısal kolonlarda metin olabilir): {e}") from e
+
+
+def ingest_csv(source, kind, out_dir, chunk_rows=DEFAULT_CHUNK_ROWS, name=None):
+    """
+    Büyük bir CSV'yi (yol veya yüklenen dosya nesnesi) parça parça okuyup doğrular ve
+    data_store önbelleği ile aynı düzende içerik adresli olarak yazar:
+        <tür>_<özet>.feather     : kompakt türlü Arrow tablo (parçalar sırayla eklenir)
+        <tür>_<özet>.coords.npy  : (2, N) float64 [lat; lon]
+        <tür>_<özet>.meta.json   : satır sayısı, özet, türler
+    Aynı içerik daha önce alındıysa hiç ayrıştırılmadan mevcut tablo yolu döner; yol ve mtime değişmediği için
+    ScenarioCache ve JobQueue aynı optimizer'ı (ve mesafe çiftlerini) ve sonuçları yeniden kullanır.
+    Tepe bellek chunk_rows ile sınırlıdır (yüklenen dosyanın kendisi hariç).
+    Dönüş: tablo yolu (data_store.load_table ile okunur)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    fp = content_fingerprint(source, kind)
+    stem = os.path.join(os.path.abspath(out_dir), f"{kind}_{fp}")
+    table_path = stem + ('.feather' if pa is not None else '.pkl')
+    if os.path.exists(stem + '.meta.json') and os.path.exists(table_path):
+        print(f"♻️ {name or kind}: aynı içerik daha önce alınmış, ayrıştırma atlandı ({fp})")
+        return table_path
+
+    read_dtypes, compact = _read_dtypes(source, kind)
+    tmp = f"{stem}.{os.getpid()}.parts"
+    os.makedirs(tmp, exist_ok=True)
+    writer, schema, frames, n_rows = None, None, [], 0
+    try:
+        with open(os.path.join(tmp, 'lat.f64'), 'wb') as f_lat, open(os.path.join(tmp, 'lon.f64'), 'wb') as f_lon:
+            for chunk in _read_chunks(source, kind, read_dtypes, chunk_rows):
+                chunk = _validate_chunk(chunk, kind, compact, first_line=n_rows + 2)  # 1. satır başlık
+                n_rows += len(chunk)
+                f_lat.write(chunk['lat'].to_numpy(dtype=np.float64).tobytes())
+                f_lon.write(chunk['lon'].to_numpy(dtype=np.float64).tobytes())
+                if pa is None:
+                    frames.append(chunk)
+                    continue
+                # Sonraki parçalar ilk parçanın şemasına zorlanır (ör. tamamı boş metin kolonu)
+                batch = pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False)
+                if writer is None:
+                    schema = batch.schema
+                    writer = pa.ipc.new_file(os.path.join(tmp, 'table.feather'), schema)
+                writer.write_batch(batch)
+        if n_rows == 0:
+            raise ValueError(f"{kind} verisi boş")
+        if writer is not None:
+            writer.close()
+            writer = None
+        else:
+            pd.concat(frames).to_pickle(os.path.join(tmp, 'table.pkl'))
+
+        # Koordinatlar diskteki ham dizilerden bellek eşlemeli olarak (2, N) düzenine kopyalanır
+        coords = np.lib.format.open_memmap(os.path.join(tmp, 'coords.npy'), mode='w+', dtype=np.float64,
+                                           shape=(2, n_rows))
+        coords[0] = np.memmap(os.path.join(tmp, 'lat.f64'), dtype=np.float64, mode='r')
+        coords[1] = np.memmap(os.path.join(tmp, 'lon.f64'), dtype=np.float64, mode='r')
+        coords.flush()
+        del coords
+
+        id_col = 'id' if kind == 'demand' else 'site_id'
+        ids = (pd.read_feather(os.path.join(tmp, 'table.feather'), columns=[id_col]) if pa is not None
+               else pd.read_pickle(os.path.join(tmp, 'table.pkl'))[[id_col]])[id_col]
+        if ids.duplicated().any():
+            raise ValueError(f"{kind} verisinde tekrarlanan '{id_col}' değerleri var: "
+                             f"{', '.join(map(str, ids[ids.duplicated()].unique()[:5]))}")
+
+        os.replace(os.path.join(tmp, 'coords.npy'), stem + '.coords.npy')
+        os.replace(os.path.join(tmp, 'table' + os.path.splitext(table_path)[1]), table_path)
+        meta = {'kind': kind, 'rows': n_rows, 'fingerprint': fp, 'source': name, 'schema_version': SCHEMA_VERSION,
+                'dtypes': {c: np.dtype(t).name for c, t in compact.items()}}
+        _atomic_write(stem + '.meta.json', lambda p: _save_json(p, meta))
+    finally:
+        if writer is not None:
+            writer.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+    print(f"📥 {name or kind}: {n_rows:,} satır doğrulandı ve yazıldı ({fp})")
+    return table_path
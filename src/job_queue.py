@@ -0,0 +1,341 @@
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    from src.scenario_cache import ScenarioCache, _file_key
+    from src.results import OptimizationResult
+except ImportError:  # src klasöründen doğrudan çalıştırıldığında
+    from scenario_cache import ScenarioCache, _file_key
+    from results import OptimizationResult
+
+# İş durumları; ACTIVE olanlar aynı senaryo için yeni iş açılmasını engeller.
+# Biten (DONE) işler yalnızca optimal, iptal edilmemiş ve sonucu kaydedilmişse yeniden kullanılır.
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+ACTIVE = (QUEUED, RUNNING)
+
+PROGRESS_INTERVAL_S = 1.0  # işçinin ilerleme yazma / iptal kontrol aralığı
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           TEXT PRIMARY KEY,
+    scenario_key TEXT NOT NULL,
+    params       TEXT NOT NULL,
+    status       TEXT NOT NULL,
+    submitted_at REAL NOT NULL,
+    started_at   REAL,
+    finished_at  REAL,
+    progress     TEXT,
+    cancel       INTEGER NOT NULL DEFAULT 0,
+    result_path  TEXT,
+    error        TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_scenario ON jobs (scenario_key, status);
+"""
+
+
+@contextmanager
+def _connect(db_path):
+    con = sqlite3.connect(db_path, timeout=30, isolation_level=None)  # autocommit
+    con.row_factory = sqlite3.Row
+    con.execute("PRAGMA journal_mode=WAL")  # işçiler yazarken arayüz okuyabilsin
+    try:
+        yield con
+    finally:
+        con.close()
+
+
+def _update(db_path, job_id, **fields):
+    cols = ', '.join(f"{k} = ?" for k in fields)
+    with _connect(db_path) as con:
+        con.execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+
+
+def _cancel_requested(db_path, job_id):
+    with _connect(db_path) as con:
+        return bool(con.execute("SELECT cancel FROM jobs WHERE id = ?", (job_id,)).fetchone()['cancel'])
+
+
+# İşçi süreci başına bir önbellek: aynı veriyle gelen işler optimizer'ı ve çiftleri paylaşır
+_WORKER_CACHE = None
+
+
+def _run_sweep(opt, db_path, job_id, params, results_dir, started):
+    """
+    Maliyet-k taraması (bkz. LogisticsOptimizer.sweep): her çözümden sonra ilerleme yazılır,
+    iptal isteği gelirse tarama o ana kadarki satırlarla biter. İlerleme ve iptal için menziller
+    işçi içinde seri çözülür (paralellik kuyruğun işçi sayısından gelir). Dönüş: (tablo yolu, ilerleme)
+    """
+    # Tarama optimizer'ın durumunu değiştirmesin; veri ve çift önbelleği paylaşılır
+    opt = copy.copy(opt)
+    opt.COST_PER_KM = params['cost_per_km']
+    total = len(params['k_values']) * len(params['ranges'])
+    progress = {'phase': 'Çözülüyor', 'elapsed_s': 0.0, 'done': 0, 'total': total, 'last': None}
+
+    def on_row(row):
+        progress.update(done=progress['done'] + 1, elapsed_s=time.time() - started,
+                        last={k: row[k] for k in ('max_range_km', 'max_stores_to_open', 'status', 'total_cost')})
+        _update(db_path, job_id, progress=json.dumps(progress, default=float))
+        return _cancel_requested(db_path, job_id)
+
+    df = opt.sweep(k_values=params['k_values'], ranges=params['ranges'], backend=params['backend'],
+                   time_limit=params['time_limit'], n_jobs=1, on_row=on_row)
+    os.makedirs(os.path.join(results_dir, 'sweeps'), exist_ok=True)
+    path = os.path.join(results_dir, 'sweeps', f"{job_id}.csv")
+    df.to_csv(path, index=False)
+    # Tüm satırlar optimal ve tarama tamamlandıysa iş yeniden kullanılabilir (bkz. JobQueue._reusable_done)
+    complete = len(df) == total and (df['status'] == 'Optimal').all()
+    progress.update(phase='Optimal' if complete else ('Durduruldu' if len(df) < total else 'Tamamlandı'),
+                    done=len(df), elapsed_s=time.time() - started)
+    return path, progress
+
+
+def _run_job(db_path, job_id, params, results_dir, n_jobs=1):
+    """
+    İşçi sürecinde tek bir senaryoyu çözer. live=True ise CBC arka planda çalıştırılır ve
+    incumbent/alt sınır her saniye iş tablosuna yazılır; iptal isteği geldiğinde arama durdurulur
+    ve o ana kadarki en iyi çözüm sonuç olarak kaydedilir. Kopuk bölgeler en fazla n_jobs alt süreçte çözülür.
+    """
+    global _WORKER_CACHE
+    if _cancel_requested(db_path, job_id):  # kuyruktayken iptal edildi
+        return
+    if _WORKER_CACHE is None:
+        _WORKER_CACHE = ScenarioCache()
+    started = time.time()
+    _update(db_path, job_id, status=RUNNING, started_at=started,
+            progress=json.dumps({'phase': 'Veri hazırlanıyor', 'elapsed_s': 0.0}))
+    try:
+        opt = _WORKER_CACHE.get_optimizer(params['demand_path'], params['sites_path'])
+        if params.get('kind') == 'sweep':
+            result_path, progress = _run_sweep(opt, db_path, job_id, params, results_dir, started)
+            _update(db_path, job_id, status=DONE, finished_at=time.time(), progress=json.dumps(progress, default=float),
+                    result_path=result_path)
+            return
+        if params['live']:
+            solve = _WORKER_CACHE.start_live_solve(opt, params['max_stores_to_open'], params['max_range_km'],
+                                                   params['cost_per_km'], time_limit=params['time_limit'])
+            stopped = False
+            while not solve.wait(PROGRESS_INTERVAL_S) and not solve.done:
+                _update(db_path, job_id, progress=json.dumps(solve.progress()))
+                # CBC kök düğüm işlemleri sırasında gelen kesmeyi kaçırabilir; iptal sonrası her turda yinelenir
+                stopped = stopped or _cancel_requested(db_path, job_id)
+                if stopped:
+                    solve.stop()
+            if solve.error is not None:
+                raise solve.error
+            result, progress = solve.result, solve.progress()
+        else:
+            result = _WORKER_CACHE.solve(opt, params['max_stores_to_open'], params['max_range_km'],
+                                         params['cost_per_km'], backend=params['backend'],
+                                         aggregation=params.get('aggregation'), n_jobs=n_jobs,
+                                         time_limit=params['time_limit'])
+            progress = {'phase': result.status if result else 'Infeasible', 'elapsed_s': time.time() - started}
+        # Aynı çözüm aynı artifact klasörüne düşer (bkz. OptimizationResult.save)
+        result_path = result.save(results_dir) if result is not None else None
+        _update(db_path, job_id, status=DONE, finished_at=time.time(), progress=json.dumps(progress),
+                result_path=result_path)
+    except Exception as e:  # hata iş tablosuna yazılır, arayüz gösterir
+        _update(db_path, job_id, status=FAILED, finished_at=time.time(), error=f"{type(e).__name__}: {e}",
+                progress=json.dumps({'phase': 'Hata', 'elapsed_s': time.time() - started}))
+
+
+class JobQueue:
+    """
+    LogisticsOptimizer çözümleri için yerel iş kuyruğu (Streamlit oturumları arasında paylaşılır).
+
+    İşler diskteki bir SQLite tablosunda tutulur ve en fazla `max_workers` (varsayılan: çekirdek sayısı)
+    işçi süreçte çalıştırılır; arayüz iş kimliğiyle durumu sorgular, sonucu alır veya iptal eder.
+    Aynı senaryo (veri dosyaları + parametreler) kuyrukta, çalışıyor veya optimal olarak bitmişse yeni iş
+    açılmaz, mevcut işin kimliği döner; süre sınırına takılan, iptal edilen veya çözümsüz işler tekrar çözülür.
+    Sonuçlar <klasör>/results/<özet>/ artifact klasörlerinde, tarama (sweep) tabloları results/sweeps/ altında saklanır.
+    """
+
+    def __init__(self, root_dir, max_workers=None):
+        self.root_dir = os.path.abspath(root_dir)
+        self.results_dir = os.path.join(self.root_dir, 'results')
+        os.makedirs(self.results_dir, exist_ok=True)
+        self.db_path = os.path.join(self.root_dir, 'jobs.sqlite')
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        self._lock = threading.Lock()
+        with _connect(self.db_path) as con:
+            con.executescript(_SCHEMA)
+            # Önceki sunucu kapanırken yarım kalan işler tekrar gönderilebilsin diye başarısız sayılır
+            con.execute("UPDATE jobs SET status = ?, error = ? WHERE status IN (?, ?)",
+                        (FAILED, 'Sunucu yeniden başlatıldı', QUEUED, RUNNING))
+
+    @staticmethod
+    def scenario_key(params):
+        """Veri dosyalarının (yol, mtime, boyut) damgası ve çözüm parametrelerinden senaryo anahtarı."""
+        stamp = dict(params, demand_path=_file_key(params['demand_path']), sites_path=_file_key(params['sites_path']))
+        return hashlib.sha1(json.dumps(stamp, sort_keys=True).encode()).hexdigest()
+
+    def submit(self, demand_path, sites_path, max_stores_to_open=5, max_range_km=8.0, cost_per_km=5.0,
+               backend='pulp', time_limit=60, live=False, aggregation=None):
+        """
+        Senaryoyu kuyruğa ekler ve iş kimliğini döner (aynı senaryo zaten varsa onun kimliği).
+        live=True ise CBC ile durdurulabilir, ilerlemesi izlenebilir çözüm yapılır (backend ve aggregation yok sayılır).
+        aggregation: talep birleştirme ayarları (bkz. ScenarioCache.solve).
+        """
+        params = {
+            'demand_path': os.path.abspath(demand_path), 'sites_path': os.path.abspath(sites_path),
+            'max_stores_to_open': int(max_stores_to_open), 'max_range_km': float(max_range_km),
+            'cost_per_km': float(cost_per_km), 'backend': 'cbc_mps' if live else backend,
+            'time_limit': int(time_limit), 'live': bool(live),
+            'aggregation': None if live or not aggregation else dict(aggregation),
+        }
+        return self._enqueue(params)
+
+    def submit_sweep(self, demand_path, sites_path, k_values, ranges, cost_per_km=5.0, backend='pulp',
+                     time_limit=60):
+        """
+        Maliyet-k taramasını (bkz. LogisticsOptimizer.sweep) kuyruğa ekler ve iş kimliğini döner.
+        İlerleme progress()['done'/'total'/'last'] ile izlenir, tablo sweep_result() ile alınır; iptal
+        edilirse tarama o ana kadar çözülen satırlarla biter.
+        """
+        params = {
+            'kind': 'sweep',
+            'demand_path': os.path.abspath(demand_path), 'sites_path': os.path.abspath(sites_path),
+            'k_values': sorted(int(k) for k in k_values), 'ranges': [float(r) for r in ranges],
+            'cost_per_km': float(cost_per_km), 'backend': backend, 'time_limit': int(time_limit), 'live': False,
+        }
+        return self._enqueue(params)
+
+    def _enqueue(self, params):
+        key = self.scenario_key(params)
+        with self._lock, _connect(self.db_path) as con:
+            row = con.execute(
+                f"SELECT id FROM jobs WHERE scenario_key = ? AND status IN ({','.join('?' * len(ACTIVE))}) "
+                "ORDER BY submitted_at DESC LIMIT 1", (key, *ACTIVE)).fetchone()
+            if row is not None:
+                return row['id']
+            row = self._reusable_done(con, key)
+            if row is not None:
+                return row['id']
+            job_id = uuid.uuid4().hex[:12]
+            con.execute("INSERT INTO jobs (id, scenario_key, params, status, submitted_at, progress) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (job_id, key, json.dumps(params), QUEUED, time.time(),
+                         json.dumps({'phase': 'Kuyrukta', 'elapsed_s': 0.0})))
+        # Çekirdekler işçiler arasında paylaştırılır: işçi başına alt süreç sayısı toplamı aşmasın
+        n_jobs = max(1, (os.cpu_count() or 1) // self.max_workers)
+        future = self._pool.submit(_run_job, self.db_path, job_id, params, self.results_dir, n_jobs)
+        future.add_done_callback(lambda f: self._on_exit(job_id, f))
+        return job_id
+
+    @staticmethod
+    def _reusable_done(con, key):
+        """Senaryonun yeniden kullanılabilir son biten işi: sonucu kayıtlı, optimal ve iptal edilmemiş."""
+        rows = con.execute(
+            "SELECT id, progress FROM jobs WHERE scenario_key = ? AND status = ? AND cancel = 0 "
+            "AND result_path IS NOT NULL ORDER BY submitted_at DESC", (key, DONE)).fetchall()
+        for row in rows:
+            if row['progress'] and json.loads(row['progress']).get('phase') == 'Optimal':
+                return row
+        return None
+
+    def _on_exit(self, job_id, future):
+        # İşçi süreci çökerse (ör. bellek yetmezliği) iş tablosu 'running' durumunda kalmasın
+        if not future.cancelled() and future.exception() is not None:
+            _update(self.db_path, job_id, status=FAILED, finished_at=time.time(), error=str(future.exception()))
+
+    def status(self, job_id):
+        """İşin satırı (sözlük; 'progress' ve 'params' ayrıştırılmış) veya iş yoksa None."""
+        with _connect(self.db_path) as con:
+            row = con.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job['progress'] = json.loads(job['progress']) if job['progress'] else {}
+        return job
+
+    def result(self, job_id):
+        """Biten işin sonucu (OptimizationResult) veya None."""
+        job = self.status(job_id)
+        if job is None or job['status'] != DONE or not job['result_path']:
+            return None
+        return OptimizationResult.load(job['result_path'])
+
+    def sweep_result(self, job_id):
+        """Biten tarama işinin tablosu (DataFrame) veya None."""
+        job = self.status(job_id)
+        if job is None or job['status'] != DONE or not job['result_path']:
+            return None
+        df = pd.read_csv(job['result_path'])
+        df['open_sites'] = df['open_sites'].fillna('').astype(str)
+        return df
+
+    def cancel(self, job_id):
+        """
+        Kuyruktaki işi iptal eder; çalışan canlı işte aramayı durdurur (en iyi çözüm yine kaydedilir).
+        Canlı olmayan çalışan işler kesilemez, bitince sonuçları yine kaydedilir.
+        """
+        with _connect(self.db_path) as con:
+            con.execute("UPDATE jobs SET cancel = 1 WHERE id = ?", (job_id,))
+            con.execute("UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                        (CANCELLED, time.time(), job_id, QUEUED))
+
+    def jobs(self, limit=50):
+        """Son işlerin özet tablosu."""
+        with _connect(self.db_path) as con:
+            df = pd.read_sql_query("SELECT id, status, params, submitted_at, started_at, finished_at, error "
+                                   "FROM jobs ORDER BY submitted_at DESC LIMIT ?", con, params=(limit,))
+        for col in ('submitted_at', 'started_at', 'finished_at'):
+            df[col] = pd.to_datetime(df[col], unit='s')
+        return df
+
+    def handle(self, job_id):
+        return JobHandle(self, job_id)
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+class JobHandle:
+    """
+    Tek bir kuyruk işinin arayüz görünümü; BackgroundSolve ile aynı yüzeyi sunar
+    (progress, done, error, result, stop), böylece canlı izleme paneli iki kaynağı da gösterebilir.
+    """
+
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.job_id = job_id
+        self._result = None
+
+    def _job(self):
+        return self.queue.status(self.job_id) or {'status': FAILED, 'error': 'İş bulunamadı', 'progress': {}}
+
+    @property
+    def done(self):
+        return self._job()['status'] in (DONE, FAILED, CANCELLED)
+
+    @property
+    def error(self):
+        return self._job()['error']
+
+    @property
+    def result(self):
+        if self._result is None:
+            self._result = self.queue.result(self.job_id)
+        return self._result
+
+    def progress(self):
+        job = self._job()
+        prog = {'phase': 'Kuyrukta', 'elapsed_s': 0.0, 'incumbent': None, 'bound': None, 'gap': None, 'history': []}
+        prog.update(job['progress'])
+        if job['status'] == RUNNING and job.get('started_at'):
+            prog['elapsed_s'] = max(prog['elapsed_s'], time.time() - job['started_at'])
+        return prog
+
+    def stop(self):
+        self.queue.cancel(self.job_id)
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+# Ortalama kurye temposu (dk/km); teslimat süresi göstergesi kuş uçuşu / yol uzunluğundan türetilir
+MINUTES_PER_KM = 2.5
+DISTANCE_PERCENTILES = (50, 90, 95)
+
+
+def weighted_percentiles(values, weights, q=DISTANCE_PERCENTILES):
+    """Ağırlıklı yüzdelikler (ör. sipariş ağırlıklı mesafe); boş girdide NaN döner."""
+    values = np.asarray(values, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    if len(values) == 0 or weights.sum() <= 0:
+        return np.full(len(q), np.nan)
+    order = np.argsort(values, kind='stable')
+    cw = np.cumsum(weights[order])
+    idx = np.searchsorted(cw, np.asarray(q, dtype=np.float64) / 100 * cw[-1])
+    return values[order][np.minimum(idx, len(values) - 1)]
+
+
+def compute_kpis(cust, site, dist, orders, open_mask, rent, capacity, cost_per_km, site_ids, n_customers,
+                 capacity_orders=None, metric='length'):
+    """
+    Bir çözümün göstergelerini çözücü dizilerinden tek geçişte hesaplar.
+
+    cust, site, dist : seçilen atamaların pozisyonel müşteri/depo indeksleri ve mesafeleri
+    orders           : müşteri başına (maliyette kullanılan) sipariş
+    open_mask        : açık depolar (df_sites sırasında)
+    capacity_orders  : (N, T) dönem yükleri (bkz. LogisticsOptimizer.capacity_orders); kullanım oranı
+                       en yoğun dönemden hesaplanır. Verilmezse orders tek dönem sayılır.
+    metric           : dist birimi; 'length' (km) veya 'time' (dk, yol ağı süre metriği). 'time' iken
+                       *_km alanları dakikadır ve teslimat süresi doğrudan mesafeden okunur.
+    Dönüş: {'summary': {...}, 'sites': depo bazlı tablo (açık depolar)}
+    """
+    cust = np.asarray(cust, dtype=np.int64)
+    site = np.asarray(site, dtype=np.int64)
+    dist = np.asarray(dist, dtype=np.float64)
+    orders = np.asarray(orders, dtype=np.float64)
+    rent = np.asarray(rent, dtype=np.float64)
+    capacity = np.asarray(capacity, dtype=np.float64)
+    n_sites = len(open_mask)
+    w = orders[cust]
+    transport = dist * cost_per_km * w
+
+    if capacity_orders is None:
+        capacity_orders = orders[:, None]
+    period_load = np.stack([np.bincount(site, weights=col[cust], minlength=n_sites)
+                            for col in np.asarray(capacity_orders, dtype=np.float64).T], axis=1)
+    peak_load = period_load.max(axis=1)
+
+    open_idx = np.flatnonzero(open_mask)
+    site_orders = np.bincount(site, weights=w, minlength=n_sites)
+    site_wdist = np.bincount(site, weights=w * dist, minlength=n_sites)
+    sites = pd.DataFrame({
+        'site_id': np.asarray(site_ids)[open_idx],
+        'customers': np.bincount(site, minlength=n_sites)[open_idx],
+        'orders': site_orders[open_idx],
+        'capacity': capacity[open_idx],
+        'utilization': peak_load[open_idx] / np.maximum(capacity[open_idx], 1e-9),
+        'rent_cost': rent[open_idx],
+        'transport_cost': np.bincount(site, weights=transport, minlength=n_sites)[open_idx],
+        'weighted_distance_km': site_wdist[open_idx] / np.maximum(site_orders[open_idx], 1e-9),
+    })
+
+    rent_cost = float(rent[open_idx].sum())
+    transport_cost = float(transport.sum())
+    total_orders = float(w.sum())
+    total_capacity = float(capacity[open_idx].sum())
+    pct = weighted_percentiles(dist, w)
+    wmean = float((dist * w).sum() / total_orders) if total_orders else float('nan')
+    summary = {
+        'total_cost': rent_cost + transport_cost,
+        'rent_cost': rent_cost,
+        'transport_cost': transport_cost,
+        'n_open': int(len(open_idx)),
+        'served_customers': int(len(np.unique(cust))),
+        'total_customers': int(n_customers),
+        'coverage': len(np.unique(cust)) / n_customers if n_customers else 0.0,
+        'total_orders': total_orders,
+        'total_capacity': total_capacity,
+        'capacity_usage': float(peak_load[open_idx].sum()) / total_capacity if total_capacity else 0.0,
+        'max_utilization': float(sites['utilization'].max()) if len(sites) else 0.0,
+        'avg_distance_km': float(dist.mean()) if len(dist) else float('nan'),
+        'weighted_distance_km': wmean,
+        'avg_delivery_min': wmean if metric == 'time' else wmean * MINUTES_PER_KM,
+        'distance_metric': metric,
+    }
+    summary.update({f'distance_p{q}_km': float(v) for q, v in zip(DISTANCE_PERCENTILES, pct)})
+    return {'summary': summary, 'sites': sites}
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import folium
+from folium.plugins import FastMarkerCluster
+
+# Harita yükü sınırları: veri ne kadar büyürse büyüsün HTML boyutu bu sınırlarla orantılı kalır
+MAX_SPIDER_LINES = 3000
+COORD_DECIMALS = 5  # ~1 m hassasiyet; JSON boyutunu yarıya indirir
+
+# FastMarkerCluster satırları JavaScript tarafında işaretçiye çevirir (Python'da satır döngüsü yok)
+_DEMAND_CALLBACK = """
+function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]),
+        {radius: 3, color: '#3498db', fill: true, fillOpacity: 0.6});
+    marker.bindPopup('Sipariş: ' + row[2] + ' Adet');
+    return marker;
+};
+"""
+
+_SITE_CALLBACK = """
+function (row) {
+    var icon = L.AwesomeMarkers.icon({icon: 'warehouse', prefix: 'fa', markerColor: '%s'});
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});
+    marker.bindTooltip(row[2]);
+    return marker;
+};
+"""
+
+
+def demand_cluster(lat, lon, orders, name="Talep Noktaları"):
+    """
+    Talep noktalarını istemci tarafında kümelenen tek bir katman olarak döner.
+    Sadece [lat, lon, sipariş] dizisi gönderilir; nokta başına HTML/JS üretilmez.
+    """
+    data = np.column_stack([np.round(lat, COORD_DECIMALS), np.round(lon, COORD_DECIMALS),
+                            np.asarray(orders)]).tolist()
+    return FastMarkerCluster(data, callback=_DEMAND_CALLBACK, name=name)
+
+
+def site_cluster(lat, lon, labels, color='red', name="Depolar", cluster=True):
+    """
+    Depo işaretçilerini tek katmanda döner. labels: her depo için tooltip metni.
+    cluster=False ise işaretçiler kümelenmez (az sayıda seçili depo için).
+    """
+    data = pd.DataFrame({'lat': np.round(lat, COORD_DECIMALS), 'lon': np.round(lon, COORD_DECIMALS),
+                         'label': np.asarray(labels, dtype=object)}).to_numpy(dtype=object).tolist()
+    options = None if cluster else {'disableClusteringAtZoom': 1}
+    return FastMarkerCluster(data, callback=_SITE_CALLBACK % color, name=name, options=options)
+
+
+def downsample_lines(site_idx, max_lines=MAX_SPIDER_LINES, seed=0):
+    """
+    Çizilecek atama çizgilerini depo bazında orantılı (tabakalı) örnekler.
+    Her deponun 'örümcek' görünümü korunur, toplam çizgi sayısı ~max_lines ile sınırlı kalır
+    (her depodan en az bir çizgi).
+    Dönüş: seçilen satırların indeksleri (depoya göre sıralı)
+    """
+    site_idx = np.asarray(site_idx)
+    n = len(site_idx)
+    order = np.argsort(site_idx, kind='stable')
+    if n <= max_lines:
+        return order
+    # Depo içinde rastgele sıra; her depodan ilk ceil(pay * oran) satır alınır
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((rng.random(n), site_idx))
+    s = site_idx[order]
+    starts = np.r_[0, np.flatnonzero(s[1:] != s[:-1]) + 1]
+    counts = np.diff(np.r_[starts, n])
+    rank = np.arange(n) - np.repeat(starts, counts)
+    quota = np.repeat(np.maximum(1, np.ceil(counts * max_lines / n)), counts)
+    return order[rank < quota]
+
+
+def spider_lines(cust_lat, cust_lon, site_lat, site_lon, site_idx, max_lines=MAX_SPIDER_LINES,
+                 color='#3b82f6', weight=0.5, opacity=0.2, name="Atamalar"):
+    """
+    Müşteri-depo atama çizgilerini tek bir GeoJSON FeatureCollection olarak döner:
+    depo başına bir MultiLineString. Çizgi sayısı max_lines ile sınırlandırılır (LOD).
+    Girdiler atama satırı başına dizilerdir; site_idx çizginin ait olduğu depo numarasıdır.
+    """
+    keep = downsample_lines(site_idx, max_lines)
+    sid = np.asarray(site_idx)[keep]
+    # GeoJSON sırası [lon, lat]
+    seg = np.stack([
+        np.column_stack([np.asarray(cust_lon)[keep], np.asarray(cust_lat)[keep]]),
+        np.column_stack([np.asarray(site_lon)[keep], np.asarray(site_lat)[keep]]),
+    ], axis=1).round(COORD_DECIMALS)
+
+    starts = np.r_[0, np.flatnonzero(sid[1:] != sid[:-1]) + 1] if len(sid) else np.empty(0, dtype=int)
+    bounds = np.r_[starts, len(sid)]
+    features = [
+        {'type': 'Feature', 'properties': {'site': int(sid[a])},
+         'geometry': {'type': 'MultiLineString', 'coordinates': seg[a:b].tolist()}}
+        for a, b in zip(bounds[:-1], bounds[1:])
+    ]
+    return folium.GeoJson(
+        {'type': 'FeatureCollection', 'features': features}, name=name,
+        style_function=lambda _: {'color': color, 'weight': weight, 'opacity': opacity},
+    )
@@ -0,0 +1,348 @@
+import os
+import re
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+class MatrixModel:
+    """
+    Depo yer seçimi MILP'inin PuLP ifadeleri olmadan, doğrudan seyrek matrislerle kurulmuş hali.
+
+    Değişken sırası: [y_0 .. y_{M-1}, x_0 .. x_{P-1}]  (y: depo açık mı, x: k. çift atandı mı)
+    Satırlar:  b_l <= A v <= b_u
+        - atama    : her (çifti olan) müşteri için  sum_k x_k = 1
+        - bağlantı : her çift için                   x_k - y_j <= 0
+        - kapasite : her depo (ve dönem) için        sum_k d_i x_k - cap_j y_j <= 0
+        - bütçe    :                                 sum_j y_j <= max_stores_to_open
+
+    period_orders verilirse ((müşteri x dönem) dizisi) kapasite her dönem için ayrı yazılır
+    (depo başına T satır, satır sırası dönem-depo); amaç yine `orders` ile hesaplanır.
+    """
+
+    def __init__(self, pairs, orders, rent, capacity, cost_per_km, max_stores_to_open, period_orders=None):
+        n_sites = pairs.n_sites
+        n_pairs = len(pairs)
+        n_vars = n_sites + n_pairs
+        cust, site = pairs.cust, pairs.site
+        orders = np.asarray(orders, dtype=np.float64)
+        pair_orders = orders[cust]
+        x_col = n_sites + np.arange(n_pairs)
+
+        # Amaç: kira (y) + mesafe * km maliyeti * sipariş (x)
+        self.c = np.concatenate([np.asarray(rent, dtype=np.float64),
+                                 pairs.dist.astype(np.float64) * cost_per_km * pair_orders])
+
+        # Atama satırları: sadece en az bir çifti olan müşteriler (sıkıştırılmış satır indeksi)
+        served, assign_row = np.unique(cust, return_inverse=True)
+        n_assign = len(served)
+        r0 = 0
+        rows = [r0 + assign_row]
+        cols = [x_col]
+        vals = [np.ones(n_pairs)]
+
+        # Bağlantı satırları
+        r1 = r0 + n_assign
+        link_rows = r1 + np.arange(n_pairs)
+        rows += [link_rows, link_rows]
+        cols += [x_col, site]
+        vals += [np.ones(n_pairs), -np.ones(n_pairs)]
+
+        # Kapasite satırları (dönem başına bir blok)
+        r2 = r1 + n_pairs
+        if period_orders is None:
+            period_orders = orders[:, None]
+        period_orders = np.asarray(period_orders, dtype=np.float64)
+        n_periods = period_orders.shape[1]
+        n_cap = n_sites * n_periods
+        block = np.arange(n_periods) * n_sites
+        rows += [(r2 + block[:, None] + site[None, :]).ravel(), r2 + np.arange(n_cap)]
+        cols += [np.tile(x_col, n_periods), np.tile(np.arange(n_sites), n_periods)]
+        vals += [period_orders[cust].T.ravel(), np.tile(-np.asarray(capacity, dtype=np.float64), n_periods)]
+
+        # Bütçe satırı
+        r3 = r2 + n_cap
+        rows.append(np.full(n_sites, r3))
+        cols.append(np.arange(n_sites))
+        vals.append(np.ones(n_sites))
+        n_rows = r3 + 1
+
+        self.A = sparse.csr_matrix(
+            (np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))), shape=(n_rows, n_vars)
+        )
+        self.b_l = np.concatenate([np.ones(n_assign), np.full(n_pairs + n_cap + 1, -np.inf)])
+        self.b_u = np.concatenate([np.ones(n_assign), np.zeros(n_pairs + n_cap), [max_stores_to_open]])
+        self.lb = np.zeros(n_vars)
+        self.ub = np.ones(n_vars)
+        self.integrality = np.ones(n_vars, dtype=np.int8)
+        self.n_sites = n_sites
+        self.n_pairs = n_pairs
+
+    @property
+    def shape(self):
+        return self.A.shape
+
+    def split(self, values):
+        """Çözüm vektörünü (y, x) olarak ikiye ayırır."""
+        return values[:self.n_sites], values[self.n_sites:]
+
+    def is_feasible(self, values, tol=1e-6):
+        """
+        Vektörün tamsayı ve uygun bir çözüm olup olmadığı: tamsayı değişkenler tol içinde tamsayı,
+        sınırlar ve b_l <= A v <= b_u sağlanıyor mu. Durdurulan CBC'nin LP (kesirli) vektörünü ayıklamak için.
+        """
+        if values is None or len(values) != self.A.shape[1] or not np.isfinite(values).all():
+            return False
+        ints = self.integrality.astype(bool)
+        if (np.abs(values[ints] - np.round(values[ints])) > tol).any():
+            return False
+        if (values < self.lb - tol).any() or (values > self.ub + tol).any():
+            return False
+        row = self.A @ values
+        return bool((row >= self.b_l - tol).all() and (row <= self.b_u + tol).all())
+
+    def solve_highs(self, time_limit=60, msg=False, relax=False):
+        """
+        scipy.optimize.milp (HiGHS) ile çözer.
+        Dönüş: (durum, amaç değeri, çözüm vektörü); durum isimleri PuLP'inkilerle aynıdır,
+        süre dolduğunda bulunan en iyi çözüm 'Feasible' olarak döner.
+        """
+        from scipy.optimize import milp, LinearConstraint, Bounds
+
+        res = milp(
+            self.c,
+            constraints=LinearConstraint(self.A, self.b_l, self.b_u),
+            integrality=np.zeros_like(self.integrality) if relax else self.integrality,
+            bounds=Bounds(self.lb, self.ub),
+            options={'time_limit': time_limit, 'disp': msg},
+        )
+        status = {0: 'Optimal', 1: 'Not Solved', 2: 'Infeasible', 3: 'Unbounded'}.get(res.status, 'Undefined')
+        if status == 'Not Solved' and res.x is not None:
+            status = 'Feasible'  # süre doldu ama uygun bir tamsayı çözüm var
+        return status, res.fun, res.x
+
+    def write_mps(self, path):
+        """
+        Modeli serbest formatlı MPS dosyasına toplu (satır satır Python döngüsü olmadan) yazar.
+        Satırlar R<n>, değişkenler C<n> olarak adlandırılır.
+        """
+        n_rows, n_vars = self.A.shape
+        eq = self.b_l == self.b_u
+        row_type = np.where(eq, 'E', 'L')
+
+        # Amaç satırı sütun bazlı yazım için matrisin en üstüne eklenir
+        full = sparse.vstack([sparse.csr_matrix(self.c), self.A]).tocsc()
+        full.sort_indices()
+        col_idx = np.repeat(np.arange(n_vars), np.diff(full.indptr))
+        row_names = np.concatenate([['OBJ'], 'R' + np.arange(n_rows).astype(str).astype(object)])
+        columns = pd.DataFrame({
+            'indent': '',
+            'col': 'C' + col_idx.astype(str).astype(object),
+            'row': row_names[full.indices],
+            'val': full.data,
+        })
+        rhs = self.b_u
+        rhs_mask = np.isfinite(rhs) & (rhs != 0)
+
+        with open(path, 'w') as f:
+            f.write("NAME DarkStore_Location_Optimization FREE\nROWS\n N OBJ\n")
+            pd.DataFrame({'indent': '', 't': row_type, 'r': 'R' + np.arange(n_rows).astype(str).astype(object)}).to_csv(
+                f, sep=' ', header=False, index=False)
+            f.write("COLUMNS\n MARK 'MARKER' 'INTORG'\n")
+            columns.to_csv(f, sep=' ', header=False, index=False, float_format='%.12g')
+            f.write(" MARK 'MARKER' 'INTEND'\nRHS\n")
+            pd.DataFrame({'indent': '', 'n': 'RHS', 'r': 'R' + np.flatnonzero(rhs_mask).astype(str).astype(object),
+                          'v': rhs[rhs_mask]}).to_csv(f, sep=' ', header=False, index=False, float_format='%.12g')
+            f.write("BOUNDS\n")
+            pd.DataFrame({'indent': '', 't': 'UP', 'n': 'BND', 'c': 'C' + np.arange(n_vars).astype(str).astype(object),
+                          'v': self.ub}).to_csv(f, sep=' ', header=False, index=False, float_format='%.12g')
+            f.write("ENDATA\n")
+
+    def solve_cbc(self, time_limit=60, msg=False, warm_start=None, cutoff=None):
+        """
+        Modeli MPS olarak yazar ve PuLP ile gelen CBC çalıştırılabilir dosyasıyla çözer.
+        warm_start: başlangıç çözümü vektörü (MIP start), cutoff: bilinen üst sınır.
+        Dönüş: (durum, amaç değeri, çözüm vektörü); süre dolduğunda bulunan en iyi çözüm 'Feasible' döner.
+        """
+        return CbcRun(self, time_limit=time_limit, msg=msg, warm_start=warm_start, cutoff=cutoff).start().wait()
+
+
+# CBC log satırlarından en iyi tamsayı çözüm (incumbent) ve alt sınır (bound) okuma kalıpları
+_NUM = r'([-+]?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)'
+_CBC_INCUMBENT = [re.compile(r'Integer solution of ' + _NUM), re.compile(r'Solution found of ' + _NUM),
+                  re.compile(r'improved solution from \S+ to ' + _NUM), re.compile(r'best objective ' + _NUM)]
+_CBC_BOUND = [re.compile(r'best possible ' + _NUM), re.compile(r'Continuous objective value is ' + _NUM),
+              re.compile(r'cuts changed objective from \S+ to ' + _NUM)]
+_CBC_NODES = re.compile(_NUM + r' best solution, best possible ' + _NUM)
+
+
+class CbcRun:
+    """
+    CBC'yi arka planda (alt süreç) çalıştırır ve logunu satır satır okuyarak en iyi tamsayı çözümü
+    (incumbent), en iyi alt sınırı ve boşluğu canlı olarak günceller.
+
+    stop() CBC'ye SIGINT gönderir: CBC aramayı keser ve o ana kadarki en iyi çözümü yazar,
+    yani erken durdurulan çözüm kaybolmaz.
+    """
+
+    def __init__(self, model, time_limit=60, msg=False, warm_start=None, cutoff=None):
+        self.model = model
+        self.time_limit = time_limit
+        self.msg = msg
+        self.warm_start = warm_start
+        self.cutoff = cutoff
+        self.incumbent = None
+        self.bound = None
+        self.history = []
+        self.stopped = False
+        self._proc = None
+        self._reader = None
+        self._tmp = None
+        self._t0 = None
+
+    def start(self):
+        import pulp
+
+        self._tmp = tempfile.mkdtemp(prefix='cbc_')
+        mps_path = os.path.join(self._tmp, 'model.mps')
+        self._sol_path = os.path.join(self._tmp, 'model.sol')
+        self.model.write_mps(mps_path)
+        # CBC -sec'i varsayılan olarak CPU süresi sayar; süre limiti duvar saatine göre olsun (PuLP'teki gibi)
+        cmd = [pulp.PULP_CBC_CMD().path, mps_path, '-timeMode', 'elapsed', '-sec', str(self.time_limit)]
+        if self.warm_start is not None:
+            mst_path = os.path.join(self._tmp, 'start.mst')
+            write_cbc_start(mst_path, self.warm_start)
+            cmd += ['-mips', mst_path]
+        if self.cutoff is not None:
+            cmd += ['-cutoff', repr(float(self.cutoff))]
+        # Boruya yazarken CBC çıktısı tamponlanır; stdbuf varsa satır tamponlamaya zorlanır
+        if shutil.which('stdbuf'):
+            cmd = ['stdbuf', '-oL'] + cmd
+        self._t0 = time.perf_counter()
+        self._proc = subprocess.Popen(cmd + ['-solve', '-solu', self._sol_path], stdout=subprocess.PIPE,
+                                      stderr=subprocess.STDOUT, text=True, bufsize=1)
+        self._reader = threading.Thread(target=self._read_log, daemon=True)
+        self._reader.start()
+        return self
+
+    def _read_log(self):
+        for line in self._proc.stdout:
+            if self.msg:
+                print(line, end='')
+            self._parse(line)
+
+    def _parse(self, line):
+        incumbent, bound = None, None
+        m = _CBC_NODES.search(line)
+        if m:
+            incumbent, bound = float(m.group(1)), float(m.group(2))
+        else:
+            for pat in _CBC_INCUMBENT:
+                m = pat.search(line)
+                if m:
+                    incumbent = float(m.group(1))
+                    break
+            for pat in _CBC_BOUND:
+                m = pat.search(line)
+                if m:
+                    bound = float(m.group(1))
+                    break
+            if 'Search completed' in line and incumbent is not None:
+                bound = incumbent
+        if incumbent is None and bound is None:
+            return
+
+        # CBC çözüm yokken 1e+50 yazar
+        if incumbent is not None and abs(incumbent) < 1e49:
+            self.incumbent = incumbent if self.incumbent is None else min(self.incumbent, incumbent)
+        if bound is not None and abs(bound) < 1e49:
+            self.bound = bound if self.bound is None else max(self.bound, bound)
+        self.history.append({'elapsed_s': self.elapsed, 'incumbent': self.incumbent,
+                             'bound': self.bound, 'gap': self.gap})
+
+    @property
+    def elapsed(self):
+        return 0.0 if self._t0 is None else time.perf_counter() - self._t0
+
+    @property
+    def gap(self):
+        if self.incumbent is None or self.bound is None or self.incumbent == 0:
+            return None
+        return max(self.incumbent - self.bound, 0.0) / abs(self.incumbent)
+
+    @property
+    def running(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def stop(self):
+        """Aramayı erken bitirir; en iyi çözüm yine de okunur."""
+        if self.running:
+            self.stopped = True
+            if os.name == 'nt':  # Windows'ta alt sürece SIGINT gönderilemez
+                self._proc.terminate()
+            else:
+                self._proc.send_signal(signal.SIGINT)
+
+    def wait(self):
+        """
+        CBC bitene kadar bekler. Dönüş: (durum, amaç değeri, çözüm vektörü)
+        """
+        try:
+            self._proc.wait()
+            self._reader.join()
+            if not os.path.exists(self._sol_path):
+                return 'Undefined', None, None
+            status, objective, values = read_cbc_solution(self._sol_path, self.model.A.shape[1])
+            # Erken durdurulan CBC, tamsayı çözüm bulamadıysa LP gevşetmesinin vektörünü yazar
+            if status == 'Feasible' and not self.model.is_feasible(values):
+                return 'Not Solved', None, None
+            return status, objective, values
+        finally:
+            shutil.rmtree(self._tmp, ignore_errors=True)
+
+
+def write_cbc_start(path, values):
+    """
+    CBC'nin '-mips' ile okuduğu başlangıç çözümü dosyasını yazar (C<n> isimleriyle).
+    """
+    idx = np.arange(len(values))
+    with open(path, 'w') as f:
+        f.write("Stopped on time - objective value 0\n")
+        pd.DataFrame({'i': idx, 'n': 'C' + idx.astype(str).astype(object), 'v': np.round(values), 'r': 0}).to_csv(
+            f, sep=' ', header=False, index=False, float_format='%.12g')
+
+
+def read_cbc_solution(sol_path, n_vars):
+    """
+    CBC '-solu' çıktısını okur. Değişken isimleri C<n> olmalıdır (bkz. MatrixModel.write_mps).
+    """
+    with open(sol_path) as f:
+        header = f.readline()
+        values = np.zeros(n_vars)
+        for line in f:
+            parts = line.replace('**', ' ').split()
+            if len(parts) >= 3 and parts[1].startswith('C'):
+                values[int(parts[1][1:])] = float(parts[2])
+
+    head = header.lower()
+    if head.startswith('optimal'):
+        status = 'Optimal'
+    elif 'infeasible' in head:
+        status = 'Infeasible'
+    elif 'unbounded' in head:
+        status = 'Unbounded'
+    elif head.startswith('stopped') and 'objective value' in head:
+        # Süre dolduğunda veya kullanıcı durdurduğunda yazılan vektör; tamsayı/uygunluk kontrolü
+        # çağıran tarafta yapılır (bkz. MatrixModel.is_feasible), aksi halde LP çözümü olabilir
+        status = 'Feasible'
+    else:
+        status = 'Not Solved'
+    objective = float(header.rsplit('objective value', 1)[1]) if 'objective value' in header else None
+    return status, objective, values
@@ -3,6 +3,29 @@ import numpy as np
 import pulp
 import os
 import math
+import time
+import threading
+import copy
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from src.distance import compute_valid_pairs, SiteIndex, ValidPairs, haversine_np
+    from src.data_store import load_table
+    from src.matrix_model import MatrixModel, CbcRun
+    from src.heuristics import HeuristicSolver, _grouped_cumsum
+    from src.profiling import RunMetrics
+    from src.results import OptimizationResult
+    from src.kpi import compute_kpis
+    from src.aggregation import aggregate_demand
+except ImportError:  # `python src/optimizer.py` ile doğrudan çalıştırıldığında
+    from distance import compute_valid_pairs, SiteIndex, ValidPairs, haversine_np
+    from data_store import load_table
+    from matrix_model import MatrixModel, CbcRun
+    from heuristics import HeuristicSolver, _grouped_cumsum
+    from profiling import RunMetrics
+    from results import OptimizationResult
+    from kpi import compute_kpis
+    from aggregation import aggregate_demand
 
 class LogisticsOptimizer:
     def __init__(self, demand_path, sites_path):
@@ -10,12 +33,49 @@ class LogisticsOptimizer:
         Verileri yükler ve optimizasyon modelini başlatır.
         """
         self.df_demand_path = demand_path # Path'i kaydet (Hata önleyici)
-        self.df_demand = pd.read_csv(demand_path)
-        self.df_sites = pd.read_csv(sites_path)
+        # Kaydedilen sonuçlar data/artifacts/<özet>/ altına yazılır (bkz. save_results)
+        self.artifact_dir = os.path.abspath(os.path.join(os.path.dirname(demand_path), '..', 'artifacts'))
+        # Tür kontrollü Arrow önbelleğinden okunur (CSV sadece ilk seferde / değiştiğinde ayrıştırılır).
+        # Koordinatlar (2, N) [lat; lon] bellek eşlemeli dizilerdir; süreçler arasında kopyasız paylaşılır.
+        self.load_metrics = RunMetrics()
+        with self.load_metrics.span('load'):
+            self.df_demand, self.demand_coords = load_table(demand_path, 'demand')
+            self.df_sites, self.site_coords = load_table(sites_path, 'sites')
+        self.load_metrics.count(n_customers=len(self.df_demand), n_sites=len(self.df_sites))
         
         # Parametreler (Business Development Kararları)
         self.MAX_RANGE_KM = 8.0  # Bir depo en fazla 8 km uzağa hizmet verebilsin
         self.COST_PER_KM = 5.0   # Km başı taşıma maliyeti (TL)
+        self.PAIR_METHOD = 'balltree'  # 'balltree' (uzamsal indeks) veya 'dense' (bloklu tam tarama)
+        # Yol ağı mesafe sağlayıcısı (bkz. use_road_network); None ise kuş uçuşu (haversine) kullanılır
+        self.distance_provider = None
+        # Çok dönemli / senaryolu talep (bkz. set_demand_periods); None ise daily_orders tek dönemdir
+        self.demand_periods = None
+        self.period_names = None
+        self.period_weights = None
+        self.period_capacity_scale = None
+        
+        # Depo seti başına bir kez kurulan uzamsal indeks ve menzil başına çift önbelleği
+        self._site_index = None
+        self._site_index_key = None
+        self._pairs_cache = {}
+        # Alt problem kopyalarında çiftler ana problemden hazır verilir (bkz. solve_decomposed)
+        self._fixed_pairs = None
+        self._fixed_metric = 'length'
+        
+        # Son çözümün sonuçları (solve_model doldurur)
+        self.df_results_sites = None
+        self.df_results_assignments = None
+        self.total_cost = None
+        self.last_status = None
+        self.last_solve_time = None
+        self.last_solution = None
+        self.last_bound = None
+        self.last_gap = None
+        self.last_metrics = None
+        self.last_result = None
+        self.last_aggregation = None  # son birleştirmeli çözümün hata raporu (bkz. solve_aggregated)
+        self._metrics = RunMetrics()  # aktif çalışmanın ölçümleri (solve_model yeniler)
         
         print(f"📊 Veri Yüklendi: {len(self.df_demand)} Müşteri, {len(self.df_sites)} Aday Depo")
 
@@ -32,121 +92,1151 @@ class LogisticsOptimizer:
         c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
         return R * c
 
-    def solve_model(self, max_stores_to_open=5):
+    def _sites_key(self):
+        return hash(np.asarray(self.site_coords).tobytes())
+
+    def get_site_index(self):
         """
-        Matematiksel Modeli (MILP) kurar ve çözer.
+        Depo seti için BallTree indeksini döner. Depo koordinatları değişmedikçe yeniden kurulmaz.
         """
-        print(f"\n⚙️ Optimizasyon Başlıyor... (Hedef: Max {max_stores_to_open} Depo)")
-        
-        # Kısaltmalar
-        I = self.df_demand.index.tolist() # Müşteriler
-        J = self.df_sites.index.tolist()  # Aday Depolar
-        
-        # 1. Mesafe Matrisini Hesapla
-        dist_matrix = {}
-        valid_pairs = [] # Mesafe kısıtına uyan çiftler
-        
-        for i in I:
-            for j in J:
-                d = self._haversine_distance(
-                    self.df_demand.loc[i, 'lat'], self.df_demand.loc[i, 'lon'],
-                    self.df_sites.loc[j, 'lat'], self.df_sites.loc[j, 'lon']
-                )
-                if d <= self.MAX_RANGE_KM:
-                    dist_matrix[(i, j)] = d
-                    valid_pairs.append((i, j))
-        
-        # 2. MODEL KURULUMU (PuLP)
+        key = self._sites_key()
+        if self._site_index is None or self._site_index_key != key:
+            self._site_index = SiteIndex(self.site_coords[0], self.site_coords[1])
+            self._site_index_key = key
+            self._pairs_cache = {}
+        return self._site_index
+
+    def compute_pairs(self, dtype=np.float64):
+        """
+        Menzil (MAX_RANGE_KM) içindeki müşteri-depo çiftlerini seyrek olarak döner (bkz. distance.ValidPairs).
+        PAIR_METHOD='balltree' ise depo indeksi üzerinden sorgulanır, 'dense' ise bloklu tam tarama yapılır.
+        Sonuç menzil başına önbelleğe alınır; slider'da sadece menzil değişirse indeks yeniden kullanılır.
+        distance_provider tanımlıysa kuş uçuşu çiftler aday olarak kullanılır ve mesafe yol ağından okunur.
+        """
+        if self._fixed_pairs is not None:
+            return self._fixed_pairs
+        if self.distance_provider is not None:
+            return self._road_pairs(dtype)
+        if self.PAIR_METHOD == 'dense':
+            return compute_valid_pairs(
+                self.demand_coords[0], self.demand_coords[1],
+                self.site_coords[0], self.site_coords[1],
+                self.MAX_RANGE_KM, dtype=dtype
+            )
+        if self.PAIR_METHOD != 'balltree':
+            raise ValueError(f"Bilinmeyen PAIR_METHOD: {self.PAIR_METHOD}")
+
+        index = self.get_site_index()
+        key = (float(self.MAX_RANGE_KM), np.dtype(dtype).str)
+        if key not in self._pairs_cache:
+            self._pairs_cache[key] = index.query_pairs(
+                self.demand_coords[0], self.demand_coords[1], self.MAX_RANGE_KM, dtype=dtype
+            )
+        return self._pairs_cache[key]
+
+    def use_road_network(self, osm_path=None, metric='length', provider=None):
+        """
+        Mesafe kaynağını yol ağına çevirir (bkz. road_network.RoadDistanceProvider).
+        metric='length' ise mesafeler km'dir ve maliyet modeli aynen çalışır; metric='time' ise
+        mesafeler dakikadır, MAX_RANGE_KM ve COST_PER_KM dakika başına yorumlanır.
+        osm_path=None ve provider=None ise kuş uçuşu mesafeye geri dönülür.
+        """
+        if provider is None and osm_path is not None:
+            try:
+                from src.road_network import RoadDistanceProvider
+            except ImportError:
+                from road_network import RoadDistanceProvider
+            provider = RoadDistanceProvider.from_osm(osm_path, metric=metric)
+        self.distance_provider = provider
+        if provider is not None:
+            g = provider.graph
+            print(f"🛣️ Yol Ağı Yüklendi: {g.n_nodes} düğüm, {g.n_edges} kenar (metrik: {provider.metric})")
+        return provider
+
+    def _road_pairs(self, dtype):
+        provider = self.distance_provider
+        key = ('road',) + provider.key + (self._sites_key(), float(self.MAX_RANGE_KM), np.dtype(dtype).str)
+        if key not in self._pairs_cache:
+            # Yol mesafesi kuş uçuşundan kısa olamaz: menzil dışı kombinasyonlar indeksle elenir
+            candidates = self.get_site_index().query_pairs(
+                self.demand_coords[0], self.demand_coords[1], self.MAX_RANGE_KM * provider.km_per_unit
+            )
+            self._pairs_cache[key] = provider.query_pairs(
+                self.demand_coords[0], self.demand_coords[1], self.site_coords[0], self.site_coords[1],
+                self.MAX_RANGE_KM, candidates=candidates, dtype=dtype
+            )
+        return self._pairs_cache[key]
+
+    def set_demand_periods(self, demand, names=None, weights=None, capacity_scale=None):
+        """
+        Talebi (müşteri x dönem) matrisi olarak tanımlar: gün içi zaman dilimleri veya stokastik senaryolar.
+        demand: (N, T) dizi (df_demand satır sırasında) ya da 'id' kolonlu DataFrame (diğer kolonlar dönemlerdir).
+        weights: taşıma maliyetinde dönem ağırlıkları. Varsayılan 1 (dilimler günü böler, maliyet toplamdan gelir);
+                 senaryolar için olasılıklar verilir (beklenen günlük maliyet).
+        capacity_scale: dönem başına depo kapasitesinin kullanılabilir oranı (varsayılan 1: her dönemde tam kapasite;
+                        ör. akşam dilimi için saatlik kapasite payı).
+        Kapasite kısıtı her dönem için ayrı yazılır; atamalar dönemler arasında sabittir.
+        demand=None ise tek dönemli (daily_orders) modele dönülür.
+        """
+        if demand is None:
+            self.demand_periods = self.period_names = self.period_weights = self.period_capacity_scale = None
+            return
+        if isinstance(demand, pd.DataFrame):
+            if 'id' in demand.columns:
+                demand = demand.set_index('id').reindex(self.df_demand['id'])
+                if demand.isna().any().any():
+                    raise ValueError("Dönem talebinde eksik müşteri(ler) var")
+            names = list(demand.columns) if names is None else names
+            demand = demand.to_numpy(dtype=np.float64)
+        demand = np.asarray(demand, dtype=np.float64)
+        if demand.ndim == 1:
+            demand = demand[:, None]
+        n, t = demand.shape
+        if n != len(self.df_demand):
+            raise ValueError(f"Dönem talebi {n} satır, müşteri sayısı {len(self.df_demand)}")
+        if (demand < 0).any():
+            raise ValueError("Dönem talebi negatif olamaz")
+        self.demand_periods = demand
+        self.period_names = list(names) if names is not None else [f"t{i}" for i in range(t)]
+        self.period_weights = np.ones(t) if weights is None else np.asarray(weights, dtype=np.float64)
+        self.period_capacity_scale = np.ones(t) if capacity_scale is None else \
+            np.broadcast_to(np.asarray(capacity_scale, dtype=np.float64), (t,)).copy()
+        if (self.period_capacity_scale <= 0).any():
+            raise ValueError("capacity_scale pozitif olmalı")
+
+    @property
+    def n_periods(self):
+        return 1 if self.demand_periods is None else self.demand_periods.shape[1]
+
+    @property
+    def distance_metric(self):
+        """Çift mesafelerinin birimi: 'length' (km) veya 'time' (dk; yol ağı süre metriği)."""
+        if self.distance_provider is not None:
+            return self.distance_provider.metric
+        return self._fixed_metric if self._fixed_pairs is not None else 'length'
+
+    def cost_orders(self):
+        """Taşıma maliyetinde kullanılan müşteri talebi: tek dönemde daily_orders, aksi halde ağırlıklı toplam."""
+        if self.demand_periods is None:
+            return self.df_demand['daily_orders'].to_numpy(dtype=np.float64)
+        return self.demand_periods @ self.period_weights
+
+    def capacity_orders(self):
+        """
+        Kapasite kısıtındaki (N, T) yükler; dönem kapasite oranına bölünerek tam depo kapasitesiyle
+        karşılaştırılabilir hale getirilir (sum_i d_it x_ij <= s_t cap_j  <=>  sum_i d_it/s_t x_ij <= cap_j).
+        """
+        if self.demand_periods is None:
+            return self.df_demand['daily_orders'].to_numpy(dtype=np.float64)[:, None]
+        return self.demand_periods / self.period_capacity_scale[None, :]
+
+    def period_load(self, result=None):
+        """
+        Açık depoların dönem bazlı kapasite kullanım oranı (depo x dönem tablosu; 1.0 = tam dolu).
+        """
+        result = result if result is not None else self.last_result
+        if result is None:
+            return None
+        cust_pos = pd.Index(self.df_demand['id']).get_indexer(result.assignments['customer_id'])
+        site_pos = pd.Index(result.sites['site_id']).get_indexer(result.assignments['assigned_site_id'])
+        loads = self.capacity_orders()[cust_pos]
+        n_open = len(result.sites)
+        usage = np.stack([np.bincount(site_pos, weights=col, minlength=n_open) for col in loads.T], axis=1)
+        usage /= result.sites['capacity'].to_numpy(dtype=np.float64)[:, None]
+        names = self.period_names or ['daily_orders']
+        return pd.DataFrame(usage, index=result.sites['site_id'], columns=names)
+
+    def build_model(self, pairs, max_stores_to_open=5):
+        """
+        PuLP modelini müşteri ve depo bazlı komşuluk indeksleri üzerinden kurar.
+        Katsayılar NumPy dizilerinden gelir; df.loc veya liste üyelik testi yapılmaz.
+        Dönüş: (prob, y, x) -> y[j] pozisyonel depo değişkenleri, x[k] k. çiftin değişkeni.
+        """
+        cust, site = pairs.cust, pairs.site
+        orders = self.cost_orders()
+        period_orders = self.capacity_orders()
+        rent = self.df_sites['rent_cost'].to_numpy(dtype=np.float64)
+        capacity = self.df_sites['capacity'].to_numpy(dtype=np.float64)
+        cust_labels = self.df_demand.index.to_numpy()
+        site_labels = self.df_sites.index.to_numpy()
+        pair_orders = orders[cust]
+        transport_coef = pairs.dist.astype(np.float64) * self.COST_PER_KM * pair_orders
+
         prob = pulp.LpProblem("DarkStore_Location_Optimization", pulp.LpMinimize)
         
         # --- KARAR DEĞİŞKENLERİ ---
         # y[j]: Depo j açılacak mı? (1: Evet, 0: Hayır)
-        y = pulp.LpVariable.dicts("Open_Depot", J, cat='Binary')
+        y = [pulp.LpVariable(f"Open_Depot_{j}", cat='Binary') for j in site_labels]
         
-        # x[i][j]: Müşteri i, depo j tarafından mı hizmet alacak? (1: Evet, 0: Hayır)
-        x = pulp.LpVariable.dicts("Assign", valid_pairs, cat='Binary')
+        # x[k]: k. çiftin müşterisi, çiftin deposundan mı hizmet alacak? (1: Evet, 0: Hayır)
+        x = [
+            pulp.LpVariable(f"Assign_{i}_{j}", cat='Binary')
+            for i, j in zip(cust_labels[cust].tolist(), site_labels[site].tolist())
+        ]
 
         # --- AMAÇ FONKSİYONU (Minimize Total Cost) ---
-        # Sabit Giderler
-        fixed_costs = pulp.lpSum([self.df_sites.loc[j, 'rent_cost'] * y[j] for j in J])
-        
-        # Taşıma Maliyetleri
-        transport_costs = pulp.lpSum([
-            dist_matrix[(i,j)] * self.COST_PER_KM * self.df_demand.loc[i, 'daily_orders'] * x[(i,j)]
-            for (i,j) in valid_pairs
-        ])
-        
-        prob += fixed_costs + transport_costs
+        # Sabit Giderler + Taşıma Maliyetleri
+        prob.setObjective(pulp.LpAffineExpression(
+            list(zip(y, rent.tolist())) + list(zip(x, transport_coef.tolist()))
+        ))
+
+        # --- KOMŞULUK İNDEKSLERİ ---
+        # Müşteri bazlı: çiftler müşteriye göre sıralı, x[cust_ptr[i]:cust_ptr[i+1]]
+        cust_ptr = pairs.indptr.tolist()
+        # Depo bazlı: by_site[site_ptr[j]:site_ptr[j+1]] depo j'nin çift indeksleri
+        by_site = np.argsort(site, kind='stable').tolist()
+        site_ptr = np.concatenate([[0], np.cumsum(np.bincount(site, minlength=len(y)))]).tolist()
+        site_list = site.tolist()
+        # Kapasite yükleri: dönem başına bir sütun (tek dönemde daily_orders)
+        period_pair_orders = [col.tolist() for col in period_orders[cust].T]
 
         # --- KISITLAR ---
         
         # Kısıt 1: Her müşteri SADECE 1 depodan hizmet almalı
-        for i in I:
-            possible_depots = [j for j in J if (i,j) in valid_pairs]
-            if possible_depots:
-                prob += pulp.lpSum([x[(i,j)] for j in possible_depots]) == 1
+        for i in range(pairs.n_customers):
+            lo, hi = cust_ptr[i], cust_ptr[i + 1]
+            if hi > lo:
+                prob += pulp.LpAffineExpression([(x[k], 1) for k in range(lo, hi)]) == 1
 
         # Kısıt 2: Müşteri atanırsa depo açık olmalı
-        for (i,j) in valid_pairs:
-            prob += x[(i,j)] <= y[j]
+        for k, j in enumerate(site_list):
+            prob += pulp.LpAffineExpression([(x[k], 1), (y[j], -1)]) <= 0
             
-        # Kısıt 3: Depo Kapasitesi
-        for j in J:
-            orders_assigned_to_j = [
-                self.df_demand.loc[i, 'daily_orders'] * x[(i,j)] 
-                for i in I if (i,j) in valid_pairs
-            ]
-            prob += pulp.lpSum(orders_assigned_to_j) <= self.df_sites.loc[j, 'capacity'] * y[j]
+        # Kısıt 3: Depo Kapasitesi (her dönem için ayrı)
+        for pair_orders in period_pair_orders:
+            for j, cap in enumerate(capacity.tolist()):
+                ks = by_site[site_ptr[j]:site_ptr[j + 1]]
+                prob += pulp.LpAffineExpression([(x[k], pair_orders[k]) for k in ks] + [(y[j], -cap)]) <= 0
 
         # Kısıt 4: Maksimum açılacak depo sayısı
-        prob += pulp.lpSum([y[j] for j in J]) <= max_stores_to_open
+        prob += pulp.LpAffineExpression([(v, 1) for v in y]) <= max_stores_to_open
+
+        return prob, y, x
+
+    def build_matrix_model(self, pairs, max_stores_to_open=5):
+        """
+        Aynı MILP'i PuLP nesneleri olmadan seyrek matrisler (A, b, c, sınırlar, tamsayılık) olarak kurar.
+        """
+        return MatrixModel(
+            pairs,
+            orders=self.cost_orders(),
+            rent=self.df_sites['rent_cost'].to_numpy(),
+            capacity=self.df_sites['capacity'].to_numpy(),
+            cost_per_km=self.COST_PER_KM,
+            max_stores_to_open=max_stores_to_open,
+            period_orders=self.capacity_orders() if self.demand_periods is not None else None,
+        )
+
+    def build_heuristic(self, pairs):
+        """
+        Çift verisi üzerinden sezgisel çözücüyü (bkz. heuristics.HeuristicSolver) kurar.
+        """
+        # Çok dönemde kapasite için en kötü dönem yükü kullanılır: her dönemde uygun, muhafazakâr bir ağ
+        return HeuristicSolver(
+            pairs,
+            orders=self.capacity_orders().max(axis=1),
+            rent=self.df_sites['rent_cost'].to_numpy(),
+            capacity=self.df_sites['capacity'].to_numpy(),
+            cost_per_km=self.COST_PER_KM,
+            cost_orders=self.cost_orders(),
+        )
+
+    def _solve_milp(self, pairs, max_stores_to_open, backend, time_limit, warm_start, cutoff):
+        """
+        MILP'i seçilen backend ile kurar ve çözer. Dönüş: (durum, amaç, y, x)
+        """
+        y_val = x_val = None
+        metrics = self._metrics
+        if backend == 'pulp':
+            with metrics.span('build'):
+                prob, y, x = self.build_model(pairs, max_stores_to_open)
+            metrics.count(n_variables=len(y) + len(x), n_constraints=len(prob.constraints),
+                          n_nonzeros=(3 + self.n_periods) * len(x) + (1 + self.n_periods) * len(y))
+            if warm_start is not None:
+                for v, val in zip(y + x, np.concatenate(warm_start).tolist()):
+                    v.setInitialValue(round(val))
+            options = [f"cutoff {float(cutoff)!r}"] if cutoff is not None else []
+            # msg=0 logları kapatır, hata ayıklamak istersen 1 yapabilirsin
+            with metrics.span('solve'):
+                prob.solve(pulp.PULP_CBC_CMD(msg=1, timeLimit=time_limit, warmStart=warm_start is not None,
+                                             options=options))
+            status = pulp.LpStatus[prob.status]
+            # Süre dolduğunda PuLP 'Optimal' der; çözüm sadece uygun ise bunu ayırt et
+            if status == 'Optimal' and prob.sol_status == pulp.LpSolutionIntegerFeasible:
+                status = 'Feasible'
+            # Durdurulan CBC kesirli (LP) bir vektör döndürebilir; tamsayılık ve kısıtlar doğrulanır
+            valid = all(v.varValue is not None for v in y + x) and prob.valid(eps=1e-6)
+            if status in ('Optimal', 'Feasible') and not valid:
+                status = 'Not Solved'
+            if status in ('Optimal', 'Feasible'):
+                total_cost = pulp.value(prob.objective)
+                y_val = np.array([v.varValue for v in y], dtype=np.float64)
+                x_val = np.array([v.varValue for v in x], dtype=np.float64)
+            else:
+                total_cost = None
+        elif backend in ('highs', 'cbc_mps'):
+            with metrics.span('build'):
+                model = self.build_matrix_model(pairs, max_stores_to_open)
+            metrics.count(n_variables=model.shape[1], n_constraints=model.shape[0], n_nonzeros=int(model.A.nnz))
+            with metrics.span('solve'):
+                if backend == 'highs':
+                    status, total_cost, values = model.solve_highs(time_limit=time_limit)
+                else:
+                    start = np.concatenate(warm_start) if warm_start is not None else None
+                    status, total_cost, values = model.solve_cbc(time_limit=time_limit, warm_start=start,
+                                                                 cutoff=cutoff)
+            if values is not None:
+                y_val, x_val = model.split(values)
+        else:
+            raise ValueError(f"Bilinmeyen backend: {backend}")
+        metrics.set_solver(backend=backend, status=status, objective=total_cost, time_limit_s=time_limit,
+                           warm_start=warm_start is not None, cutoff=cutoff)
+        return status, total_cost, y_val, x_val
+
+    def _solve_heuristic(self, pairs, max_stores_to_open, time_limit, compute_bound=True):
+        """
+        Açgözlü ekleme/çıkarma + yerel arama. LP gevşetmesi ile alt sınır ve boşluk raporlanır.
+        Dönüş: (durum, amaç, y, x)
+        """
+        metrics = self._metrics
+        with metrics.span('build'):
+            solver = self.build_heuristic(pairs)
+        with metrics.span('solve'):
+            open_mask, assigned, cost, feasible = solver.solve(max_stores_to_open, time_limit=time_limit)
+            y_val, x_val = solver.to_solution(open_mask, assigned, len(pairs))
+        status = 'Feasible' if feasible else 'Infeasible'
+
+        self.last_bound = None
+        self.last_gap = None
+        if compute_bound and feasible:
+            with metrics.span('lp_bound'):
+                lp_status, bound, _ = self.build_matrix_model(pairs, max_stores_to_open).solve_highs(
+                    time_limit=time_limit, relax=True)
+            if lp_status == 'Optimal':
+                self.last_bound = bound
+                self.last_gap = (cost - bound) / cost if cost else 0.0
+                print(f"📉 LP Alt Sınırı: {bound:,.2f} TL | Optimallik Boşluğu: %{100 * self.last_gap:.2f}")
+        metrics.set_solver(backend='heuristic', status=status, objective=cost, time_limit_s=time_limit,
+                           bound=self.last_bound, gap=self.last_gap)
+        return status, cost, y_val, x_val
+
+    def _solve_lagrangian(self, pairs, max_stores_to_open, time_limit):
+        """
+        Lagrange gevşetmesi + alt-gradyan ile alt/üst sınır üretir. Dönüş: (durum, amaç, y, x)
+        """
+        metrics = self._metrics
+        with metrics.span('build'):
+            solver = self.build_heuristic(pairs)
+        engine = LagrangianRelaxation(solver)
+        with metrics.span('solve'):
+            open_mask, assigned, ub, lb, feasible = engine.solve(max_stores_to_open, time_limit=time_limit)
+        self.lagrangian_history = pd.DataFrame(engine.history)
+        if self.n_periods > 1:
+            # Gevşetme en kötü dönem yüküyle kurulur (bkz. build_heuristic): dönem kısıtlarından daha sıkı
+            # olduğundan değer geçerli bir alt sınır değildir, yalnızca sezgisel tahmin olarak raporlanır
+            self.last_bound = self.last_gap = None
+            if feasible:
+                print(f"📉 Lagrange Tahmini (sezgisel, alt sınır değil): {lb:,.2f} TL")
+        else:
+            self.last_bound = lb
+            self.last_gap = (ub - lb) / ub if feasible and ub else None
+            if feasible:
+                print(f"📉 Lagrange Alt Sınırı: {lb:,.2f} TL | Optimallik Boşluğu: %{100 * self.last_gap:.2f}")
+        y_val, x_val = solver.to_solution(open_mask, assigned, len(pairs))
+        metrics.set_solver(backend='lagrangian', status='Feasible' if feasible else 'Infeasible', objective=ub,
+                           time_limit_s=time_limit, bound=self.last_bound, gap=self.last_gap,
+                           bound_estimate=lb if self.n_periods > 1 else None, iterations=len(engine.history))
+        return ('Feasible' if feasible else 'Infeasible'), ub, y_val, x_val
+
+    def _collect_results(self, pairs, y_val, x_val):
+        """
+        Çözüm vektörlerinden seçilen depo ve müşteri atama tablolarını kurar.
+        Dönüş: (depolar, atamalar, (y, x) 0/1 dizileri)
+        """
+        open_mask = y_val > 0.5
+        chosen = x_val > 0.5
+
+        df_results_sites = self.df_sites[open_mask].reset_index(drop=True)
+        df_results_sites['is_selected'] = 1
+        df_results_assignments = pd.DataFrame({
+            'customer_id': self.df_demand['id'].to_numpy()[pairs.cust[chosen]],
+            'assigned_site_id': self.df_sites['site_id'].to_numpy()[pairs.site[chosen]],
+            'distance_km': pairs.dist[chosen]
+        })
+        return df_results_sites, df_results_assignments, (open_mask.astype(np.float64), chosen.astype(np.float64))
+
+    def solution_kpis(self, pairs, y_val, x_val):
+        """
+        Çözüm vektörlerinden gösterge paneli KPI'ları (bkz. kpi.compute_kpis): depo yükü ve kullanım oranı,
+        sipariş ağırlıklı mesafe yüzdelikleri, kira / taşıma maliyet kırılımı. Çözüm başına bir kez hesaplanır.
+        """
+        chosen = x_val > 0.5
+        return compute_kpis(pairs.cust[chosen], pairs.site[chosen], pairs.dist[chosen], self.cost_orders(),
+                            y_val > 0.5, self.df_sites['rent_cost'].to_numpy(), self.df_sites['capacity'].to_numpy(),
+                            self.COST_PER_KM, self.df_sites['site_id'].to_numpy(), len(self.df_demand),
+                            capacity_orders=self.capacity_orders(), metric=self.distance_metric)
+
+    def result_kpis(self, result):
+        """KPI'ları kayıtlı bir sonucun tablolarından hesaplar (KPI'sız yazılmış eski artifact'lar için)."""
+        cust = pd.Index(self.df_demand['id']).get_indexer(result.assignments['customer_id'])
+        site = pd.Index(self.df_sites['site_id']).get_indexer(result.assignments['assigned_site_id'])
+        open_mask = self.df_sites['site_id'].isin(result.sites['site_id']).to_numpy()
+        return compute_kpis(cust, site, result.assignments['distance_km'].to_numpy(), self.cost_orders(), open_mask,
+                            self.df_sites['rent_cost'].to_numpy(), self.df_sites['capacity'].to_numpy(),
+                            self.COST_PER_KM, self.df_sites['site_id'].to_numpy(), len(self.df_demand),
+                            capacity_orders=self.capacity_orders(), metric=self.distance_metric)
+
+    def start_background_solve(self, max_stores_to_open=5, time_limit=60, warm_start=None, cutoff=None):
+        """
+        MILP'i arka planda CBC ile çözmeye başlar ve hemen döner (bkz. BackgroundSolve).
+        Çiftler çağıran iş parçacığında hesaplanır; böylece MAX_RANGE_KM sonradan değişse de iş etkilenmez.
+        """
+        return BackgroundSolve(self, self.compute_pairs(), max_stores_to_open, time_limit, warm_start, cutoff).start()
+
+    def solve_model(self, max_stores_to_open=5, backend='pulp', save=False, time_limit=60,
+                    warm_start=None, cutoff=None, method='milp', polish=False,
+                    metrics=None, profile=False, trace_memory=False, site_mask=None):
+        """
+        Matematiksel Modeli (MILP) kurar ve çözer.
+        backend: 'pulp'    -> PuLP ifadeleri + CBC (varsayılan)
+                 'highs'   -> seyrek matris + scipy.optimize.milp (HiGHS)
+                 'cbc_mps' -> seyrek matris, MPS dosyası olarak toplu yazılıp CBC ile çözülür
+        Dönüş: OptimizationResult (depolar, atamalar, amaç, durum, ölçümler) veya uygun çözüm yoksa None.
+               self.last_result / self.df_results_sites / self.df_results_assignments / self.total_cost da doldurulur.
+        save: True ise sonuç ayrıca save_results() ile kendi artifact klasörüne yazılır.
+        warm_start: (y, x) çözüm dizileri; aynı menzildeki önceki çözüm MIP start olarak verilir
+                    ('pulp' ve 'cbc_mps'; HiGHS başlangıç çözümü desteklemez).
+        cutoff: bilinen üst sınır; bundan kötü dallar budanır (sadece CBC).
+        method: 'milp' (kesin çözüm), 'heuristic' (büyük örnekler için saniyeler içinde uygun ağ) veya
+                'lagrangian' (şehir ölçeği için ayrıştırma; her iterasyonda alt/üst sınır raporlanır).
+        polish: method='heuristic' veya 'lagrangian' iken True ise sezgisel çözüm MILP'e sıcak başlangıç olarak verilir;
+                MILP daha iyisini bulamazsa sezgisel çözüm döner.
+        metrics: doldurulacak RunMetrics (verilmezse yenisi oluşturulur); her durumda self.last_metrics'e yazılır.
+        profile / trace_memory: cProfile ve tracemalloc ile izleme (bkz. profiling.RunMetrics).
+        site_mask: verilirse sadece bu (boolean, df_sites sırasında) depolar açılabilir.
+        """
+        metrics = metrics if metrics is not None else RunMetrics(profile=profile, trace_memory=trace_memory)
+        self._metrics = self.last_metrics = metrics
+        with metrics.run():
+            result = self._solve_model(max_stores_to_open, backend, time_limit, warm_start, cutoff, method, polish,
+                                       site_mask)
+        if result is not None:
+            result.bound, result.gap = metrics.solver.get('bound'), metrics.solver.get('gap')
+            if save:
+                # Artifact'a yazma anındaki ölçümler girer; dönen sonuçtaki özet export aşamasını da içerir
+                result.metrics = metrics.summary()
+                with metrics.span('export'):
+                    self.save_results()
+            result.metrics = metrics.summary()
+        print(metrics.report())
+        return result
+
+    def _solve_model(self, max_stores_to_open, backend, time_limit, warm_start, cutoff, method, polish, site_mask):
+        print(f"\n⚙️ Optimizasyon Başlıyor... (Hedef: Max {max_stores_to_open} Depo, Yöntem: {method}, Backend: {backend})")
+        
+        # 1. Mesafe Matrisini Hesapla (vektörel; sadece menzil içindeki çiftler döner)
+        metrics = self._metrics
+        with metrics.span('pairs'):
+            pairs = self.compute_pairs()
+            if site_mask is not None:
+                pairs = pairs.select(np.asarray(site_mask, dtype=bool)[pairs.site])
+        metrics.count(n_periods=self.n_periods, n_customers=pairs.n_customers, n_sites=pairs.n_sites, n_pairs=len(pairs),
+                      max_range_km=float(self.MAX_RANGE_KM))
         
-        # --- ÇÖZÜM ---
-        # msg=0 logları kapatır, hata ayıklamak istersen 1 yapabilirsin
-        prob.solve(pulp.PULP_CBC_CMD(msg=1, timeLimit=60))
+        # 2. MODEL KURULUMU VE ÇÖZÜM
+        t_build = time.perf_counter()
+        if method == 'milp':
+            status, total_cost, y_val, x_val = self._solve_milp(
+                pairs, max_stores_to_open, backend, time_limit, warm_start, cutoff)
+        elif method == 'heuristic':
+            status, total_cost, y_val, x_val = self._solve_heuristic(pairs, max_stores_to_open, time_limit)
+        elif method == 'lagrangian':
+            status, total_cost, y_val, x_val = self._solve_lagrangian(pairs, max_stores_to_open, time_limit)
+        else:
+            raise ValueError(f"Bilinmeyen yöntem: {method}")
+        if method != 'milp' and polish and status == 'Feasible':
+            print(f"🔧 Sezgisel çözüm ({total_cost:,.2f} TL) MILP'e başlangıç olarak veriliyor...")
+            milp_result = self._solve_milp(pairs, max_stores_to_open, backend, time_limit,
+                                           (y_val, x_val), total_cost * (1 + 1e-9))
+            if milp_result[0] in ('Optimal', 'Feasible') and milp_result[1] is not None and milp_result[1] <= total_cost:
+                status, total_cost, y_val, x_val = milp_result
+        t_done = time.perf_counter()
         
-        status = pulp.LpStatus[prob.status]
         print(f"✅ Çözüm Durumu: {status}")
+        if status == 'Feasible' and method == 'milp':
+            print("⏳ Süre limiti doldu: bulunan en iyi uygun ağ döndürülüyor (optimallik kanıtlanmadı).")
+        print(f"⏱️ Kurulum + Çözüm: {t_done - t_build:.2f} sn")
+        self.last_status = status
+        self.last_solve_time = t_done - t_build
+        self.last_solution = None
+        self.last_result = None
         
-        if status != 'Optimal':
+        if status not in ('Optimal', 'Feasible'):
             print("❌ Uygun çözüm bulunamadı!")
             return None
 
         # --- SONUÇLARI TOPARLA ---
-        selected_sites = []
-        for j in J:
-            if y[j].varValue > 0.5:
-                site_data = self.df_sites.loc[j].to_dict()
-                site_data['is_selected'] = 1
-                selected_sites.append(site_data)
+        with metrics.span('results'):
+            df_results_sites, df_results_assignments, solution = self._collect_results(pairs, y_val, x_val)
+            kpis = self.solution_kpis(pairs, y_val, x_val)
         
-        assignments = []
-        for (i,j) in valid_pairs:
-            if x[(i,j)].varValue > 0.5:
-                assignments.append({
-                    'customer_id': self.df_demand.loc[i, 'id'],
-                    'assigned_site_id': self.df_sites.loc[j, 'site_id'],
-                    'distance_km': dist_matrix[(i,j)]
-                })
-                
-        df_results_sites = pd.DataFrame(selected_sites)
-        df_results_assignments = pd.DataFrame(assignments)
+        self.df_results_sites = df_results_sites
+        self.df_results_assignments = df_results_assignments
+        self.total_cost = total_cost
+        self.last_solution = solution
+        self.last_result = OptimizationResult(
+            df_results_sites, df_results_assignments, total_cost, status,
+            params=self._result_params(max_stores_to_open, method, backend), kpis=kpis,
+        )
         
-        # Kaydet
-        # self.df_demand_path kullanarak üst klasöre çıkıyoruz
-        output_dir = os.path.join(os.path.dirname(self.df_demand_path), '../processed')
-        # os.path.abspath ile yolun tam olduğundan emin olalım
-        output_dir = os.path.abspath(output_dir)
-        os.makedirs(output_dir, exist_ok=True)
-        
-        df_results_sites.to_csv(os.path.join(output_dir, 'selected_sites.csv'), index=False)
-        df_results_assignments.to_csv(os.path.join(output_dir, 'customer_assignments.csv'), index=False)
-        
-        total_cost = pulp.value(prob.objective)
         print(f"💰 Toplam Minimize Edilmiş Maliyet: {total_cost:,.2f} TL")
         print(f"🏭 Seçilen Depo Sayısı: {len(df_results_sites)}")
         
-        return df_results_sites
+        return self.last_result
+
+    def _result_params(self, max_stores_to_open, method, backend):
+        return {'max_stores_to_open': int(max_stores_to_open), 'max_range_km': float(self.MAX_RANGE_KM),
+                'cost_per_km': float(self.COST_PER_KM), 'method': method, 'backend': backend}
+
+    def save_results(self, root_dir=None):
+        """
+        Son çözümü (self.last_result) içerik özetli kendi klasörüne yazar ve yolu döner:
+        <root_dir>/<özet>/ (varsayılan root_dir: data/artifacts). Eşzamanlı çalışmalar birbirini ezmez.
+        """
+        if self.last_result is None:
+            raise ValueError("Kaydedilecek çözüm yok; önce solve_model çalıştırılmalı")
+        path = self.last_result.save(root_dir or self.artifact_dir)
+        print(f"💾 Sonuçlar kaydedildi: {path}")
+        return path
+
+    def sweep(self, k_values=range(1, 11), ranges=None, backend='pulp', time_limit=60, n_jobs=None, on_row=None):
+        """
+        (max_stores_to_open, MAX_RANGE_KM) ızgarasını çözer ve maliyet-k eğrisi için düzenli bir tablo döner.
+
+        Aynı menzil için k küçükten büyüğe çözülür: k-1 çözümü k için de uygundur, bu yüzden
+        MIP start ve cutoff (üst sınır) olarak bir sonrakine aktarılır. Farklı menziller birbirinden
+        bağımsızdır ve n_jobs > 1 ise ayrı süreçlerde paralel çözülür.
+        on_row: seri çalışmada her çözümden sonra satırla çağrılır (ilerleme bildirimi); True dönerse
+                tarama durdurulur ve o ana kadarki satırlar döner.
+        """
+        ranges = [self.MAX_RANGE_KM] if ranges is None else list(ranges)
+        k_values = sorted(k_values)
+        n_jobs = n_jobs or os.cpu_count() or 1
+        print(f"\n📈 Senaryo Taraması: {len(k_values)} depo sayısı x {len(ranges)} menzil")
+
+        if n_jobs == 1 or len(ranges) == 1:
+            rows = []
+            for range_km in ranges:
+                chain, stopped = _solve_chain(self, range_km, k_values, backend, time_limit, on_row)
+                rows += chain
+                if stopped:
+                    break
+        else:
+            with ProcessPoolExecutor(max_workers=min(n_jobs, len(ranges))) as pool:
+                chains = pool.map(_solve_chain, [self] * len(ranges), ranges,
+                                  [k_values] * len(ranges), [backend] * len(ranges), [time_limit] * len(ranges))
+                rows = [r for chain, _ in chains for r in chain]
+
+        return pd.DataFrame(rows, columns=['max_range_km', 'max_stores_to_open', 'status', 'total_cost',
+                                           'n_open', 'open_sites', 'solve_time_s'])
+
+    def solve_scenarios(self, max_stores_to_open=5, batch_size=None, n_jobs=None, backend='highs', time_limit=60,
+                        method='milp'):
+        """
+        Çok dönemli / senaryolu talebi (bkz. set_demand_periods) çözer.
+
+        batch_size verilmezse (veya dönem sayısı küçükse) tüm dönemler tek modelde çözülür.
+        Aksi halde dönemler batch_size'lık gruplara bölünür, her grup ayrı süreçte kendi ağını çözer;
+        grupların açtığı depoların birleşimi aday küme olarak alınır ve TÜM dönemlerin kapasite kısıtlarıyla
+        yeniden çözülür. Böylece dönen ağ her senaryoda uygundur (sağlam ağ), büyük model ise sadece
+        küçük aday kümede kurulur. Kısıtlı aday kümede bulunan çözüm 'Feasible' olarak döner (optimallik kanıtı yok).
+        """
+        t = self.n_periods
+        if self.demand_periods is None or batch_size is None or t <= batch_size:
+            return self.solve_model(max_stores_to_open, backend=backend, time_limit=time_limit, method=method)
+
+        batches = np.array_split(np.arange(t), int(np.ceil(t / batch_size)))
+        n_jobs = n_jobs or os.cpu_count() or 1
+        print(f"\n🧩 Senaryo Grupları: {t} dönem, {len(batches)} grup ({n_jobs} süreç)")
+        args = ([max_stores_to_open] * len(batches), [backend] * len(batches), [time_limit] * len(batches),
+                [method] * len(batches))
+        if n_jobs == 1:
+            masks = list(map(_solve_batch, [self] * len(batches), batches, *args))
+        else:
+            with ProcessPoolExecutor(max_workers=min(n_jobs, len(batches))) as pool:
+                masks = list(pool.map(_solve_batch, [self] * len(batches), batches, *args))
+
+        masks = [m for m in masks if m is not None]
+        candidates = np.logical_or.reduce(masks) if masks else None
+        if candidates is not None:
+            print(f"🔗 Grup ağlarının birleşimi: {int(candidates.sum())} aday depo, tüm dönemlerle yeniden çözülüyor")
+            result = self.solve_model(max_stores_to_open, backend=backend, time_limit=time_limit, method=method,
+                                      site_mask=candidates)
+            if result is not None:
+                # Aday küme kısıtlı olduğundan optimallik ve alt sınır tam model için kanıt değildir
+                if result.status == 'Optimal':
+                    result.status = self.last_status = 'Feasible'
+                result.bound, result.gap = None, None
+                return result
+        # Birleşim kümesi bütçe içinde tüm dönemleri karşılayamıyorsa tam model çözülür
+        print("↩️ Aday küme yetersiz; tüm depolarla tek model çözülüyor")
+        return self.solve_model(max_stores_to_open, backend=backend, time_limit=time_limit, method=method)
+
+
+    def solve_aggregated(self, max_stores_to_open=5, aggregation='grid', cell_km=0.5, n_clusters=None,
+                         repair=True, **solve_kwargs):
+        """
+        Talebi süper düğümlere birleştirip (bkz. aggregation.aggregate_demand) küçük modeli çözer,
+        atamaları orijinal noktalara geri açar ve birleştirmenin yarattığı hatayı raporlar.
+
+        Her nokta kendi süper düğümünün deposuna atanır; maliyet ve mesafe gerçek nokta-depo
+        mesafeleriyle yeniden hesaplanır. repair=True ise menzil dışına düşen noktalar menzil içindeki
+        en yakın, kapasitesi yeten açık depoya taşınır (bkz. _repair_range). Taşınamayanlar atamalardan
+        çıkarılır (hizmet dışı); menzilinde aday depo olan bir nokta açıkta kalırsa durum 'Infeasible' olur.
+        Birleştirme seviyesi (cell_km / n_clusters) büyüdükçe model küçülür, hata sınırı büyür.
+        Dönüş: nokta bazlı OptimizationResult (rapor result.metrics['aggregation'] ve self.last_aggregation'da)
+               veya uygun çözüm yoksa None. solve_kwargs solve_model'e aktarılır.
+        """
+        if self.distance_provider is not None:
+            raise ValueError("Talep birleştirme kuş uçuşu mesafe ile çalışır; yol ağı kullanılırken desteklenmez")
+        t0 = time.perf_counter()
+        agg = aggregate_demand(self.df_demand, self.demand_coords, aggregation, cell_km, n_clusters)
+        t_agg = time.perf_counter() - t0
+        print(f"\n🧮 Talep Birleştirme ({aggregation}): {agg.n_points:,} nokta -> {agg.n_super:,} süper düğüm")
+
+        coarse = copy.copy(self)
+        coarse.df_demand, coarse.demand_coords = agg.df_super, agg.coords
+        coarse._pairs_cache = {}
+        if self.demand_periods is not None:
+            coarse.set_demand_periods(agg.aggregate(self.demand_periods), names=self.period_names,
+                                      weights=self.period_weights, capacity_scale=self.period_capacity_scale)
+        coarse_result = coarse.solve_model(max_stores_to_open, **solve_kwargs)
+        if coarse_result is None:
+            return None
+
+        # Geri açma: nokta -> süper düğümün deposu, mesafe gerçek konumdan
+        super_site = pd.Series(coarse_result.assignments['assigned_site_id'].to_numpy(),
+                               index=coarse_result.assignments['customer_id'].to_numpy())
+        site_ids = super_site.reindex(np.arange(agg.n_super)).to_numpy()
+        point_site = site_ids[agg.labels]
+        assigned = pd.notna(point_site)
+        site_pos = pd.Index(self.df_sites['site_id']).get_indexer(point_site[assigned])
+        lat, lon = self.demand_coords[0][assigned], self.demand_coords[1][assigned]
+        dist = haversine_np(lat, lon, self.site_coords[0][site_pos], self.site_coords[1][site_pos])
+        coarse_dist = haversine_np(agg.coords[0][agg.labels[assigned]], agg.coords[1][agg.labels[assigned]],
+                                   self.site_coords[0][site_pos], self.site_coords[1][site_pos])
+        assignments = pd.DataFrame({'customer_id': self.df_demand['id'].to_numpy()[assigned],
+                                    'assigned_site_id': point_site[assigned], 'distance_km': dist})
+        params = dict(coarse_result.params, aggregation={'method': aggregation, 'level': agg.level})
+        # Süper düğümün optimalliği orijinal model için kanıt değildir
+        result = OptimizationResult(coarse_result.sites, assignments, 0.0, 'Feasible', params=params)
+        result.kpis = self.result_kpis(result)
+        result.total_cost = result.kpis['summary']['total_cost']
+
+        orders = self.cost_orders()
+        err = np.abs(dist - coarse_dist)
+        violating = np.flatnonzero(dist > self.MAX_RANGE_KM + 1e-9)
+        report = dict(agg.summary(), aggregate_s=t_agg, coarse_cost=float(coarse_result.total_cost),
+                      disaggregated_cost=float(result.total_cost),
+                      cost_error=float(result.total_cost - coarse_result.total_cost),
+                      cost_error_pct=float((result.total_cost - coarse_result.total_cost) / coarse_result.total_cost * 100),
+                      error_bound=agg.error_bound(self.COST_PER_KM, orders),
+                      dist_error_mean_km=float(np.average(err, weights=orders[assigned]))
+                      if orders[assigned].sum() > 0 else float(err.mean()),
+                      dist_error_p95_km=float(np.percentile(err, 95)) if len(err) else 0.0,
+                      dist_error_max_km=float(err.max()) if len(err) else 0.0,
+                      range_violations=int(len(violating)), repaired=0)
+
+        if repair and len(violating):
+            moved = self._repair_range(result, np.flatnonzero(assigned)[violating])
+            print(f"🔧 Menzil dışı {len(violating)} noktadan {moved} tanesi menzil içindeki açık depolara taşındı")
+            if moved:
+                result.kpis = self.result_kpis(result)
+                result.total_cost = result.kpis['summary']['total_cost']
+            report.update(repaired=moved, range_violations=int(len(violating)) - moved,
+                          repaired_cost=float(result.total_cost))
+
+        # Taşınamayan noktalar menzil dışı atamayla bırakılmaz, hizmet dışı sayılır. Bu noktalardan biri
+        # menzilinde bir aday depo varken açıkta kalıyorsa plan asıl model için uygun değildir.
+        out = (result.assignments['distance_km'] > self.MAX_RANGE_KM + 1e-9).to_numpy()
+        report.update(unserved=int(out.sum()), unserved_servable=0)
+        if out.any():
+            pos = pd.Index(self.df_demand['id']).get_indexer(result.assignments['customer_id'][out])
+            servable = int(sum(haversine_np(self.demand_coords[0][i], self.demand_coords[1][i],
+                                            self.site_coords[0], self.site_coords[1]).min() <= self.MAX_RANGE_KM
+                               for i in pos))
+            result.assignments = result.assignments[~out].reset_index(drop=True)
+            result.kpis = self.result_kpis(result)
+            result.total_cost = result.kpis['summary']['total_cost']
+            report.update(unserved_servable=servable, final_cost=float(result.total_cost))
+            if servable:
+                result.status = 'Infeasible'
+                print(f"❌ {servable} nokta menzil içinde depo varken hizmet dışı kaldı; plan uygun değil")
+
+        result.metrics = dict(coarse_result.metrics, aggregation=report)
+        result.bound, result.gap = None, None
+        self.last_aggregation = report
+        self.last_result = result
+        self.df_results_sites, self.df_results_assignments = result.sites, result.assignments
+        self.total_cost = result.total_cost
+        self.last_status = result.status
+        print(f"📐 Birleştirme hatası: {report['cost_error']:+,.2f} TL (%{report['cost_error_pct']:+.2f}), "
+              f"sınır ±{report['error_bound']:,.2f} TL, ort. mesafe hatası {report['dist_error_mean_km']:.3f} km")
+        return result
+
+    def _repair_range(self, result, points):
+        """
+        Geri açmada menzil dışına düşen noktaları (df_demand pozisyonları) menzil içindeki en yakın,
+        kapasitesi yeten açık depoya taşır; diğer atamalar korunur. Dönüş: taşınan nokta sayısı.
+        """
+        assignments = result.assignments
+        cust_pos = pd.Index(self.df_demand['id']).get_indexer(assignments['customer_id'])
+        row_of = pd.Series(np.arange(len(assignments)), index=cust_pos)
+        open_pos = pd.Index(self.df_sites['site_id']).get_indexer(result.sites['site_id'])
+        site_slot = pd.Index(open_pos).get_indexer(
+            pd.Index(self.df_sites['site_id']).get_indexer(assignments['assigned_site_id']))
+        loads = self.capacity_orders()
+        spare = self.df_sites['capacity'].to_numpy(dtype=np.float64)[open_pos][:, None] - \
+            np.stack([np.bincount(site_slot, weights=col[cust_pos], minlength=len(open_pos)) for col in loads.T], axis=1)
+        moved = 0
+        for i in points[np.argsort(-self.cost_orders()[points], kind='stable')]:  # büyük siparişler önce
+            d = haversine_np(self.demand_coords[0][i], self.demand_coords[1][i],
+                             self.site_coords[0][open_pos], self.site_coords[1][open_pos])
+            for j in np.argsort(d):
+                if d[j] > self.MAX_RANGE_KM:
+                    break
+                if (spare[j] >= loads[i]).all():
+                    r = row_of[i]
+                    spare[site_slot[r]] += loads[i]
+                    spare[j] -= loads[i]
+                    site_slot[r] = j
+                    assignments.iat[r, assignments.columns.get_loc('assigned_site_id')] = self.df_sites['site_id'].iat[open_pos[j]]
+                    assignments.iat[r, assignments.columns.get_loc('distance_km')] = d[j]
+                    moved += 1
+                    break
+        return moved
+
+    def _component_optimizer(self, pairs, cust_idx, site_idx):
+        """Bir bileşenin müşteri ve depolarıyla sınırlı, çiftleri hazır verilmiş optimizer kopyası."""
+        sub = copy.copy(self)
+        sub.df_demand = self.df_demand.iloc[cust_idx].reset_index(drop=True)
+        sub.demand_coords = np.asarray(self.demand_coords)[:, cust_idx]
+        sub.df_sites = self.df_sites.iloc[site_idx].reset_index(drop=True)
+        sub.site_coords = np.asarray(self.site_coords)[:, site_idx]
+        if self.demand_periods is not None:
+            sub.demand_periods = self.demand_periods[cust_idx]
+        cust_map = np.full(pairs.n_customers, -1, dtype=np.int64)
+        cust_map[cust_idx] = np.arange(len(cust_idx))
+        site_map = np.full(pairs.n_sites, -1, dtype=np.int64)
+        site_map[site_idx] = np.arange(len(site_idx))
+        keep = cust_map[pairs.cust] >= 0
+        sub._fixed_pairs = ValidPairs(cust_map[pairs.cust[keep]], site_map[pairs.site[keep]], pairs.dist[keep],
+                                      len(cust_idx), len(site_idx))
+        # Süreçlere gönderilecek kopyada büyük/paylaşılan nesneler taşınmaz (mesafe birimi korunur)
+        sub._fixed_metric = self.distance_metric
+        sub.distance_provider = None
+        sub._site_index, sub._site_index_key, sub._pairs_cache = None, None, {}
+        sub.last_result = sub.df_results_sites = sub.df_results_assignments = None
+        return sub
+
+    def solve_decomposed(self, max_stores_to_open=5, n_jobs=None, backend='highs', time_limit=60, method='milp'):
+        """
+        Menzil kesmesi müşteri-depo grafiğini birbirinden kopuk bölgelere ayırıyorsa (ör. birkaç menzil
+        uzaklıktaki ilçeler) her bölgeyi ayrı süreçte bağımsız bir alt problem olarak çözer.
+
+        1. Geçerli çiftlerin iki parçalı grafiğinde bağlı bileşenler bulunur; tek bileşen varsa solve_model çağrılır.
+        2. Dış bütçe dağıtımı: her bileşen için sezgisel maliyet eğrisi f_c(k) (k = 1..K) paralel hesaplanır,
+           sum k_c <= K altında sum f_c(k_c)'yi en küçükleyen dağılım dinamik programlama ile seçilir.
+           Sezgiselin uygun ağ bulamadığı bölgeler için bütçe yetmezse, en az depo sayısı MILP ile kesin bulunur;
+           örnek yalnızca sezgisel eğrilere bakılarak uygunsuz ilan edilmez.
+        3. Her bileşen kendi k_c bütçesiyle solve_model ile (paralel) çözülür, sonuçlar birleştirilir.
+        Durum: tüm bileşenler 'Optimal' ve bütçe hiçbir bileşeni kısıtlamıyorsa 'Optimal', aksi halde 'Feasible'
+        (sezgisel eğriyle yapılan dağıtım global optimalliği garanti etmez).
+        Dönüş: OptimizationResult (bileşen detayları result.metrics['components']) veya uygun çözüm yoksa None.
+        """
+        metrics = RunMetrics()
+        self._metrics = self.last_metrics = metrics
+        with metrics.run():
+            with metrics.span('pairs'):
+                pairs = self.compute_pairs()
+            with metrics.span('components'):
+                _, cust_lab, site_lab = pairs.components()
+                # Çifti olmayan müşteriler modelde de yer almaz; sadece depo içeren bileşenler çözülür
+                has_pair = np.bincount(pairs.cust, minlength=pairs.n_customers) > 0
+                comps = np.unique(cust_lab[has_pair])
+            if len(comps) <= 1:
+                # Dış aşamalar (pairs, components) aynı ölçüm nesnesinde kalsın
+                return self.solve_model(max_stores_to_open, backend=backend, time_limit=time_limit, method=method,
+                                        metrics=metrics)
+
+            subs = [self._component_optimizer(pairs, np.flatnonzero((cust_lab == c) & has_pair),
+                                              np.flatnonzero(site_lab == c)) for c in comps]
+            # Büyük bileşenler önce başlasın (süreç havuzunda uzun işler sona kalmasın)
+            order = np.argsort([-len(sub._fixed_pairs) for sub in subs], kind='stable')
+            subs = [subs[i] for i in order]
+            k_max = [min(int(max_stores_to_open), len(sub.df_sites)) for sub in subs]
+            n_jobs = min(n_jobs or os.cpu_count() or 1, len(subs))
+            print(f"\n🧩 Ayrıştırma: {len(subs)} bağımsız bölge, {n_jobs} süreç")
+            metrics.count(n_components=len(subs), n_customers=pairs.n_customers, n_sites=pairs.n_sites,
+                          n_pairs=len(pairs))
+
+            pool = ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+            run = pool.map if pool is not None else map
+            try:
+                with metrics.span('allocate'):
+                    curves = list(run(_component_curve, subs, k_max, [time_limit / max(max(k_max), 1)] * len(subs)))
+                    budget = _split_budget(curves, int(max_stores_to_open))
+                    # Sezgisel eğriler uygunluğu kanıtlamaz: sezgiselin küçük k'da ağ bulamadığı bölgeler
+                    # en az depo açan MILP ile kesin olarak denetlenir, bulunan ağ eğriye üst sınır olarak eklenir
+                    unsure = [i for i, curve in enumerate(curves) if not np.isfinite(curve[1])]
+                    if budget is None and unsure:
+                        points = run(_component_min_sites, [subs[i] for i in unsure], [k_max[i] for i in unsure],
+                                     [time_limit] * len(unsure))
+                        for i, point in zip(unsure, points):
+                            if point is not None:
+                                k, cost = point
+                                curves[i][k:] = np.minimum(curves[i][k:], cost)
+                        budget = _split_budget(curves, int(max_stores_to_open))
+                if budget is None:
+                    print("❌ Depo bütçesi tüm bölgeleri karşılamaya yetmiyor; uygun çözüm bulunamadı!")
+                    self.last_status, self.last_result = 'Infeasible', None
+                    return None
+                print("📦 Bütçe dağılımı: " + ", ".join(f"B{i + 1}={k}" for i, k in enumerate(budget)))
+                with metrics.span('solve'):
+                    parts = list(run(_solve_component, subs, budget, [backend] * len(subs),
+                                     [time_limit] * len(subs), [method] * len(subs)))
+            finally:
+                if pool is not None:
+                    pool.shutdown()
+
+            if any(r is None for r in parts):
+                print("❌ Bir bölge için uygun çözüm bulunamadı!")
+                self.last_status, self.last_result = 'Infeasible', None
+                return None
+            with metrics.span('results'):
+                exact = all(r.status == 'Optimal' for r in parts) and list(budget) == k_max
+                bounds = [r.bound if r.bound is not None else (r.total_cost if r.status == 'Optimal' else None)
+                          for r in parts]
+                total_cost = float(sum(r.total_cost for r in parts))
+                result = OptimizationResult(
+                    pd.concat([r.sites for r in parts], ignore_index=True),
+                    pd.concat([r.assignments for r in parts], ignore_index=True),
+                    total_cost, 'Optimal' if exact else 'Feasible',
+                    params=self._result_params(max_stores_to_open, method, backend))
+                result.kpis = self.result_kpis(result)
+                if all(b is not None for b in bounds) and list(budget) == k_max:
+                    result.bound = float(sum(bounds))
+                    result.gap = (total_cost - result.bound) / total_cost if total_cost else 0.0
+            metrics.set_solver(backend=backend, status=result.status, objective=total_cost, time_limit_s=time_limit,
+                               bound=result.bound, gap=result.gap)
+        result.metrics = dict(metrics.summary(), components=[
+            {'n_customers': len(sub.df_demand), 'n_sites': len(sub.df_sites), 'n_pairs': len(sub._fixed_pairs),
+             'budget': int(k), 'n_open': r.n_open, 'status': r.status, 'total_cost': float(r.total_cost),
+             'wall_s': r.metrics.get('total_wall_s')}
+            for sub, k, r in zip(subs, budget, parts)])
+
+        self.last_result = result
+        self.df_results_sites, self.df_results_assignments = result.sites, result.assignments
+        self.total_cost, self.last_status, self.last_solution = total_cost, result.status, None
+        print(f"💰 Toplam Maliyet (bölgeler): {total_cost:,.2f} TL | Seçilen Depo Sayısı: {result.n_open}")
+        print(metrics.report())
+        return result
+
+def _solve_chain(optimizer, range_km, k_values, backend, time_limit, on_row=None):
+    """
+    Tek bir menzil için k değerlerini sırayla, önceki çözümü sıcak başlangıç yaparak çözer.
+    Dönüş: (satırlar, on_row durdurma istedi mi)
+    """
+    rows = []
+    prev_solution, prev_cost = None, None
+    # Tarama, optimizer'ın menzil ayarını kalıcı olarak değiştirmemeli (seri modda aynı nesne kullanılır)
+    saved_range = optimizer.MAX_RANGE_KM
+    optimizer.MAX_RANGE_KM = range_km
+    stopped = False
+    try:
+        for k in k_values:
+            result = optimizer.solve_model(max_stores_to_open=k, backend=backend, time_limit=time_limit,
+                                           warm_start=prev_solution, cutoff=prev_cost)
+            rows.append({
+                'max_range_km': range_km,
+                'max_stores_to_open': k,
+                'status': optimizer.last_status,
+                'total_cost': result.total_cost if result is not None else np.nan,
+                'n_open': result.n_open if result is not None else 0,
+                'open_sites': ','.join(result.open_site_ids) if result is not None else '',
+                'solve_time_s': optimizer.last_solve_time,
+            })
+            if on_row is not None and on_row(rows[-1]):
+                stopped = True
+                break
+            if result is not None:
+                # k için bulunan çözüm k+1 için de uygundur
+                prev_solution, prev_cost = optimizer.last_solution, optimizer.total_cost * (1 + 1e-9)
+    finally:
+        optimizer.MAX_RANGE_KM = saved_range
+    return rows, stopped
+
+def _solve_batch(optimizer, periods, max_stores_to_open, backend, time_limit, method):
+    """
+    Dönemlerin bir alt kümesi için ağı çözer. Dönüş: açılan depoların maskesi (df_sites sırasında) veya None.
+    Maliyet ağırlıkları, grubun toplam ağırlığı tam kümeninkine eşit olacak şekilde ölçeklenir.
+    """
+    opt = copy.copy(optimizer)
+    w = optimizer.period_weights[periods]
+    if w.sum() > 0:
+        w = w * (optimizer.period_weights.sum() / w.sum())
+    opt.set_demand_periods(optimizer.demand_periods[:, periods],
+                           names=[optimizer.period_names[p] for p in periods], weights=w,
+                           capacity_scale=optimizer.period_capacity_scale[periods])
+    result = opt.solve_model(max_stores_to_open, backend=backend, time_limit=time_limit, method=method)
+    if result is None:
+        return None
+    return opt.df_sites['site_id'].isin(result.open_site_ids).to_numpy()
+
+def _component_curve(optimizer, k_max, time_limit):
+    """
+    Alt problemin sezgisel maliyet eğrisi: curve[k] = en fazla k depoyla bulunan maliyet (inf: uygun değil).
+    Eğri k'da artmayacak şekilde düzeltilir; sezgisel k'dan az depo açıyorsa kalan değerler aynıdır.
+    """
+    solver = optimizer.build_heuristic(optimizer.compute_pairs())
+    curve = np.full(k_max + 1, np.inf)
+    for k in range(1, k_max + 1):
+        open_mask, _, cost, feasible = solver.solve(k, time_limit=time_limit)
+        if feasible:
+            curve[k] = cost
+            if open_mask.sum() < k:  # daha fazla depo açmak maliyeti düşürmüyor
+                curve[k + 1:] = cost
+                break
+    return np.minimum.accumulate(curve)
+
+def _component_min_sites(optimizer, k_max, time_limit):
+    """
+    Alt problemde uygun bir ağ için gereken en az depo sayısını MILP (HiGHS) ile arar.
+    Dönüş: (depo sayısı, bu ağın maliyeti) veya k_max depoyla uygun ağ yoksa / süre içinde bulunamazsa None.
+    """
+    model = optimizer.build_matrix_model(optimizer.compute_pairs(), k_max)
+    count = copy.copy(model)
+    n_sites = len(optimizer.df_sites)
+    count.c = np.concatenate([np.ones(n_sites), np.zeros(model.shape[1] - n_sites)])
+    status, _, values = count.solve_highs(time_limit=time_limit)
+    if status not in ('Optimal', 'Feasible') or not model.is_feasible(values):
+        return None
+    y_val, _ = model.split(values)
+    return int(round(y_val.sum())), float(model.c @ values)
+
+def _split_budget(curves, budget):
+    """
+    sum k_c <= budget altında sum curves[c][k_c]'yi en küçükleyen dağılım (her bileşene en az 1 depo).
+    Dönüş: k_c listesi veya bütçe yetmiyorsa None.
+    """
+    best = np.zeros(budget + 1)  # best[b]: şimdiye kadarki bileşenlerin en fazla b depoyla en iyi maliyeti
+    choices = []
+    for curve in curves:
+        new = np.full(budget + 1, np.inf)
+        arg = np.zeros(budget + 1, dtype=np.int64)
+        for k in range(1, min(len(curve) - 1, budget) + 1):
+            cand = np.full(budget + 1, np.inf)
+            cand[k:] = best[:budget + 1 - k] + curve[k]
+            better = cand < new
+            new[better], arg[better] = cand[better], k
+        best = new
+        choices.append(arg)
+    if not np.isfinite(best[budget]):
+        return None
+    split, b = [], budget
+    for arg in reversed(choices):
+        split.append(int(arg[b]))
+        b -= arg[b]
+    return split[::-1]
+
+def _solve_component(optimizer, max_stores_to_open, backend, time_limit, method):
+    """Tek bir bağımsız bölgeyi çözer. Dönüş: OptimizationResult veya None."""
+    return optimizer.solve_model(max_stores_to_open, backend=backend, time_limit=time_limit, method=method)
+
+class BackgroundSolve:
+    """
+    Arka planda çalışan, ilerlemesi izlenebilen ve erken durdurulabilen MILP çözümü.
+
+    progress() çözücüden gelen en iyi tamsayı çözümü (incumbent), alt sınırı ve boşluğu döner.
+    stop() aramayı keser; o ana kadar bulunan en iyi uygun ağ yine de `result` olarak döner.
+    result: OptimizationResult veya uygun çözüm yoksa None.
+    """
+
+    def __init__(self, optimizer, pairs, max_stores_to_open, time_limit=60, warm_start=None, cutoff=None):
+        self.optimizer = optimizer
+        self.pairs = pairs
+        self.max_stores_to_open = max_stores_to_open
+        self.time_limit = time_limit
+        self.warm_start = warm_start
+        self.cutoff = cutoff
+        # Parametreler çiftlerle birlikte başlangıçta sabitlenir
+        self.params = optimizer._result_params(max_stores_to_open, 'milp', 'cbc_mps')
+        self.phase = 'Model kuruluyor'
+        self.metrics = RunMetrics()
+        self.metrics.count(n_customers=pairs.n_customers, n_sites=pairs.n_sites, n_pairs=len(pairs))
+        self.result = None
+        self.error = None
+        self._run = None
+        self._stop_requested = False
+        self._done = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._work, daemon=True)
+        self._thread.start()
+        return self
+
+    def _work(self):
+        try:
+            metrics = self.metrics
+            with metrics.span('build'):
+                model = self.optimizer.build_matrix_model(self.pairs, self.max_stores_to_open)
+            metrics.count(n_variables=model.shape[1], n_constraints=model.shape[0], n_nonzeros=int(model.A.nnz))
+            start = np.concatenate(self.warm_start) if self.warm_start is not None else None
+            with metrics.span('solve'):
+                self._run = CbcRun(model, time_limit=self.time_limit, warm_start=start, cutoff=self.cutoff).start()
+                self.phase = 'Çözülüyor'
+                if self._stop_requested:
+                    self._run.stop()
+                status, total_cost, values = self._run.wait()
+            self.phase = status
+            metrics.set_solver(backend='cbc_mps', status=status, objective=total_cost, time_limit_s=self.time_limit,
+                               bound=self._run.bound, gap=self._run.gap, stopped_early=self._run.stopped)
+            if status in ('Optimal', 'Feasible') and values is not None:
+                y_val, x_val = model.split(values)
+                with metrics.span('results'):
+                    sites, assignments, _ = self.optimizer._collect_results(self.pairs, y_val, x_val)
+                    kpis = self.optimizer.solution_kpis(self.pairs, y_val, x_val)
+                self.result = OptimizationResult(
+                    sites, assignments, total_cost, status,
+                    params=self.params, kpis=kpis,
+                    metrics=metrics.summary(), bound=self._run.bound, gap=self._run.gap)
+        except Exception as e:  # arka plan hatası arayüzde gösterilir
+            self.error = e
+            self.phase = 'Hata'
+        finally:
+            self._done.set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def progress(self):
+        run = self._run
+        return {
+            'phase': self.phase,
+            'elapsed_s': run.elapsed if run else 0.0,
+            'incumbent': run.incumbent if run else None,
+            'bound': run.bound if run else None,
+            'gap': run.gap if run else None,
+            'history': list(run.history) if run else [],
+        }
+
+    def stop(self):
+        self._stop_requested = True
+        if self._run is not None:
+            self._run.stop()
+
+    def wait(self, timeout=None):
+        self._done.wait(timeout)
+        return self.result
+
+class LagrangianRelaxation:
+    """
+    Atama kısıtlarının (sum_j x_ij = 1) Lagrange gevşetmesi ile ayrıştırma motoru.
+
+    λ_i çarpanları sabitken problem depo bazlı bağımsız alt problemlere ayrılır:
+        v_j = min(0, kira_j + min sum_i (c_ij - λ_i) x_ij),  sum_i d_i x_ij <= kapasite_j,  0 <= x <= 1
+    Her alt problem sürekli bir sırt çantası problemidir ve tüm depolar için tek seferde
+    NumPy ile (depo içi sıralama + gruplu kümülatif toplam) çözülür. Bütçe kısıtı altında en negatif
+    k depo seçilir; L(λ) = sum_i λ_i + sum v_j geçerli bir alt sınırdır. Çarpanlar Polyak adımlı
+    alt-gradyan (subgradient) yöntemiyle güncellenir. Üst sınır, alt problemin açtığı depolar için
+    HeuristicSolver ile yapılan kapasiteli atamadan gelir.
+    """
+
+    def __init__(self, heuristic):
+        self.h = heuristic
+        self.history = []
+
+    def _dual(self, lam, max_open):
+        h = self.h
+        red = h.cost - lam[h.cust]
+        idx = np.flatnonzero(red < 0)
+        x = np.zeros(len(h.cust))
+        v = h.rent.copy()
+        if len(idx):
+            # Kapasitesi yeten depolarda tüm negatif çiftler alınır; sadece taşan depolar sıralanır
+            demand = np.bincount(h.site[idx], weights=h.pair_orders[idx], minlength=h.n_sites)
+            tight = demand > h.capacity
+            loose = idx[~tight[h.site[idx]]]
+            x[loose] = 1.0
+            idx = idx[tight[h.site[idx]]]
+            s = h.site[idx]
+            # Depo içinde birim sipariş başına indirgenmiş maliyete göre sıralama; iki anahtarlı lexsort
+            # yerine tek float anahtar (depo + [0, 0.5) aralığına ölçeklenmiş oran) çok daha hızlıdır
+            ratio = red[idx] / np.maximum(h.pair_orders[idx], 1e-9)
+            span = np.ptp(ratio) if len(ratio) else 0.0
+            o = np.argsort(s + 0.5 * (ratio - ratio.min(initial=0.0)) / (span or 1.0))
+            idx, s = idx[o], s[o]
+            w = h.pair_orders[idx]
+            csum = _grouped_cumsum(s, w)
+            x[idx] = np.clip((h.capacity[s] - (csum - w)) / np.maximum(w, 1e-9), 0.0, 1.0)
+            v += np.bincount(h.site, weights=red * x, minlength=h.n_sites)
+
+        # Bütçe: en negatif değerli en fazla max_open depo açılır
+        order = np.argsort(v, kind='stable')[:max_open]
+        open_mask = np.zeros(h.n_sites, dtype=bool)
+        open_mask[order[v[order] < 0]] = True
+        x[~open_mask[h.site]] = 0.0
+
+        bound = lam[h.servable].sum() + v[open_mask].sum()
+        g = 1.0 - np.bincount(h.cust, weights=x, minlength=h.n_customers)
+        g[~h.servable] = 0.0
+        return bound, g, open_mask
+
+    def solve(self, max_open, max_iter=300, time_limit=60, tol=1e-3, verbose=True):
+        """
+        Dönüş: (açık depo maskesi, atamalar, üst sınır, alt sınır, uygun mu)
+        """
+        h = self.h
+        t0 = time.perf_counter()
+        # Başlangıç: en yakın deponun maliyeti; üst sınır hızlı açgözlü çözümden
+        lam = np.zeros(h.n_customers)
+        first = h.cust_ptr[:-1][h.servable]
+        lam[h.servable] = h.cost[first]
+        best_open, best_assigned, ub, feasible = h.solve(max_open, time_limit=0)
+        lb = -np.inf
+        theta, stall = 1.0, 0
+
+        self.history = []
+        for it in range(1, max_iter + 1):
+            bound, g, open_mask = self._dual(lam, max_open)
+            if bound > lb + 1e-9:
+                lb, stall = bound, 0
+            else:
+                stall += 1
+                if stall >= 5:
+                    theta, stall = theta / 2, 0
+
+            # Üst sınır: alt problemin açtığı depolarla kapasiteli atama
+            if open_mask.any():
+                cost, assigned, _ = h.evaluate(open_mask)
+                ok = not (h.servable & (assigned < 0)).any()
+                if ok and cost < ub:
+                    best_open, best_assigned, ub, feasible = open_mask, assigned, cost, True
+
+            gap = (ub - lb) / abs(ub) if feasible and ub else np.inf
+            self.history.append({'iteration': it, 'lower_bound': lb, 'upper_bound': ub if feasible else np.nan,
+                                 'gap': gap, 'step': theta, 'elapsed_s': time.perf_counter() - t0})
+            if verbose and (it == 1 or it % 10 == 0):
+                print(f"   İter {it:>4} | Alt Sınır: {lb:,.2f} | Üst Sınır: {ub:,.2f} | Boşluk: %{100 * gap:.2f}")
+
+            norm = float(g @ g)
+            if gap <= tol or norm == 0 or theta < 1e-4 or time.perf_counter() - t0 > time_limit:
+                break
+            lam = lam + theta * (ub - bound) / norm * g
+
+        return best_open, best_assigned, ub, lb, feasible
 
 # --- TEST BLOĞU ---
 if __name__ == "__main__":
@@ -0,0 +1,107 @@
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+
+class RunMetrics:
+    """
+    Tek bir optimizasyon çalışmasının yapısal ölçümleri.
+
+    stages  : isimli aşamalar (duvar saati ve CPU süresi, izleniyorsa tepe bellek)
+    counters: model boyutu sayaçları (çift, değişken, kısıt, sıfır olmayan katsayı ...)
+    solver  : çözücü istatistikleri (durum, amaç, alt sınır, boşluk ...)
+
+    profile=True ise tüm çalışma cProfile ile, trace_memory=True ise tracemalloc ile izlenir.
+    """
+
+    def __init__(self, profile=False, trace_memory=False):
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.stages = []
+        self.counters = {}
+        self.solver = {}
+        self._profiler = None
+        self._started_tracemalloc = False
+
+    @contextmanager
+    def run(self):
+        """Çalışmanın tamamını sarar; profilleyici ve bellek izleme burada açılıp kapanır."""
+        if self.profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        try:
+            yield self
+        finally:
+            if self._profiler is not None:
+                self._profiler.disable()
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    @contextmanager
+    def span(self, name):
+        """Bir aşamanın duvar saati, CPU süresi ve (izleniyorsa) tepe belleğini kaydeder."""
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        w0, c0 = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            stage = {'stage': name, 'wall_s': time.perf_counter() - w0, 'cpu_s': time.process_time() - c0}
+            if tracing:
+                stage['peak_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            self.stages.append(stage)
+
+    def count(self, **counters):
+        self.counters.update(counters)
+
+    def set_solver(self, **stats):
+        self.solver.update(stats)
+
+    @property
+    def total_wall_s(self):
+        return sum(s['wall_s'] for s in self.stages)
+
+    def to_frame(self):
+        """Aşamaları tablo olarak döner (aynı isimli aşamalar toplanır, ilk görülme sırası korunur)."""
+        if not self.stages:
+            return pd.DataFrame(columns=['stage', 'wall_s', 'cpu_s'])
+        df = pd.DataFrame(self.stages)
+        agg = {c: 'max' if c == 'peak_mb' else 'sum' for c in df.columns if c != 'stage'}
+        return df.groupby('stage', sort=False).agg(agg).reset_index()
+
+    def profile_stats(self, top=25, sort='cumulative'):
+        """cProfile çıktısının ilk `top` satırı (profile=True değilse None)."""
+        if self._profiler is None:
+            return None
+        buf = io.StringIO()
+        pstats.Stats(self._profiler, stream=buf).sort_stats(sort).print_stats(top)
+        return buf.getvalue()
+
+    def summary(self):
+        return {
+            'stages': self.to_frame().to_dict('records'),
+            'total_wall_s': self.total_wall_s,
+            'counters': dict(self.counters),
+            'solver': dict(self.solver),
+        }
+
+    def report(self):
+        """Konsol özeti."""
+        lines = ["📏 Performans Özeti:"]
+        for row in self.to_frame().to_dict('records'):
+            mem = f" | tepe {row['peak_mb']:.1f} MB" if 'peak_mb' in row and pd.notna(row['peak_mb']) else ""
+            lines.append(f"   {row['stage']:<10} duvar {row['wall_s']:8.3f} sn | CPU {row['cpu_s']:8.3f} sn{mem}")
+        if self.counters:
+            lines.append("   " + ", ".join(f"{k}={v:,}" if isinstance(v, int) else f"{k}={v}"
+                                          for k, v in self.counters.items()))
+        return "\n".join(lines)
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import shutil
+from dataclasses import dataclass, field
+from typing import Optional
+
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow yoksa tablolar pickle olarak yazılır
+    feather = None
+
+
+@dataclass
+class OptimizationResult:
+    """
+    Tek bir çözümün bellekteki sonucu.
+
+    sites       : seçilen depolar (aday depo kolonları + is_selected)
+    assignments : müşteri -> depo atamaları (customer_id, assigned_site_id, distance_km)
+    total_cost  : amaç fonksiyonu değeri (TL)
+    status      : 'Optimal' veya 'Feasible' (süre limiti / erken durdurma)
+    params      : çözüm parametreleri (depo sayısı, menzil, km maliyeti, yöntem, backend)
+    metrics     : çalışma ölçümleri (bkz. profiling.RunMetrics.summary)
+    bound, gap  : çözücünün bildirdiği alt sınır ve göreli boşluk (biliniyorsa)
+    kpis        : gösterge paneli KPI'ları {'summary': {...}, 'sites': depo tablosu} (bkz. kpi.compute_kpis)
+    """
+    sites: pd.DataFrame
+    assignments: pd.DataFrame
+    total_cost: float
+    status: str
+    params: dict = field(default_factory=dict)
+    metrics: dict = field(default_factory=dict)
+    bound: Optional[float] = None
+    gap: Optional[float] = None
+    kpis: Optional[dict] = None
+
+    @property
+    def n_open(self):
+        return len(self.sites)
+
+    @property
+    def open_site_ids(self):
+        return self.sites['site_id'].tolist()
+
+    def fingerprint(self):
+        """Parametreler ve çözüm içeriğinin özeti; aynı çözüm her zaman aynı klasöre yazılır."""
+        h = hashlib.sha1()
+        h.update(json.dumps(self.params, sort_keys=True, default=str).encode())
+        h.update(repr(round(float(self.total_cost), 6)).encode())
+        for df in (self.sites, self.assignments):
+            h.update(','.join(map(str, df.columns)).encode())
+            h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        return h.hexdigest()[:16]
+
+    def save(self, root_dir):
+        """
+        Sonucu <root_dir>/<özet>/ altına yazar ve klasör yolunu döner:
+            sites.feather, assignments.feather : tablolar (pyarrow yoksa .pkl)
+            site_kpis.feather                  : depo bazlı KPI tablosu (varsa)
+            result.json                        : amaç, durum, parametreler, ölçümler ve KPI özeti
+        Klasör içerikle adreslendiği için eşzamanlı çalışmalar birbirinin dosyasını ezmez;
+        aynı sonuç tekrar kaydedilirse mevcut klasör kullanılır.
+        """
+        path = os.path.join(os.path.abspath(root_dir), self.fingerprint())
+        if os.path.exists(os.path.join(path, 'result.json')):
+            return path
+        tmp = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(tmp, exist_ok=True)
+        tables = [('sites', self.sites), ('assignments', self.assignments)]
+        if self.kpis is not None:
+            tables.append(('site_kpis', self.kpis['sites']))
+        for name, df in tables:
+            if feather is not None:
+                feather.write_feather(df.reset_index(drop=True), os.path.join(tmp, name + '.feather'))
+            else:
+                df.to_pickle(os.path.join(tmp, name + '.pkl'))
+        meta = {'total_cost': float(self.total_cost), 'status': self.status, 'params': self.params,
+                'metrics': self.metrics, 'bound': self.bound, 'gap': self.gap,
+                'kpis': self.kpis['summary'] if self.kpis is not None else None}
+        with open(os.path.join(tmp, 'result.json'), 'w') as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False, default=str)
+        try:
+            os.rename(tmp, path)
+        except OSError:  # başka bir süreç aynı sonucu az önce yazdı
+            shutil.rmtree(tmp, ignore_errors=True)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """save() ile yazılmış bir klasörü okur."""
+        with open(os.path.join(path, 'result.json')) as f:
+            meta = json.load(f)
+        tables = {}
+        for name in ('sites', 'assignments', 'site_kpis'):
+            fpath = os.path.join(path, name + '.feather')
+            if os.path.exists(fpath):
+                tables[name] = pd.read_feather(fpath)
+            elif os.path.exists(os.path.join(path, name + '.pkl')):
+                tables[name] = pd.read_pickle(os.path.join(path, name + '.pkl'))
+        summary = meta.pop('kpis', None)
+        if summary is not None and 'site_kpis' in tables:
+            meta['kpis'] = {'summary': summary, 'sites': tables['site_kpis']}
+        return cls(tables['sites'], tables['assignments'], **meta)
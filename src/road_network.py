@@ -0,0 +1,363 @@
+import hashlib
+import json
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra, connected_components
+
+try:
+    from src.distance import EARTH_RADIUS_KM, haversine_np, ValidPairs, SiteIndex
+    from src.data_store import cache_dir_for, _atomic_write, _save_json
+except ImportError:  # `python src/road_network.py` ile doğrudan çalıştırıldığında
+    from distance import EARTH_RADIUS_KM, haversine_np, ValidPairs, SiteIndex
+    from data_store import cache_dir_for, _atomic_write, _save_json
+
+# Yol sınıfına göre varsayılan hızlar (km/sa); maxspeed etiketi varsa o kullanılır
+HIGHWAY_SPEEDS = {
+    'motorway': 90, 'motorway_link': 60, 'trunk': 70, 'trunk_link': 50,
+    'primary': 50, 'primary_link': 40, 'secondary': 40, 'secondary_link': 35,
+    'tertiary': 35, 'tertiary_link': 30, 'unclassified': 30, 'residential': 25,
+    'living_street': 10, 'service': 15, 'road': 25,
+}
+SNAP_SPEED_KMH = 15.0  # nokta ile en yakın yol düğümü arasındaki mesafe için varsayılan hız
+
+# Ayrıştırılmış graf formatı değişirse artırılır
+GRAPH_VERSION = 1
+
+
+class RoadGraph:
+    """
+    Yönlü yol ağı: düğüm koordinatları ve iki ağırlıklı CSR kenar listesi.
+
+    lat, lon  : düğüm koordinatları (derece)
+    length_km : kenar uzunluğu (km)
+    time_min  : kenar geçiş süresi (dk)
+    digest    : graf içeriğinin özeti; mesafe önbelleği bu anahtarla adreslenir
+    Sadece en büyük bağlı bileşen tutulur, böylece her nokta erişilebilir bir düğüme bağlanır.
+    """
+
+    def __init__(self, lat, lon, src, dst, length_km, time_min):
+        lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+        src, dst = np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)
+        length_km = np.asarray(length_km, dtype=np.float64)
+        time_min = np.asarray(time_min, dtype=np.float64)
+
+        # Ada gibi kopuk parçalar atılır (zayıf bağlılık; tek yönlü sokaklar bileşeni bölmez)
+        n = len(lat)
+        adj = csr_matrix((np.ones(len(src)), (src, dst)), shape=(n, n))
+        _, labels = connected_components(adj, directed=True, connection='weak')
+        main = np.bincount(labels).argmax() if n else 0
+        keep = labels == main
+        remap = np.full(n, -1, dtype=np.int64)
+        remap[keep] = np.arange(keep.sum())
+        e = keep[src] & keep[dst] & (src != dst)
+
+        self.lat, self.lon = lat[keep], lon[keep]
+        self.src, self.dst = remap[src[e]], remap[dst[e]]
+        self.length_km, self.time_min = length_km[e], time_min[e]
+        self._graphs = {}
+        self._node_index = None
+        self.digest = hashlib.sha1(b''.join(
+            np.ascontiguousarray(a).tobytes()
+            for a in (self.lat, self.lon, self.src, self.dst, self.length_km, self.time_min)
+        )).hexdigest()[:16]
+
+    @property
+    def n_nodes(self):
+        return len(self.lat)
+
+    @property
+    def n_edges(self):
+        return len(self.src)
+
+    def csgraph(self, metric='length'):
+        """Seçilen ağırlıkla (n_nodes x n_nodes) CSR komşuluk matrisi; paralel kenarlarda en kısası tutulur."""
+        if metric not in self._graphs:
+            w = self._weights(metric)
+            # csr_matrix tekrar eden kenarları toplar; önce (src, dst) başına en küçük ağırlık seçilir
+            order = np.lexsort((w, self.dst, self.src))
+            s, d, w = self.src[order], self.dst[order], w[order]
+            first = np.r_[True, (s[1:] != s[:-1]) | (d[1:] != d[:-1])]
+            # Sıfır ağırlık csgraph'ta "kenar yok" sayılır
+            w = np.maximum(w[first], 1e-9)
+            self._graphs[metric] = csr_matrix((w, (s[first], d[first])), shape=(self.n_nodes, self.n_nodes))
+        return self._graphs[metric]
+
+    def _weights(self, metric):
+        if metric == 'length':
+            return self.length_km
+        if metric == 'time':
+            return self.time_min
+        raise ValueError(f"Bilinmeyen metrik: {metric} ('length' veya 'time')")
+
+    @property
+    def max_speed_kmh(self):
+        t = self.time_min > 0
+        if not t.any():
+            return SNAP_SPEED_KMH
+        return max(SNAP_SPEED_KMH, float((self.length_km[t] / self.time_min[t]).max() * 60))
+
+    def snap(self, lat, lon):
+        """Her noktayı en yakın yol düğümüne bağlar. Dönüş: (düğüm indeksleri, kuş uçuşu uzaklık km)"""
+        if self._node_index is None:
+            self._node_index = SiteIndex(self.lat, self.lon)
+        X = np.radians(np.column_stack([np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)]))
+        dist, ind = self._node_index.tree.query(X, k=1)
+        return ind[:, 0].astype(np.int64), dist[:, 0] * EARTH_RADIUS_KM
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            np.savez(f, lat=self.lat, lon=self.lon, src=self.src, dst=self.dst,
+                     length_km=self.length_km, time_min=self.time_min)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            return cls(z['lat'], z['lon'], z['src'], z['dst'], z['length_km'], z['time_min'])
+
+    @classmethod
+    def from_osm(cls, osm_path, cache_dir=None):
+        """
+        OSM XML özütünden (.osm) araç yollarını okur. Ayrıştırılan graf önbelleğe .npz olarak yazılır;
+        kaynak dosya değişmedikçe (mtime/boyut) sonraki açılışlar XML'i tekrar okumaz.
+        """
+        cache_dir = cache_dir or cache_dir_for(osm_path)
+        stem = os.path.join(cache_dir, os.path.splitext(os.path.basename(osm_path))[0])
+        st = os.stat(osm_path)
+        stamp = {'source': os.path.abspath(osm_path), 'mtime_ns': st.st_mtime_ns, 'size': st.st_size,
+                 'graph_version': GRAPH_VERSION}
+        try:
+            with open(stem + '.graph.json') as f:
+                if json.load(f) == stamp and os.path.exists(stem + '.graph.npz'):
+                    return cls.load(stem + '.graph.npz')
+        except (OSError, ValueError):
+            pass
+
+        graph = cls(*_parse_osm(osm_path))
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            _atomic_write(stem + '.graph.npz', graph.save)
+            _atomic_write(stem + '.graph.json', lambda p: _save_json(p, stamp))
+        except OSError:  # önbellek yazılamıyorsa graf yine de kullanılır
+            pass
+        return graph
+
+
+def _parse_maxspeed(value):
+    try:
+        return float(value.split()[0])
+    except (AttributeError, ValueError, IndexError):
+        return None
+
+
+def _parse_osm(osm_path):
+    """
+    OSM XML'i akış halinde okur (iterparse; tüm ağaç belleğe alınmaz).
+    Dönüş: (lat, lon, src, dst, length_km, time_min) — sadece yollarda kullanılan düğümler tutulur.
+    """
+    node_ids, node_lat, node_lon = [], [], []
+    ways = []  # (düğüm referansları, hız km/sa, tek yön: 0 / 1 / -1)
+    nds, tags = [], {}
+    for _, elem in ET.iterparse(osm_path, events=('end',)):
+        tag = elem.tag
+        if tag == 'node':
+            node_ids.append(int(elem.get('id')))
+            node_lat.append(float(elem.get('lat')))
+            node_lon.append(float(elem.get('lon')))
+            tags = {}  # düğüm etiketleri yol etiketlerine karışmasın
+            elem.clear()
+        elif tag == 'nd':
+            nds.append(int(elem.get('ref')))
+        elif tag == 'tag':
+            tags[elem.get('k')] = elem.get('v')
+        elif tag == 'way':
+            highway = tags.get('highway')
+            if highway in HIGHWAY_SPEEDS and len(nds) > 1:
+                speed = _parse_maxspeed(tags.get('maxspeed')) or HIGHWAY_SPEEDS[highway]
+                oneway = tags.get('oneway')
+                direction = 1 if oneway in ('yes', 'true', '1') else -1 if oneway == '-1' else 0
+                if highway == 'motorway' and oneway is None:
+                    direction = 1
+                ways.append((nds, speed, direction))
+            nds, tags = [], {}
+            elem.clear()
+        elif tag == 'relation':
+            nds, tags = [], {}
+            elem.clear()
+
+    node_ids = np.asarray(node_ids, dtype=np.int64)
+    order = np.argsort(node_ids)
+    node_ids = node_ids[order]
+    node_lat = np.asarray(node_lat, dtype=np.float64)[order]
+    node_lon = np.asarray(node_lon, dtype=np.float64)[order]
+
+    src, dst, speed, both = [], [], [], []
+    for refs, kmh, direction in ways:
+        refs = np.asarray(refs, dtype=np.int64)
+        a, b = (refs[1:], refs[:-1]) if direction == -1 else (refs[:-1], refs[1:])
+        src.append(a)
+        dst.append(b)
+        speed.append(np.full(len(a), kmh))
+        both.append(np.full(len(a), direction == 0))
+    if not src:
+        raise ValueError(f"OSM dosyasında araç yolu bulunamadı: {osm_path}")
+    src, dst = np.concatenate(src), np.concatenate(dst)
+    speed, both = np.concatenate(speed), np.concatenate(both)
+
+    # OSM kimliklerini pozisyonel indekse çevir; kesilmiş özütlerde eksik düğümlü kenarlar atılır
+    si = np.searchsorted(node_ids, src).clip(0, max(len(node_ids) - 1, 0))
+    di = np.searchsorted(node_ids, dst).clip(0, max(len(node_ids) - 1, 0))
+    ok = (node_ids[si] == src) & (node_ids[di] == dst)
+    si, di, speed, both = si[ok], di[ok], speed[ok], both[ok]
+
+    used = np.unique(np.r_[si, di])
+    remap = np.full(len(node_ids), -1, dtype=np.int64)
+    remap[used] = np.arange(len(used))
+    si, di = remap[si], remap[di]
+    lat, lon = node_lat[used], node_lon[used]
+
+    length = haversine_np(lat[si], lon[si], lat[di], lon[di])
+    time_min = length / speed * 60
+    # Çift yönlü yollar ters kenarla tamamlanır
+    src = np.r_[si, di[both]]
+    dst = np.r_[di, si[both]]
+    return lat, lon, src, dst, np.r_[length, length[both]], np.r_[time_min, time_min[both]]
+
+
+class RoadDistanceProvider:
+    """
+    Yol ağı üzerinden depo -> müşteri en kısa yol mesafelerini (metric='length', km) veya
+    sürelerini (metric='time', dk) hesaplayan, LogisticsOptimizer'a takılabilen mesafe sağlayıcı.
+
+    Dijkstra depo düğümlerinden (kaynak) tüm ağa, `limit` ile kesilerek çalışır. Her kaynağın
+    düğüm mesafe satırı diskte, graf özeti + metrik ile adreslenen bellek eşlemeli bir dizide saklanır:
+        <cache>/road_<özet>_<metrik>/rows.f32   : (kapasite, n_nodes) float32 satırlar
+        <cache>/road_<özet>_<metrik>/index.json : kaynak düğüm -> (satır, hesaplandığı limit)
+    Müşteri tarafı sadece düğüm eşleme + satırdan okuma olduğundan yeni müşteriler Dijkstra gerektirmez;
+    yeni (veya daha büyük menzil isteyen) depolar için sadece eksik satırlar hesaplanır.
+    """
+
+    ROW_BATCH = 32  # Dijkstra'ya tek seferde verilen kaynak sayısı (ara yoğun blok batch x n_nodes)
+
+    def __init__(self, graph, cache_dir, metric='length', snap_speed_kmh=SNAP_SPEED_KMH):
+        graph._weights(metric)  # metrik kontrolü
+        self.graph = graph
+        self.metric = metric
+        self.snap_speed_kmh = snap_speed_kmh
+        self.unit = 'km' if metric == 'length' else 'dk'
+        self.cache_path = os.path.join(cache_dir, f'road_{graph.digest}_{metric}')
+        self._index = None
+        self._rows = None
+        self.n_computed = 0  # bu nesnenin hesapladığı (önbellekte bulunmayan) satır sayısı
+
+    @classmethod
+    def from_osm(cls, osm_path, metric='length', cache_dir=None):
+        cache_dir = cache_dir or cache_dir_for(osm_path)
+        return cls(RoadGraph.from_osm(osm_path, cache_dir), cache_dir, metric)
+
+    @property
+    def key(self):
+        """Çift önbelleği anahtarı (graf + metrik)."""
+        return (self.graph.digest, self.metric)
+
+    @property
+    def km_per_unit(self):
+        """Bir birim yol mesafesinin kuş uçuşu üst sınırı; aday çiftleri ön elemek için kullanılır."""
+        return 1.0 if self.metric == 'length' else self.graph.max_speed_kmh / 60
+
+    def _snap_cost(self, km):
+        return km if self.metric == 'length' else km / self.snap_speed_kmh * 60
+
+    # --- Disk önbelleği ---
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(os.path.join(self.cache_path, 'index.json')) as f:
+                    meta = json.load(f)
+                if meta['n_nodes'] != self.graph.n_nodes:
+                    raise ValueError
+                self._index = {int(k): tuple(v) for k, v in meta['rows'].items()}
+                self._capacity = meta['capacity']
+            except (OSError, ValueError, KeyError):
+                self._index, self._capacity = {}, 0
+        return self._index
+
+    def _open_rows(self, capacity):
+        """Satır dosyasını en az `capacity` satıra büyütüp bellek eşlemeli açar."""
+        path = os.path.join(self.cache_path, 'rows.f32')
+        if capacity > self._capacity or self._rows is None:
+            if self._rows is not None:
+                self._rows.flush()
+            os.makedirs(self.cache_path, exist_ok=True)
+            size = max(capacity, self._capacity) * self.graph.n_nodes * 4
+            with open(path, 'ab') as f:
+                if f.tell() < size:
+                    f.truncate(size)
+            self._capacity = max(capacity, self._capacity)
+            self._rows = None
+        if self._rows is None and self._capacity:
+            self._rows = np.memmap(path, dtype=np.float32, mode='r+', shape=(self._capacity, self.graph.n_nodes))
+        return self._rows
+
+    def _save_index(self):
+        meta = {'n_nodes': self.graph.n_nodes, 'metric': self.metric, 'capacity': self._capacity,
+                'rows': {str(k): list(v) for k, v in self._index.items()}}
+        _atomic_write(os.path.join(self.cache_path, 'index.json'), lambda p: _save_json(p, meta))
+
+    def source_rows(self, nodes, limit):
+        """
+        Kaynak düğümlerin mesafe satırlarını (satır numaraları) döner; önbellekte olmayan veya
+        daha küçük bir limitle hesaplanmış olanlar için Dijkstra çalıştırılır.
+        """
+        index = self._load_index()
+        nodes = np.unique(np.asarray(nodes, dtype=np.int64))
+        missing = [int(s) for s in nodes if s not in index or index[s][1] < limit]
+        if missing:
+            new = [s for s in missing if s not in index]
+            rows = self._open_rows(len(index) + len(new))
+            for s in new:
+                index[s] = (len(index), limit)
+            graph = self.graph.csgraph(self.metric)
+            for b in range(0, len(missing), self.ROW_BATCH):
+                batch = missing[b:b + self.ROW_BATCH]
+                dist = dijkstra(graph, directed=True, indices=batch, limit=limit)
+                for s, d in zip(batch, dist):
+                    r = index[s][0]
+                    rows[r] = d
+                    index[s] = (r, limit)
+            rows.flush()
+            self._save_index()
+            self.n_computed += len(missing)
+        self._open_rows(len(index))
+        return {int(s): index[int(s)][0] for s in nodes}
+
+    def query_pairs(self, cust_lat, cust_lon, site_lat, site_lon, max_range, candidates=None, dtype=np.float64):
+        """
+        Yol mesafesi `max_range` (sağlayıcının biriminde) içindeki çiftleri ValidPairs olarak döner.
+        candidates: kuş uçuşu ön elemeden gelen aday ValidPairs (yol mesafesi kuş uçuşundan kısa olamaz);
+        verilmezse tüm (müşteri, depo) kombinasyonları denenir.
+        Düğüme bağlanma mesafeleri (müşteri ve depo tarafı) toplam mesafeye eklenir.
+        """
+        n, m = len(cust_lat), len(site_lat)
+        if candidates is None:
+            cust = np.repeat(np.arange(n, dtype=np.int64), m)
+            site = np.tile(np.arange(m, dtype=np.int64), n)
+        else:
+            cust, site = candidates.cust, candidates.site
+        if len(cust) == 0:  # menzilde aday yok; boş önbellekte satır matrisi henüz açılmamış olabilir
+            return ValidPairs(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=dtype), n, m)
+
+        c_node, c_snap = self.graph.snap(cust_lat, cust_lon)
+        s_node, s_snap = self.graph.snap(site_lat, site_lon)
+        c_snap, s_snap = self._snap_cost(c_snap), self._snap_cost(s_snap)
+
+        used_sites = np.unique(site)
+        row_of = self.source_rows(s_node[used_sites], float(max_range))
+        site_row = np.full(m, -1, dtype=np.int64)
+        site_row[used_sites] = [row_of[int(s)] for s in s_node[used_sites]]
+
+        dist = self._rows[site_row[site], c_node[cust]].astype(np.float64) + c_snap[cust] + s_snap[site]
+        keep = dist <= max_range  # ulaşılamayan düğümler inf olduğundan burada elenir
+        return ValidPairs(cust[keep], site[keep], dist[keep].astype(dtype), n, m)
@@ -0,0 +1,164 @@
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+try:
+    from src.optimizer import LogisticsOptimizer
+    from src.evaluator import NetworkEvaluator
+except ImportError:  # src klasöründen doğrudan çalıştırıldığında
+    from optimizer import LogisticsOptimizer
+    from evaluator import NetworkEvaluator
+
+
+def data_fingerprint(df_demand, df_sites):
+    """
+    Talep ve aday depo verisinin içerik özeti (satır sırası dahil).
+    """
+    h = hashlib.sha1()
+    for df in (df_demand, df_sites):
+        h.update(','.join(map(str, df.columns)).encode())
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _file_key(path):
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_mtime_ns, st.st_size
+
+
+def _periods_key(optimizer):
+    """Çok dönemli talep tanımlıysa (bkz. LogisticsOptimizer.set_demand_periods) onun özeti, yoksa None."""
+    if getattr(optimizer, 'demand_periods', None) is None:
+        return None
+    h = hashlib.sha1()
+    for arr in (optimizer.demand_periods, optimizer.period_weights, optimizer.period_capacity_scale):
+        h.update(np.ascontiguousarray(arr).tobytes())
+    return h.hexdigest()
+
+
+class ScenarioCache:
+    """
+    Senaryo sonuçları için LRU önbellek (Streamlit oturumları arasında paylaşılır).
+
+    Anahtar: (veri özeti, dönem talebi özeti, MAX_RANGE_KM, COST_PER_KM, max_stores_to_open, backend, birleştirme)
+    Aynı senaryo tekrar sorulursa çözüm anında döner. Yalnızca 'Optimal' sonuçlar saklanır: süre sınırına
+    takılan ('Feasible') veya uygun olmayan sonuçlar döndürülür ama önbelleğe girmez, sonraki istek
+    (ör. daha uzun süre limitiyle) yeniden çözer. Optimizer nesneleri de veri başına
+    saklanır; böylece sadece çözücü parametresi (ör. depo sayısı) değişen senaryolar
+    aynı uzamsal indeksi ve mesafe/çift verisini paylaşır.
+    Genel kilit yalnızca LRU tablolarını korur; çözümler optimizer başına ayrı bir kilit altında
+    yapılır, böylece başka veri kümelerinin çözümleri ve önbellek isabetleri beklemez.
+    """
+
+    def __init__(self, maxsize=32, max_datasets=4):
+        self.maxsize = maxsize
+        self.max_datasets = max_datasets
+        self._results = OrderedDict()
+        self._optimizers = OrderedDict()
+        self._lock = threading.RLock()
+        self._solve_locks = weakref.WeakKeyDictionary()  # optimizer -> paylaşılan parametreleri koruyan kilit
+        self.hits = 0
+        self.misses = 0
+
+    def get_optimizer(self, demand_path, sites_path):
+        """
+        Dosya başına (yol, mtime, boyut) tek bir LogisticsOptimizer tutar; CSV'ler tekrar okunmaz.
+        """
+        key = (_file_key(demand_path), _file_key(sites_path))
+        with self._lock:
+            if key in self._optimizers:
+                self._optimizers.move_to_end(key)
+                return self._optimizers[key]
+            opt = LogisticsOptimizer(demand_path, sites_path)
+            opt.data_fingerprint = data_fingerprint(opt.df_demand, opt.df_sites)
+            self._optimizers[key] = opt
+            while len(self._optimizers) > self.max_datasets:
+                self._optimizers.popitem(last=False)
+            return opt
+
+    def _optimizer_lock(self, optimizer):
+        with self._lock:
+            lock = self._solve_locks.get(optimizer)
+            if lock is None:
+                lock = self._solve_locks[optimizer] = threading.Lock()
+            return lock
+
+    def solve(self, optimizer, max_stores_to_open, max_range_km=None, cost_per_km=None, backend='pulp',
+              aggregation=None, n_jobs=None, time_limit=60):
+        """
+        Senaryoyu önbellekten döner, yoksa çözüp saklar.
+        aggregation: {'method': 'grid'|'kmeans'|'cluster', 'cell_km': ..., 'n_clusters': ...} verilirse
+                     talep birleştirilerek çözülür (bkz. LogisticsOptimizer.solve_aggregated).
+        time_limit : çözücü süre limiti (sn); önbellek yalnızca 'Optimal' sonuç tuttuğu için anahtara girmez.
+        n_jobs     : kopuk bölgeler için süreç sayısı (bkz. LogisticsOptimizer.solve_decomposed); zaten bir
+                     işçi süreçte çalışılıyorsa 1 verilmeli, yoksa çekirdek sayısının karesi kadar süreç açılabilir.
+        Dönüş: OptimizationResult veya uygun çözüm yoksa None.
+        Sonucun 'metrics' alanı ilk çözümün ölçümleridir (bkz. profiling.RunMetrics.summary); önbellekten dönse de değişmez.
+        """
+        if getattr(optimizer, 'data_fingerprint', None) is None:
+            optimizer.data_fingerprint = data_fingerprint(optimizer.df_demand, optimizer.df_sites)
+        max_range_km = optimizer.MAX_RANGE_KM if max_range_km is None else max_range_km
+        cost_per_km = optimizer.COST_PER_KM if cost_per_km is None else cost_per_km
+        key = (optimizer.data_fingerprint, _periods_key(optimizer), float(max_range_km), float(cost_per_km),
+               int(max_stores_to_open), backend, tuple(sorted(aggregation.items())) if aggregation else None)
+
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return self._results[key]
+            self.misses += 1
+
+        # Optimizer paylaşıldığı için parametreler ve çözüm optimizer'a özel kilit altında yapılır
+        with self._optimizer_lock(optimizer):
+            optimizer.MAX_RANGE_KM = max_range_km
+            optimizer.COST_PER_KM = cost_per_km
+            if aggregation:
+                result = optimizer.solve_aggregated(max_stores_to_open, aggregation=aggregation['method'],
+                                                    cell_km=aggregation.get('cell_km', 0.5),
+                                                    n_clusters=aggregation.get('n_clusters'), backend=backend,
+                                                    time_limit=time_limit)
+            else:
+                # Kopuk bölgeler varsa ayrı süreçlerde çözülür; tek bölgede solve_model ile aynıdır
+                result = optimizer.solve_decomposed(max_stores_to_open, n_jobs=n_jobs, backend=backend,
+                                                    time_limit=time_limit)
+        if result is None or result.status != 'Optimal':
+            return result
+
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+            return result
+
+    def start_live_solve(self, optimizer, max_stores_to_open, max_range_km=None, cost_per_km=None, time_limit=60):
+        """
+        Senaryoyu arka planda, ilerlemesi izlenebilir ve durdurulabilir şekilde çözmeye başlar.
+        Dönüş: BackgroundSolve (bkz. optimizer.BackgroundSolve)
+        """
+        with self._optimizer_lock(optimizer):
+            if max_range_km is not None:
+                optimizer.MAX_RANGE_KM = max_range_km
+            if cost_per_km is not None:
+                optimizer.COST_PER_KM = cost_per_km
+            return optimizer.start_background_solve(max_stores_to_open, time_limit=time_limit)
+
+    def get_evaluator(self, optimizer, result):
+        """
+        Bir çözümün ağı üzerinde what-if değerlendiricisi kurar (bkz. evaluator.NetworkEvaluator).
+        Menzil ve km maliyeti çözümün parametrelerinden alınır; dönen nesne çağırana özeldir.
+        """
+        with self._optimizer_lock(optimizer):
+            optimizer.MAX_RANGE_KM = result.params.get('max_range_km', optimizer.MAX_RANGE_KM)
+            optimizer.COST_PER_KM = result.params.get('cost_per_km', optimizer.COST_PER_KM)
+            return NetworkEvaluator(optimizer, result.open_site_ids)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self._optimizers.clear()
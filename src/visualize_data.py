@@ -1,41 +1,35 @@
 import folium
-import pandas as pd
 import os
 
+try:
+    from src.data_store import load_table
+    from src.map_layers import demand_cluster, site_cluster
+except ImportError:  # `python src/visualize_data.py` ile doğrudan çalıştırıldığında
+    from data_store import load_table
+    from map_layers import demand_cluster, site_cluster
+
 def create_base_map():
     # Dosya yolları
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     demand_path = os.path.join(base_dir, 'data', 'raw', 'demand_points.csv')
     sites_path = os.path.join(base_dir, 'data', 'raw', 'candidate_sites.csv')
     
-    # Verileri oku
-    df_demand = pd.read_csv(demand_path)
-    df_sites = pd.read_csv(sites_path)
+    # Verileri oku (Arrow önbelleği; koordinatlar bellek eşlemeli)
+    df_demand, demand_coords = load_table(demand_path, 'demand')
+    df_sites, _ = load_table(sites_path, 'sites')
     
     # Harita Merkezi (Verilerin ortalaması)
-    center_lat = df_demand['lat'].mean()
-    center_lon = df_demand['lon'].mean()
+    center_lat, center_lon = demand_coords.mean(axis=1)
     
     m = folium.Map(location=[center_lat, center_lon], zoom_start=13, tiles="CartoDB positron")
     
-    # 1. Talep Noktalarını Ekle (Küçük Mavi Noktalar)
-    for _, row in df_demand.iterrows():
-        folium.CircleMarker(
-            location=[row['lat'], row['lon']],
-            radius=3,
-            color='#3498db',
-            fill=True,
-            fill_opacity=0.6,
-            popup=f"Sipariş: {row['daily_orders']} Adet"
-        ).add_to(m)
+    # 1. Talep Noktaları (istemci tarafında kümelenen tek katman)
+    demand_cluster(demand_coords[0], demand_coords[1], df_demand['daily_orders'].to_numpy()).add_to(m)
         
-    # 2. Aday Depo Noktalarını Ekle (Büyük Kırmızı Markerlar)
-    for _, row in df_sites.iterrows():
-        folium.Marker(
-            location=[row['lat'], row['lon']],
-            icon=folium.Icon(color='red', icon='warehouse', prefix='fa'),
-            tooltip=f"Aday: {row['site_id']} | Kira: {row['rent_cost']} TL"
-        ).add_to(m)
+    # 2. Aday Depolar (Kırmızı Markerlar, tek katman)
+    site_cluster(df_sites['lat'].to_numpy(), df_sites['lon'].to_numpy(),
+                 "Aday: " + df_sites['site_id'].astype(str) + " | Kira: " + df_sites['rent_cost'].astype(str) + " TL",
+                 color='red', name="Aday Depolar").add_to(m)
         
     # Kaydet
     output_path = os.path.join(base_dir, 'data', 'raw', 'initial_map.html')